@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Abort latency benchmark: how quickly a running macro stops on user input.
+
+Each trial starts a macro that would otherwise block for seconds (a long
+WAIT, a slow mouse tween, or a long random delay), simulates user input a
+moment later through a scripted idle timer, and measures the time from that
+input to cancellation being signalled and to the run actually returning.
+
+Usage:
+    python benchmarks/bench_abort.py --trials 20 --budget-ms 50 --output abort.json
+"""
+
+import argparse
+import math
+import random
+import statistics
+import sys
+import time
+
+import harness
+
+
+class ScriptedIdle:
+    """Idle timer that reports a long idle period until `offset` seconds from now.
+
+    Readings are quantized to `tick` seconds, like GetLastInputInfo.
+    """
+
+    def __init__(self, offset, tick):
+        now_mono, now_perf = time.monotonic(), time.perf_counter()
+        self.input_mono = now_mono + offset
+        self.input_perf = now_perf + offset
+        self.tick = tick
+
+    def __call__(self):
+        now = time.monotonic()
+        idle = now - self.input_mono if now >= self.input_mono else 600.0 + now
+        if self.tick:
+            idle = math.floor(idle / self.tick) * self.tick
+        return idle
+
+
+def user_backend(ms, idle):
+    """Null backend whose cursor gets nudged by the "user" at the scripted input time"""
+
+    class SimulatedUserBackend(ms.NullBackend):
+        moved = False
+
+        def position(self):
+            if not self.moved and time.monotonic() >= idle.input_mono:
+                self.moved = True
+                self.cursor = (self.cursor[0] + 40, self.cursor[1] + 25)
+            return self.cursor
+
+    return SimulatedUserBackend(position=(0, 0))
+
+
+def scenarios(ms):
+    ActionType = ms.ActionType
+    return {
+        'wait': ([ms.Action(ActionType.WAIT, {'seconds': 10})], None),
+        'mouse_tween': ([ms.Action(ActionType.MOUSE_MOVE, {'move_type': 0, 'x': 1500, 'y': 900,
+                                                          'duration': 10.0})], None),
+        'random_delay': ([ms.Action(ActionType.KEY_PRESS, {'key': 'a'})], (10, 10)),
+    }
+
+
+def run_trial(ms, actions, delay_range, offset, tick):
+    plan = ms.ExecutionPlan(actions)
+    idle = ScriptedIdle(offset, tick)
+    ctx = ms.RunContext(user_backend(ms, idle), ms.CancelToken())
+    watcher = ms.ActivityWatcher(ctx, idle)
+    watcher.start()
+    try:
+        completed = ms.execute_plan(plan, ctx, delay_range)
+    finally:
+        watcher.stop()
+    returned = time.perf_counter()
+    if completed:
+        raise RuntimeError("Macro ran to completion; user input was not detected")
+    return ctx.cancel_token.cancelled_at - idle.input_perf, returned - idle.input_perf
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        'mean_ms': statistics.fmean(values) * 1000,
+        'p95_ms': values[min(len(values) - 1, int(len(values) * 0.95))] * 1000,
+        'max_ms': values[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure macro abort latency on user input")
+    parser.add_argument("--trials", type=int, default=20, help="Trials per scenario (default: 20)")
+    parser.add_argument("--tick-ms", type=float, default=15.6,
+                        help="Idle timer resolution to simulate (default: 15.6, the Windows tick)")
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="Fail when the worst abort latency exceeds this (default: 50)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    ms = harness.setup_environment()
+    # Warm up NumPy, whose import in the first tween would hide the input arriving meanwhile
+    ms.synthesize_path((0, 0), (1, 1), 0.01)
+    rng = random.Random(args.seed)
+    results = []
+    for name, (actions, delay_range) in scenarios(ms).items():
+        detect, abort = [], []
+        for _ in range(args.trials):
+            d, a = run_trial(ms, actions, delay_range, rng.uniform(0.05, 0.3), args.tick_ms / 1000)
+            detect.append(d)
+            abort.append(a)
+        result = {'name': name, 'size': args.trials}
+        result.update({f'detect_{k}': v for k, v in summarize(detect).items()})
+        result.update({f'abort_{k}': v for k, v in summarize(abort).items()})
+        results.append(result)
+        print(f"{name:<14} detect mean {result['detect_mean_ms']:6.1f} ms"
+              f"  max {result['detect_max_ms']:6.1f} ms"
+              f"   abort mean {result['abort_mean_ms']:6.1f} ms"
+              f"  p95 {result['abort_p95_ms']:6.1f} ms"
+              f"  max {result['abort_max_ms']:6.1f} ms")
+
+    if args.output:
+        harness.write_results(args.output, results, {'tick_ms': args.tick_ms})
+        print(f"\nResults written to {args.output}")
+
+    worst = max(result['abort_max_ms'] for result in results)
+    if worst > args.budget_ms:
+        print(f"\nWorst abort latency {worst:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
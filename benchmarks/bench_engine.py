@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks for the MagicScript macro engine hot paths.
+
+Covers action dispatch (batched and unbatched), (de)serialization, display
+text, the optimizer, config load/save, the action list widget rebuild,
+snapshot publishing and a full run_macro pass, each on synthetic macros of
+10, 1k and 100k actions. Input goes to the null backend and idle time comes
+from a scripted source, so this runs headless on Linux.
+
+Usage:
+    python benchmarks/bench_engine.py --output results.json
+    python benchmarks/bench_engine.py --compare results.json --sizes 10 1000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+import harness
+
+
+def bench_action_execute(ms, actions, backend):
+    def run():
+        for action in actions:
+            action.execute(backend)
+    return harness.measure("action_execute", len(actions), run)
+
+
+def bench_plan_dispatch(ms, actions, backend, batch_inputs=True):
+    plan = ms.ExecutionPlan(actions, batch_inputs)
+    ctx = ms.RunContext(backend, seed=1)
+
+    def run():
+        for action, step in plan:
+            plan.run_step(action, step, ctx)
+    name = "plan_dispatch" if batch_inputs else "plan_dispatch_unbatched"
+    return harness.measure(name, len(actions), run)
+
+
+def bench_to_dict(ms, actions):
+    def run():
+        for action in actions:
+            action.to_dict()
+    return harness.measure("action_to_dict", len(actions), run)
+
+
+def bench_from_dict(ms, actions):
+    data = [action.to_dict() for action in actions]
+
+    def run():
+        for item in data:
+            ms.Action.from_dict(item)
+    return harness.measure("action_from_dict", len(actions), run)
+
+
+def bench_display_text(ms, actions):
+    """Names and tooltips as a list repaint asks for them; cached after the first pass"""
+    def run():
+        for action in actions:
+            action.display_name()
+            action.tooltip()
+    return harness.measure("action_display_text", len(actions), run)
+
+
+def bench_optimize(ms, actions):
+    return harness.measure("optimize_actions", len(actions), lambda: ms.optimize_actions(actions))
+
+
+def bench_config(ms, actions, workdir):
+    config_file = os.path.join(workdir, "bench_config.json")
+    manager = ms.ConfigManager(config_file)
+    manager.config['actions'] = list(actions)
+    results = [harness.measure("config_save", len(actions), manager.save_config)]
+    results.append(harness.measure("config_load", len(actions), manager.load_config))
+    results.append(harness.measure("config_get_actions", len(actions), manager.get_actions))
+
+    # A spin box drag: many setter calls that the persister coalesces into one write
+    def setter_burst():
+        for value in range(100):
+            manager.set_idle_time(value)
+    results.append(harness.measure("config_setter_burst_x100", len(actions), setter_burst))
+    results.append(harness.measure("config_flush", len(actions), manager.flush,
+                                   setup=lambda: manager.set_idle_time(1)))
+    manager.close()
+    return results
+
+
+def bench_update_action_list(window, actions):
+    window.controller.actions = list(actions)
+    return harness.measure("mainwindow_update_action_list", len(actions),
+                           window.update_action_list)
+
+
+def bench_edit_action_list(ms, window, actions):
+    """Insert and remove a single row; should not depend on the macro size"""
+    window.controller.actions = list(actions)
+    window.update_action_list()
+    action = ms.Action(ms.ActionType.WAIT, {'seconds': 0})
+
+    def run():
+        window.action_model.insert_action(0, action)
+        window.action_model.action_changed(0)
+        window.action_model.remove_action(0)
+    return harness.measure("mainwindow_insert_edit_remove_row", len(actions), run)
+
+
+def bench_publish_snapshot(controller, actions):
+    """Publishing an edited action list, as every edit does"""
+    controller.actions = list(actions)
+    return harness.measure("mainwindow_publish_snapshot", len(actions),
+                           lambda: controller.publish_snapshot(controller.actions))
+
+
+def bench_run_macro(ms, controller, actions):
+    controller.actions = list(actions)
+
+    def fresh_snapshot():
+        controller.snapshot = ms.MacroSnapshot.from_config(controller.config_manager,
+                                                           controller.actions)
+    cold = harness.measure("run_macro_cold_plan", len(actions), controller.run_macro,
+                           setup=fresh_snapshot)
+    warm = harness.measure("run_macro", len(actions), controller.run_macro)
+    return [cold, warm]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MagicScript macro engine")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(harness.SIZES),
+                        help="Synthetic macro sizes (default: 10 1000 100000)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a previous results JSON file")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Fail when a median regresses by more than this fraction "
+                             "(default: 0.2)")
+    parser.add_argument("--log-level", default="WARNING",
+                        help="Log level while benchmarking (default: WARNING)")
+    parser.add_argument("--skip-gui", action="store_true",
+                        help="Skip benchmarks that need PyQt6")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="magicscript-bench-")
+    output = os.path.abspath(args.output) if args.output else None
+    compare = os.path.abspath(args.compare) if args.compare else None
+    # TrayController reads its config (and the module writes its log) in the working directory
+    os.chdir(workdir)
+
+    ms = harness.setup_environment()
+    logging.getLogger().setLevel(args.log_level.upper())
+    ms.set_idle_source(ms.ScriptedIdleSource(initial_idle=3600.0))
+    backend = ms.set_input_backend(ms.NullBackend())
+
+    window = None
+    if not args.skip_gui:
+        gui = harness.import_gui()
+        app, controller = gui.create_app()
+        # Only the benchmark drives runs; keep idle detection from starting its own
+        controller.macro_finished.disconnect()
+        controller.idle_timer.stop()
+        controller.show_window()
+        window = controller.window
+        window.status_timer.stop()
+        ms.set_input_backend(backend)
+
+    results = []
+    for size in args.sizes:
+        actions = harness.synthetic_actions(ms, size)
+        results.append(bench_action_execute(ms, actions, backend))
+        results.append(bench_plan_dispatch(ms, actions, backend))
+        results.append(bench_plan_dispatch(ms, actions, backend, batch_inputs=False))
+        results.append(bench_to_dict(ms, actions))
+        results.append(bench_from_dict(ms, actions))
+        results.append(bench_display_text(ms, actions))
+        results.append(bench_optimize(ms, actions))
+        results.extend(bench_config(ms, actions, workdir))
+        if window is not None:
+            results.append(bench_update_action_list(window, actions))
+            results.append(bench_edit_action_list(ms, window, actions))
+            results.append(bench_publish_snapshot(controller, actions))
+            results.extend(bench_run_macro(ms, controller, actions))
+
+    harness.print_results(results)
+    if output:
+        harness.write_results(output, results)
+        print(f"\nResults written to {output}")
+
+    if compare:
+        regressions = harness.compare_results(compare, results, args.max_regression)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than "
+                  f"{args.max_regression:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Simulated comparison of idle-detection strategies.
+
+Replays a synthetic working day of user input against the old fixed
+1-second poll and the adaptive IdleScheduler, counting timer wake-ups and
+measuring how late the macro is triggered after the idle threshold is
+reached. It then reads the idle time at several rates through
+CachedIdleSource, counting how many reads reach the underlying source and
+how long an extrapolated reading can miss new input. Runs
+entirely on a simulated clock with a scripted idle source, so it is instant
+and deterministic.
+
+The benchmark fails when a cached reading misses input for longer than the
+cache's maximum age.
+
+Usage:
+    python benchmarks/bench_idle.py --hours 8 --threshold 300 --output idle.json
+"""
+
+import argparse
+import bisect
+import random
+import statistics
+import sys
+
+import harness
+
+
+def synthetic_input_times(hours, seed):
+    """Input timestamps: bursts of activity separated by idle gaps of up to 30 minutes"""
+    rng = random.Random(seed)
+    end = hours * 3600.0
+    times = []
+    t = 0.0
+    while t < end:
+        burst_end = t + rng.uniform(10, 900)
+        while t < min(burst_end, end):
+            times.append(t)
+            t += rng.expovariate(4.0)  # ~4 input events per second while active
+        t += rng.uniform(5, 1800)
+    return times
+
+
+class SimulatedClock:
+    """Stands in for time.monotonic; the simulation moves `now` forward"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def simulate_polling(ms, input_times, threshold, end, interval=1.0):
+    clock = SimulatedClock()
+    source = ms.ScriptedIdleSource(input_times, clock=clock)
+    wakeups = 0
+    latencies = []
+    while clock.now < end:
+        wakeups += 1
+        idle = source.idle_time()
+        if idle >= threshold:
+            latencies.append(idle - threshold)
+            source.add_input()  # Injected input resets the idle counter
+        clock.now += interval
+    return wakeups, latencies
+
+
+def simulate_adaptive(ms, input_times, threshold, end):
+    clock = SimulatedClock()
+    source = ms.ScriptedIdleSource(input_times, clock=clock)
+    scheduler = ms.IdleScheduler()
+    latencies = []
+    while clock.now < end:
+        idle = source.idle_time()
+        delay = scheduler.next_delay(idle, threshold)
+        if delay <= 0:
+            latencies.append(idle - threshold)
+            source.add_input()
+            continue
+        # TrayController.check_idle rounds the timer up to the next millisecond
+        clock.now += int(delay * 1000 + 1) / 1000.0
+    return scheduler.wakeups, latencies
+
+
+def simulate_cached_reads(ms, input_times, end, interval, max_age):
+    """Reads every `interval` seconds through CachedIdleSource.
+
+    Returns how many reads reached the underlying source and the longest an
+    input went unnoticed: input that arrives between two real queries is only
+    seen by the next one, which should be at most `max_age` later.
+    """
+    clock = SimulatedClock()
+    source = ms.ScriptedIdleSource(input_times, clock=clock)
+    cached = ms.CachedIdleSource(source, max_age=max_age, clock=clock)
+    reads = 0
+    worst_lag = 0.0
+    while clock.now < end:
+        reads += 1
+        # The reading implies a last input time; any real input after it was missed
+        implied_input = clock.now - cached.idle_time()
+        missed = bisect.bisect_right(input_times, implied_input + 1e-9)
+        if missed < len(input_times) and input_times[missed] <= clock.now:
+            worst_lag = max(worst_lag, clock.now - input_times[missed])
+        clock.now += interval
+    return {
+        'name': f"cached_reads_{interval * 1000:g}ms",
+        'size': reads,
+        'reads': reads,
+        'queries': source.queries,
+        'query_ratio': source.queries / reads,
+        'max_input_lag_ms': worst_lag * 1000,
+        'max_age_ms': max_age * 1000,
+    }
+
+
+def summarize(name, wakeups, latencies, hours):
+    return {
+        'name': name,
+        'size': len(latencies),
+        'wakeups': wakeups,
+        'wakeups_per_hour': wakeups / hours,
+        'triggers': len(latencies),
+        'latency_mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'latency_max_ms': max(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare idle detection wake-ups and trigger latency")
+    parser.add_argument("--hours", type=float, default=8.0, help="Simulated hours (default: 8)")
+    parser.add_argument("--threshold", type=float, default=300.0,
+                        help="Idle threshold in seconds (default: 300)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the synthetic input stream")
+    parser.add_argument("--max-age", type=float, default=None,
+                        help="Cache age for the cached reads (default: IDLE_CACHE_MAX_AGE)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    ms = harness.setup_environment()
+    input_times = synthetic_input_times(args.hours, args.seed)
+    end = args.hours * 3600.0
+
+    results = [
+        summarize("poll_1s", *simulate_polling(ms, input_times, args.threshold, end), args.hours),
+        summarize("adaptive", *simulate_adaptive(ms, input_times, args.threshold, end), args.hours),
+    ]
+    for result in results:
+        print(f"{result['name']:<10} wake-ups/hour {result['wakeups_per_hour']:10.1f}   "
+              f"triggers {result['triggers']:4d}   "
+              f"latency mean {result['latency_mean_ms']:8.1f} ms   "
+              f"max {result['latency_max_ms']:8.1f} ms")
+
+    max_age = ms.IDLE_CACHE_MAX_AGE if args.max_age is None else args.max_age
+    cached = [simulate_cached_reads(ms, input_times, end, interval, max_age)
+              for interval in (1.0, 0.1, 0.01)]
+    print()
+    for result in cached:
+        print(f"{result['name']:<20} reads {result['reads']:9d}   queries {result['queries']:8d} "
+              f"({result['query_ratio']:6.1%})"
+              f"   max input lag {result['max_input_lag_ms']:6.1f} ms")
+    results.extend(cached)
+
+    if args.output:
+        meta = {'hours': args.hours, 'threshold': args.threshold, 'max_age': max_age}
+        harness.write_results(args.output, results, meta)
+        print(f"\nResults written to {args.output}")
+
+    worst = max(result['max_input_lag_ms'] for result in cached)
+    if worst > max_age * 1000:
+        print(f"\nCached reads missed input for {worst:.1f} ms, "
+              f"longer than the {max_age * 1000:.0f} ms cache age")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark for the binary .msmacro format against the JSON config format.
+
+For a recorded macro (instant moves and short waits) and the synthetic mixed
+macro, compares:
+
+  load     json.load + Action.from_dict for every entry, versus mapping the
+           .msmacro file (MacroFile)
+  save     the indented JSON the config is written as, versus write_macro_file
+  run      compiling and running an ExecutionPlan, versus execute_macro_file
+           straight from the mapping (null backend, waits skipped)
+
+and checks that JSON -> .msmacro -> JSON is lossless.
+
+Usage:
+    python benchmarks/bench_macro_file.py --sizes 100000 --output macro_file.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import harness
+
+
+def instant_context(ms, backend):
+    """RunContext whose waits return at once, so runs measure dispatch only"""
+
+    class InstantRunContext(ms.RunContext):
+        def sleep(self, seconds):
+            self.cancel_token.check()
+
+    return InstantRunContext(backend, seed=1)
+
+
+def bench_workload(ms, workload, size, workdir):
+    if workload == "recorded":
+        actions = harness.recorded_actions(ms, size)
+    else:
+        actions = harness.synthetic_actions(ms, size)
+    json_path = os.path.join(workdir, f"{workload}.json")
+    macro_path = os.path.join(workdir, f"{workload}{ms.MACRO_FILE_EXTENSION}")
+    expected = [action.to_dict() for action in actions]
+    ms.export_actions(json_path, actions)
+    ms.export_actions(macro_path, actions)
+
+    def load_json():
+        with open(json_path) as f:
+            return [ms.Action.from_dict(item) for item in json.load(f)['actions']]
+
+    def open_macro():
+        ms.MacroFile(macro_path).close()
+
+    backend = ms.NullBackend()
+
+    def run_plan():
+        ms.execute_plan(ms.ExecutionPlan(load_json()), instant_context(ms, backend))
+
+    def run_macro_file():
+        with ms.MacroFile(macro_path) as macro:
+            ms.execute_macro_file(macro, instant_context(ms, backend))
+
+    def save_json():
+        ms.write_file_atomic(json_path, json.dumps({'actions': expected}, indent=4))
+
+    def save_macro_file():
+        ms.write_macro_file(macro_path, actions)
+
+    name = f"{workload}_{{}}"
+    results = [
+        harness.measure(name.format("load_json"), size, load_json),
+        harness.measure(name.format("load_msmacro"), size, open_macro),
+        harness.measure(name.format("save_json"), size, save_json),
+        harness.measure(name.format("save_msmacro"), size, save_macro_file),
+        harness.measure(name.format("load_and_run_json"), size, run_plan),
+        harness.measure(name.format("load_and_run_msmacro"), size, run_macro_file),
+    ]
+
+    with ms.MacroFile(macro_path) as macro:
+        lossless = macro.to_dicts() == expected
+    sizes = {'json_bytes': os.path.getsize(json_path), 'msmacro_bytes': os.path.getsize(macro_path)}
+    for result in results:
+        result['lossless'] = lossless
+        result.update(sizes)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the .msmacro and JSON macro formats")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000],
+                        help="Macro sizes (default: 100000)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a previous results JSON file")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Fail when a median regresses by more than this fraction "
+                             "(default: 0.2)")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    compare = os.path.abspath(args.compare) if args.compare else None
+    workdir = tempfile.mkdtemp(prefix="magicscript-macro-file-")
+    os.chdir(workdir)  # The module writes its log in the working directory
+
+    ms = harness.setup_environment()
+    results = []
+    for size in args.sizes:
+        for workload in ("recorded", "mixed"):
+            results.extend(bench_workload(ms, workload, size, workdir))
+
+    harness.print_results(results)
+    for result in results[::6]:
+        print(f"\n{result['name'].split('_')[0]} n={result['size']}: "
+              f"JSON {result['json_bytes'] / 1e6:.2f} MB, "
+              f".msmacro {result['msmacro_bytes'] / 1e6:.2f} MB, lossless={result['lossless']}")
+
+    if output:
+        harness.write_results(output, results)
+        print(f"\nResults written to {output}")
+
+    failed = not all(result['lossless'] for result in results)
+    if compare:
+        regressions = harness.compare_results(compare, results, args.max_regression)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than "
+                  f"{args.max_regression:.0%}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Memory benchmark for the in-memory action representations.
+
+Loads the same macro, serialized in the config JSON schema, as:
+
+  dict_params   the previous layout: Action objects with a __dict__ and an
+                open params dict (reproduced here as LegacyAction)
+  slotted       the current Action with slotted, typed params records
+  column_store  an ActionColumnStore built from those actions
+
+and reports the memory retained by each (via tracemalloc), plus a check that
+every representation converts back to the original JSON unchanged.
+
+Usage:
+    python benchmarks/bench_memory.py --sizes 100000 --output memory.json
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+import harness
+
+
+class LegacyAction:
+    """The previous Action layout: instance __dict__ plus a plain params dict"""
+
+    def __init__(self, action_type, params=None, name=None):
+        self.action_type = action_type
+        self.params = params or {}
+        self.name = name
+
+    @classmethod
+    def from_dict(cls, ms, data):
+        return cls(ms.ActionType[data['action_type']], data.get('params', {}), data.get('name'))
+
+    def to_dict(self):
+        return {'action_type': self.action_type.name, 'params': self.params, 'name': self.name}
+
+
+def retained(build):
+    """Bytes still allocated after `build()` returns, held by its result"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def bench_workload(ms, workload, size):
+    if workload == "recorded":
+        actions = harness.recorded_actions(ms, size)
+    else:
+        actions = harness.synthetic_actions(ms, size)
+    text = json.dumps([action.to_dict() for action in actions])
+    del actions
+    expected = json.loads(text)
+
+    builds = {
+        'dict_params': lambda: [LegacyAction.from_dict(ms, item) for item in json.loads(text)],
+        'slotted': lambda: [ms.Action.from_dict(item) for item in json.loads(text)],
+        'column_store': lambda: ms.ActionColumnStore.from_dicts(json.loads(text)),
+    }
+    results = []
+    for name, build in builds.items():
+        value, size_bytes = retained(build)
+        lossless = [item.to_dict() for item in value] == expected
+        results.append({
+            'name': f"{workload}_{name}",
+            'size': size,
+            'bytes': size_bytes,
+            'bytes_per_action': size_bytes / size,
+            'lossless': lossless,
+        })
+        del value
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory use of the action representations")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000],
+                        help="Macro sizes (default: 100000)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    ms = harness.setup_environment()
+    results = []
+    for size in args.sizes:
+        for workload in ("mixed", "recorded"):
+            results.extend(bench_workload(ms, workload, size))
+
+    for result in results:
+        print(f"{result['name']:<28} n={result['size']:<7} {result['bytes'] / 1e6:9.2f} MB "
+              f"{result['bytes_per_action']:8.1f} B/action  lossless={result['lossless']}")
+
+    if args.output:
+        harness.write_results(args.output, results)
+        print(f"\nResults written to {args.output}")
+    return 0 if all(result['lossless'] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Profiler benchmark: what a ProfileSession costs and whether its files are usable.
+
+Times runs of a synthetic macro on the null backend without profiling and
+inside a profile session (cProfile, tracemalloc and a span per step), and
+how long writing the session's files takes. It then profiles one run and
+checks that the .pstats file loads with pstats, the .memory file with
+tracemalloc, and that the trace holds a span for the run and every step.
+
+Usage:
+    python benchmarks/bench_profile.py --sizes 1000 10000 --output profile.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import pstats
+import sys
+import tempfile
+import tracemalloc
+
+import harness
+
+
+def run_plan(ms, plan):
+    ctx = ms.RunContext(ms.NullBackend(position=(0, 0)), seed=1)
+    with ms.profile_run():
+        if not ms.execute_plan(plan, ctx):
+            raise RuntimeError("Macro was cancelled")
+
+
+def bench_overhead(ms, actions, workdir):
+    plan = ms.ExecutionPlan(actions, batch_inputs=False)
+    results = [harness.measure("run_unprofiled", len(actions), lambda: run_plan(ms, plan))]
+    session = ms.start_profiling(workdir, seconds=3600)
+    results.append(harness.measure("run_profiled", len(actions), lambda: run_plan(ms, plan)))
+    results.append(harness.measure("profile_write", len(actions), session.stop, repeat=1))
+    return results
+
+
+def check_files(ms, actions, workdir):
+    """Problems found in the files of a one-run session; empty when they are all usable"""
+    plan = ms.ExecutionPlan(actions, batch_inputs=False)
+    session = ms.start_profiling(workdir, runs=1)
+    run_plan(ms, plan)
+    problems = []
+    if not session.wait(10):
+        return ["the session did not end after its one run"]
+    if ms.get_profile_session() is not None:
+        problems.append("the session is still installed after it ended")
+    if tracemalloc.is_tracing():
+        problems.append("tracemalloc is still running after the session ended")
+    suffixes = sorted(os.path.basename(path).split(".", 1)[1] for path in session.files)
+    if suffixes != ["memory", "pstats", "trace.json"]:
+        return problems + [f"expected .pstats, .memory and .trace.json files, got {suffixes}"]
+
+    for path in session.files:
+        if path.endswith(".pstats"):
+            stats = pstats.Stats(path)
+            if not any(function == "execute_plan" for _, _, function in stats.stats):
+                problems.append("execute_plan is missing from the pstats file")
+        elif path.endswith(".memory"):
+            tracemalloc.Snapshot.load(path)
+        else:
+            with open(path) as f:
+                trace = json.load(f)
+            spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+            steps = sum(1 for event in spans if event['cat'] == 'step')
+            runs = sum(1 for event in spans if event['cat'] == 'run')
+            if steps != len(plan) or runs != 1:
+                problems.append(f"the trace has {steps} step spans for {len(plan)} steps "
+                                f"and {runs} run spans")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure profiling overhead and check the profile files")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                        help="Macro sizes (default: 1000 10000)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    ms = harness.setup_environment()
+    workdir = tempfile.mkdtemp(prefix="magicscript-profile-")
+    results = []
+    for size in args.sizes:
+        results.extend(bench_overhead(ms, harness.synthetic_actions(ms, size), workdir))
+    harness.print_results(results)
+
+    problems = check_files(ms, harness.synthetic_actions(ms, min(args.sizes)), workdir)
+    print("\nProfile files are usable" if not problems else "")
+    for problem in problems:
+        print(f"FAILED: {problem}")
+    print(f"Profiles written to {workdir}: {len(glob.glob(os.path.join(workdir, '*')))} files")
+
+    if args.output:
+        harness.write_results(args.output, results)
+        print(f"\nResults written to {args.output}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Random value benchmark: cost per draw and reproducibility of seeded runs.
+
+Times drawing random integers and delays through the random module (what
+the engine called for every random move, scroll and delay before) and
+through a RandomStream, whose values are pre-drawn in one NumPy batch, and
+a dry run of a macro made only of random actions.
+
+It then dry-runs that macro twice with the same seed and once with another
+one, as a plan and as a .msmacro file. The benchmark fails unless runs with
+the same seed send identical input and a different seed changes it.
+
+Usage:
+    python benchmarks/bench_random.py --sizes 1000 100000 --output random.json
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+import harness
+
+
+def random_actions(ms, size):
+    """A macro where every action draws random values"""
+    ActionType = ms.ActionType
+    kinds = (
+        (ActionType.MOUSE_MOVE, {'move_type': 1, 'x_min': 0, 'x_max': 1000,
+                                 'y_min': 0, 'y_max': 1000, 'duration': 0.0}),
+        (ActionType.MOUSE_MOVE, {'move_type': 2, 'duration': 0.0}),
+        (ActionType.MOUSE_MOVE, {'move_type': 4, 'x_offset_min': -50, 'x_offset_max': 50,
+                                 'y_offset_min': -50, 'y_offset_max': 50, 'duration': 0.0}),
+        (ActionType.MOUSE_SCROLL, {'scroll_type': 1, 'min_amount': -20, 'max_amount': 20}),
+    )
+    return [ms.Action(*kinds[index % len(kinds)]) for index in range(size)]
+
+
+def bench_draws(ms, size):
+    def module_draws():
+        randint, uniform = random.randint, random.uniform
+        for _ in range(size):
+            randint(-50, 50)
+            uniform(0.5, 1.5)
+
+    def stream_draws():
+        stream = ms.RandomStream(1)
+        stream.reserve(2 * size)
+        randint, uniform = stream.randint, stream.uniform
+        for _ in range(size):
+            randint(-50, 50)
+            uniform(0.5, 1.5)
+
+    return [harness.measure("random_module_draws", size, module_draws),
+            harness.measure("random_stream_draws", size, stream_draws)]
+
+
+def bench_dry_run(ms, actions):
+    plan = ms.ExecutionPlan(actions, batch_inputs=False)
+    return harness.measure("dry_run_random_macro", len(actions),
+                           lambda: ms.dry_run(plan, 1, (0.01, 0.02)))
+
+
+def check_reproducible(ms, actions, workdir):
+    """Problems found replaying `actions` with fixed seeds; empty when runs are reproducible"""
+    def trace(source, seed):
+        return ms.dry_run(source, seed, (0.01, 0.02)).backend.events
+
+    plan = ms.ExecutionPlan(actions, batch_inputs=False)
+    first = trace(plan, 1)
+    problems = []
+    if trace(plan, 1) != first:
+        problems.append("two runs with the same seed sent different input")
+    if trace(plan, 2) == first:
+        problems.append("runs with different seeds sent the same input")
+    path = os.path.join(workdir, "random.msmacro")
+    ms.write_macro_file(path, actions)
+    with ms.MacroFile(path) as macro:
+        if trace(macro, 1) != first:
+            problems.append("the .msmacro file and the plan sent different input "
+                            "with the same seed")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time random draws and check that seeded runs are reproducible")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000],
+                        help="Draws and macro sizes (default: 1000 100000)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a previous results JSON file")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Fail when a median regresses by more than this fraction "
+                             "(default: 0.2)")
+    args = parser.parse_args()
+
+    ms = harness.setup_environment()
+    workdir = tempfile.mkdtemp(prefix="magicscript-random-")
+    results = []
+    for size in args.sizes:
+        results.extend(bench_draws(ms, size))
+        results.append(bench_dry_run(ms, random_actions(ms, size)))
+    harness.print_results(results)
+
+    problems = check_reproducible(ms, random_actions(ms, min(args.sizes)), workdir)
+    print("\nSeeded runs are reproducible" if not problems else "")
+    for problem in problems:
+        print(f"FAILED: {problem}")
+
+    if args.output:
+        harness.write_results(args.output, results)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        regressions = harness.compare_results(args.compare, results, args.max_regression)
+        if regressions:
+            problems.append("regression")
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than "
+                  f"{args.max_regression:.0%}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Recorder benchmark: capture throughput, event loss and capture-path allocations.
+
+Feeds a synthetic input stream (1 kHz mouse movement with clicks, wheel turns
+and typing mixed in) into a MacroRecorder from a producer thread, as fast as
+it will go, while the background encoder drains it. Reports the capture rate,
+how many events spilled past the ring, that every event was encoded, and the
+memory allocated per event by InputEventRing.put itself.
+
+Usage:
+    python benchmarks/bench_recorder.py --events 200000 --ring-size 65536 --output recorder.json
+"""
+
+import argparse
+import sys
+import threading
+import time
+import tracemalloc
+
+import harness
+
+
+def synthetic_stream(ms, count, start=1000.0):
+    """(kind, timestamp, x, y, code) tuples resembling a busy recording session"""
+    events = []
+    timestamp = start
+    for index in range(count):
+        timestamp += 0.001
+        if index % 500 == 250:
+            events.append((ms.INPUT_EVENT_BUTTON_DOWN, timestamp, index % 1920, index % 1080, 0))
+        elif index % 500 == 251:
+            events.append((ms.INPUT_EVENT_BUTTON_UP, timestamp, index % 1920, index % 1080, 0))
+        elif index % 200 == 100:
+            events.append((ms.INPUT_EVENT_WHEEL, timestamp, index % 1920, index % 1080,
+                           -ms.WHEEL_DELTA))
+        elif index % 50 == 10:
+            events.append((ms.INPUT_EVENT_KEY_DOWN, timestamp, 0, 0, 0x41 + index % 26))
+        elif index % 50 == 11:
+            events.append((ms.INPUT_EVENT_KEY_UP, timestamp, 0, 0, 0x41 + (index - 1) % 26))
+        else:
+            events.append((ms.INPUT_EVENT_MOVE, timestamp, index % 1920, index % 1080, 0))
+    return events
+
+
+def bench_capture(ms, events, ring_size):
+    recorder = ms.MacroRecorder(source=None, capacity=ring_size, stop_key=None)
+    recorder.source = None  # Fed below, whatever the platform
+    recorder.start()
+    feed = recorder.feed
+
+    def produce():
+        for event in events:
+            feed(*event)
+
+    start = time.perf_counter()
+    producer = threading.Thread(target=produce)
+    producer.start()
+    producer.join()
+    captured = time.perf_counter()
+    actions = recorder.stop()
+    done = time.perf_counter()
+    return {
+        'name': f"capture_ring_{ring_size}",
+        'size': len(events),
+        'capture_s': captured - start,
+        'total_s': done - start,
+        'events_per_s': len(events) / (captured - start),
+        'spilled': recorder.ring.spilled,
+        'encoded': recorder.encoder.events,
+        'lost': len(events) - recorder.encoder.events,
+        'actions': len(actions),
+    }
+
+
+def bench_put_allocations(ms, events, ring_size):
+    """Bytes allocated by put() per event while the ring has room"""
+    ring = ms.InputEventRing(ring_size)
+    events = events[:ring_size]
+    put = ring.put
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for event in events:
+        put(*event)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {'name': "ring_put_allocations", 'size': len(events),
+            'bytes_per_event': (after - before) / len(events)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the macro recorder capture path")
+    parser.add_argument("--events", type=int, default=200000,
+                        help="Events to feed (default: 200000)")
+    parser.add_argument("--ring-size", type=int, nargs="+", default=[1024, 65536],
+                        help="Ring capacities to try (default: 1024 65536)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    ms = harness.setup_environment()
+    events = synthetic_stream(ms, args.events)
+    results = [bench_capture(ms, events, size) for size in args.ring_size]
+    results.append(bench_put_allocations(ms, events, max(args.ring_size)))
+
+    for result in results[:-1]:
+        print(f"{result['name']:<24} n={result['size']:<7} "
+              f"{result['events_per_s'] / 1e6:6.2f} M events/s  "
+              f"total {result['total_s'] * 1000:8.1f} ms  spilled {result['spilled']:<7} "
+              f"lost {result['lost']}  actions {result['actions']}")
+    last = results[-1]
+    print(f"{last['name']:<24} n={last['size']:<7} {last['bytes_per_event']:6.2f} B/event")
+
+    if args.output:
+        harness.write_results(args.output, results)
+        print(f"\nResults written to {args.output}")
+    return 1 if any(result.get('lost') for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
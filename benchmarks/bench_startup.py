@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Startup benchmark: engine import time and time-to-tray.
+
+Every run starts a fresh interpreter that imports the engine, then the GUI,
+builds the tray controller with its tray icon and reports back. "Cold" runs use
+an empty bytecode cache (as after installing or updating), "warm" runs
+reuse it. The PyInstaller onefile extraction step is not included.
+
+The benchmark fails when the warm engine import exceeds the budget, or when
+importing the engine pulls in any of the modules it is supposed to defer.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 10 --import-budget-ms 50 --output startup.json
+"""
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import harness
+
+# Must not be loaded by `import magic_script`
+DEFERRED_MODULES = ("PyQt6", "pyautogui", "numpy", "magic_script_gui")
+
+
+def child():
+    """Runs in the fresh interpreter; prints the timings as one JSON line"""
+    started = time.perf_counter()
+    sys.path.insert(0, harness.REPO_ROOT)
+    importlib.import_module("magic_script")
+    engine_done = time.perf_counter()
+    loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+
+    import magic_script_gui
+    gui_done = time.perf_counter()
+    app, controller = magic_script_gui.create_app([])
+    controller.tray_icon.show()
+    app.processEvents()
+    tray_done = time.perf_counter()
+
+    print(json.dumps({
+        'engine_import_s': engine_done - started,
+        'gui_import_s': gui_done - engine_done,
+        'window_s': tray_done - gui_done,
+        'deferred_loaded': loaded,
+    }), flush=True)
+    controller.config_manager.close()
+
+
+def run_once(env, workdir):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], env=env,
+                            cwd=workdir, capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - start
+    timings = json.loads(output.strip().splitlines()[-1])
+    return timings, wall
+
+
+def summarize(name, values):
+    return {
+        'name': name,
+        'size': len(values),
+        'min_s': min(values),
+        'median_s': statistics.median(values),
+        'mean_s': statistics.fmean(values),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure MagicScript import time and time-to-tray")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per mode (default: 10)")
+    parser.add_argument("--import-budget-ms", type=float, default=50.0,
+                        help="Fail when the warm engine import median exceeds this (default: 50)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a previous results JSON file")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Fail when a median regresses by more than this fraction "
+                             "(default: 0.2)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return 0
+
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    env.setdefault("MAGICSCRIPT_INPUT_BACKEND", "null")
+    env.setdefault("MAGICSCRIPT_IDLE_SOURCE", "scripted")
+    # Warm runs need the bytecode cache written by the runs before them
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    workdir = tempfile.mkdtemp(prefix="magicscript-startup-")
+
+    results = []
+    failures = []
+    for mode in ("cold", "warm"):
+        samples = {'engine_import': [], 'gui_import': [], 'window': [], 'time_to_tray': []}
+        cache_dir = tempfile.mkdtemp(prefix="pycache-", dir=workdir)
+        if mode == "warm":
+            run_once(dict(env, PYTHONPYCACHEPREFIX=cache_dir), workdir)  # Populate the cache
+        for _ in range(args.runs):
+            if mode == "cold":
+                cache_dir = tempfile.mkdtemp(prefix="pycache-", dir=workdir)
+            timings, wall = run_once(dict(env, PYTHONPYCACHEPREFIX=cache_dir), workdir)
+            samples['engine_import'].append(timings['engine_import_s'])
+            samples['gui_import'].append(timings['gui_import_s'])
+            samples['window'].append(timings['window_s'])
+            samples['time_to_tray'].append(wall)
+            if timings['deferred_loaded']:
+                loaded = ', '.join(timings['deferred_loaded'])
+                failures.append(f"importing magic_script loaded {loaded}")
+        results.extend(summarize(f"{name}_{mode}", values) for name, values in samples.items())
+
+    harness.print_results(results)
+    if args.output:
+        harness.write_results(args.output, results, {'runs': args.runs})
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        regressions = harness.compare_results(args.compare, results, args.max_regression)
+        if regressions:
+            failures.append(f"{len(regressions)} benchmark(s) regressed by more than "
+                            f"{args.max_regression:.0%}")
+
+    warm_import = next(r for r in results if r['name'] == "engine_import_warm")['median_s'] * 1000
+    if warm_import > args.import_budget_ms:
+        failures.append(f"warm engine import {warm_import:.1f} ms exceeds the "
+                        f"{args.import_budget_ms:.0f} ms budget")
+
+    for failure in sorted(set(failures)):
+        print(f"\nFAILED: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
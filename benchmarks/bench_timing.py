@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Timing accuracy benchmark: how closely a long macro keeps to its schedule.
+
+Each scenario is a 1,000-step macro run on the null backend:
+
+  waits         short WAIT actions between instant inputs
+  random_delay  instant inputs separated by random delays
+  mouse_tween   animated mouse moves with waits in between
+
+and is run twice with the same random seed: through the engine, which
+schedules every wait against absolute deadlines, and through LegacyRunContext,
+which sleeps each wait relative to when it starts (the previous behaviour).
+Reported are the per-step jitter (how late each step started) and the total
+drift (how far past the nominal end the run finished).
+
+The benchmark fails when the engine's drift exceeds the budget.
+
+Usage:
+    python benchmarks/bench_timing.py --steps 1000 --budget-ms 5 --output timing.json
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import harness
+
+
+def legacy_context(ms):
+    """RunContext that sleeps each wait from its own start, so overhead adds up"""
+
+    class LegacyRunContext(ms.RunContext):
+        def sleep(self, seconds):
+            if self.cancel_token.wait(max(0.0, seconds)):
+                raise ms.MacroCancelled(self.cancel_token.reason)
+
+        def sleep_until(self, deadline):
+            self.sleep(deadline - time.perf_counter())
+
+        def now(self):
+            return time.perf_counter()
+
+    return LegacyRunContext
+
+
+def scenarios(ms, steps):
+    ActionType = ms.ActionType
+    rng = random.Random(1)
+
+    def waits():
+        actions = []
+        for index in range(steps):
+            if index % 2:
+                seconds = round(rng.uniform(0.001, 0.004), 4)
+                actions.append(ms.Action(ActionType.WAIT, {'seconds': seconds}))
+            else:
+                actions.append(ms.Action(ActionType.KEY_PRESS, {'key': 'a'}))
+        return actions, None
+
+    def random_delay():
+        return [ms.Action(ActionType.MOUSE_CLICK, {'button': 'left', 'clicks': 1})
+                for _ in range(steps)], (0.001, 0.003)
+
+    def mouse_tween():
+        actions = []
+        for index in range(steps):
+            if index % 2:
+                actions.append(ms.Action(ActionType.WAIT, {'seconds': 0.001}))
+            else:
+                actions.append(ms.Action(ActionType.MOUSE_MOVE, {
+                    'move_type': 0, 'x': rng.randrange(1920), 'y': rng.randrange(1080),
+                    'duration': 0.02, 'curve': 'ease'}))
+        return actions, None
+
+    return {'waits': waits(), 'random_delay': random_delay(), 'mouse_tween': mouse_tween()}
+
+
+def run_once(ms, context_class, actions, delay_range, seed):
+    plan = ms.ExecutionPlan(actions, batch_inputs=delay_range is None)
+    ctx = context_class(ms.NullBackend(position=(0, 0)), seed=seed)
+    start = time.perf_counter()
+    if not ms.execute_plan(plan, ctx, delay_range):
+        raise RuntimeError("Macro was cancelled")
+    return ctx.timing, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure how closely macros keep to their schedule")
+    parser.add_argument("--steps", type=int, default=1000, help="Steps per macro (default: 1000)")
+    parser.add_argument("--budget-ms", type=float, default=5.0,
+                        help="Fail when the engine drifts by more than this (default: 5)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    ms = harness.setup_environment()
+    # Warm up NumPy, whose import in the first tween would show up as jitter
+    ms.synthesize_path((0, 0), (1, 1), 0.01)
+    legacy = legacy_context(ms)
+    results = []
+    for name, (actions, delay_range) in scenarios(ms, args.steps).items():
+        timing, elapsed = run_once(ms, ms.RunContext, actions, delay_range, args.seed)
+        _, legacy_elapsed = run_once(ms, legacy, actions, delay_range, args.seed)
+        result = {'name': name, 'size': args.steps, 'elapsed_s': elapsed}
+        result.update(timing.summary())
+        result['legacy_drift_ms'] = (legacy_elapsed - timing.nominal) * 1000
+        results.append(result)
+        print(f"{name:<13} nominal {result['nominal_s']:7.3f} s  drift {result['drift_ms']:6.2f} ms"
+              f"   jitter mean {result['jitter_mean_ms']:5.2f} ms"
+              f"  p95 {result['jitter_p95_ms']:5.2f} ms  max {result['jitter_max_ms']:6.2f} ms"
+              f"   legacy drift {result['legacy_drift_ms']:8.1f} ms")
+
+    if args.output:
+        harness.write_results(args.output, results, {'steps': args.steps})
+        print(f"\nResults written to {args.output}")
+
+    worst = max(abs(result['drift_ms']) for result in results)
+    if worst > args.budget_ms:
+        print(f"\nWorst drift {worst:.2f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tray footprint benchmark: resident memory with and without the main window.
+
+Every size runs in a fresh interpreter that saves a synthetic macro to its
+config, starts the TrayController and reports the process RSS, in total and
+the private (anonymous) part that is not file-backed library pages:
+
+  tray_only        the controller, its tray icon, idle detection and worker
+  window_shown     after show_window() and an ActionDialog opened and closed
+  window_unloaded  after the hidden window was destroyed (unload_window)
+  after_cycles     after showing and unloading the window --cycles more times
+
+RSS is read from /proc, so this runs on Linux only. The benchmark fails when
+an unloaded window is not freed, or when the show/unload cycles grow the
+private footprint by more than the allowed leak.
+
+Usage:
+    python benchmarks/bench_tray.py --sizes 10 1000 100000 --output tray.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import weakref
+
+import harness
+
+
+def rss_bytes():
+    """(total, private) resident bytes of this process"""
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("Rss"):
+                name, value = line.split(":", 1)
+                fields[name] = int(value.split()[0]) * 1024
+    return fields['RssAnon'] + fields['RssFile'] + fields['RssShmem'], fields['RssAnon']
+
+
+def child(size, cycles):
+    """Runs in the fresh interpreter; prints the RSS samples as one JSON line"""
+    ms = harness.setup_environment()
+    manager = ms.ConfigManager(save_delay=0)
+    manager.set_actions(harness.synthetic_actions(ms, size))
+    manager.close()
+
+    gui = harness.import_gui()
+    from PyQt6.QtCore import QCoreApplication, QEvent
+    app, controller = gui.create_app([])
+
+    def settle():
+        for _ in range(3):
+            app.processEvents()
+            QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+        gui.release_memory()
+        return rss_bytes()
+
+    def show():
+        controller.show_window()
+        dialog = gui.ActionDialog(controller.window, controller.actions[0])
+        dialog.show()
+        app.processEvents()
+        dialog.reject()
+
+    def unload():
+        window = weakref.ref(controller.window)
+        controller.window.hide()
+        controller.unload_window()
+        return window
+
+    samples = {'tray_only': settle()}
+    show()
+    samples['window_shown'] = settle()
+    window = unload()
+    samples['window_unloaded'] = settle()
+    for _ in range(cycles):
+        show()
+        settle()
+        unload()
+    samples['after_cycles'] = settle()
+
+    print(json.dumps({'rss': samples, 'window_freed': window() is None}), flush=True)
+    controller.macro_worker.shutdown()
+    controller.config_manager.close()
+
+
+def run_child(size, cycles, workdir):
+    command = [sys.executable, os.path.abspath(__file__), "--child", str(size), str(cycles)]
+    output = subprocess.run(command, cwd=workdir, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure MagicScript's RSS with and without the main window")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(harness.SIZES),
+                        help="Synthetic macro sizes (default: 10 1000 100000)")
+    parser.add_argument("--cycles", type=int, default=10,
+                        help="Extra show/unload cycles per size (default: 10)")
+    parser.add_argument("--max-leak-mb", type=float, default=2.0,
+                        help="Fail when the cycles grow the private RSS by more than this "
+                             "(default: 2)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--child", type=int, nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return 0
+
+    if not os.path.exists("/proc/self/status"):
+        print("This benchmark reads RSS from /proc and only runs on Linux")
+        return 1
+
+    harness.setup_environment()  # The children inherit the headless environment
+    results = []
+    failures = []
+    for size in args.sizes:
+        report = run_child(size, args.cycles, tempfile.mkdtemp(prefix="magicscript-tray-"))
+        rss = report['rss']
+        results.extend({'name': name, 'size': size, 'rss_mb': total / 2 ** 20,
+                        'private_mb': private / 2 ** 20}
+                       for name, (total, private) in rss.items())
+        saved = [(shown - unloaded) / 2 ** 20
+                 for shown, unloaded in zip(rss['window_shown'], rss['window_unloaded'])]
+        results.append({'name': 'unload_saved', 'size': size, 'rss_mb': saved[0],
+                        'private_mb': saved[1]})
+        growth = (rss['after_cycles'][1] - rss['window_unloaded'][1]) / 2 ** 20
+        if not report['window_freed']:
+            failures.append(f"the unloaded MainWindow was not freed (n={size})")
+        if growth > args.max_leak_mb:
+            failures.append(f"{args.cycles} show/unload cycles grew the private RSS "
+                            f"by {growth:.1f} MB (n={size})")
+
+    for result in results:
+        print(f"{result['name']:<16} n={result['size']:<7} RSS {result['rss_mb']:8.2f} MB"
+              f"   private {result['private_mb']:8.2f} MB")
+    if args.output:
+        harness.write_results(args.output, results, {'cycles': args.cycles})
+        print(f"\nResults written to {args.output}")
+
+    for failure in failures:
+        print(f"\nFAILED: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
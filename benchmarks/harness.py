@@ -0,0 +1,168 @@
+"""
+Shared helpers for the MagicScript benchmark scripts.
+
+Benchmarks run against the null input backend and the scripted idle source,
+so they work on a plain Linux box without a desktop session. Results are written
+as JSON and can be compared between commits with `--compare`.
+"""
+
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = (10, 1000, 100000)
+
+
+def setup_environment():
+    """Make magic_script importable headless and return the module"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ.setdefault("MAGICSCRIPT_INPUT_BACKEND", "null")
+    os.environ.setdefault("MAGICSCRIPT_IDLE_SOURCE", "scripted")
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    import magic_script
+    return magic_script
+
+
+def import_gui():
+    """Import and return the PyQt6 GUI module (call setup_environment first)"""
+    import magic_script_gui
+    return magic_script_gui
+
+
+def synthetic_params(magic_script, index):
+    """Params for the index-th action of a synthetic macro, cycling through all action types"""
+    ActionType = magic_script.ActionType
+    kinds = (
+        (ActionType.MOUSE_MOVE, {'move_type': 0, 'x': index % 1920, 'y': index % 1080,
+                                 'duration': 0.0}),
+        (ActionType.MOUSE_MOVE, {'move_type': 1, 'x_min': 0, 'x_max': 1000,
+                                 'y_min': 0, 'y_max': 1000, 'duration': 0.0}),
+        (ActionType.MOUSE_MOVE, {'move_type': 3, 'x_offset': 5, 'y_offset': -5, 'duration': 0.0}),
+        (ActionType.MOUSE_MOVE, {'move_type': 4, 'x_offset_min': -50, 'x_offset_max': 50,
+                                 'y_offset_min': -50, 'y_offset_max': 50, 'duration': 0.0}),
+        (ActionType.MOUSE_CLICK, {'button': 'left', 'clicks': 1}),
+        (ActionType.MOUSE_SCROLL, {'scroll_type': 1, 'min_amount': -20, 'max_amount': 20}),
+        (ActionType.KEY_PRESS, {'key': 'a'}),
+        (ActionType.KEY_COMBINATION, {'keys': ['ctrl', 'c']}),
+        (ActionType.WAIT, {'seconds': 0}),
+    )
+    return kinds[index % len(kinds)]
+
+
+def synthetic_actions(magic_script, size):
+    """Build a macro of `size` actions covering every action type"""
+    actions = []
+    for index in range(size):
+        action_type, params = synthetic_params(magic_script, index)
+        actions.append(magic_script.Action(action_type, dict(params)))
+    return actions
+
+
+def recorded_actions(magic_script, size, seed=1):
+    """A recording-style macro: absolute instant moves with short waits in between"""
+    rng = random.Random(seed)
+    ActionType = magic_script.ActionType
+    actions = []
+    for index in range(size):
+        if index % 2:
+            params = {'seconds': round(rng.uniform(0.01, 0.2), 3)}
+            actions.append(magic_script.Action(ActionType.WAIT, params))
+        else:
+            params = {'move_type': 0, 'x': rng.randrange(1920), 'y': rng.randrange(1080),
+                      'duration': 0.0}
+            actions.append(magic_script.Action(ActionType.MOUSE_MOVE, params))
+    return actions
+
+
+def default_repeat(size):
+    """Fewer repetitions for bigger inputs so the whole suite stays in minutes"""
+    return max(3, min(50, 100000 // max(size, 1)))
+
+
+def measure(name, size, func, repeat=None, setup=None):
+    """Time `func` `repeat` times and return a result record.
+
+    `setup`, when given, runs before every repetition outside the timed region.
+    """
+    repeat = repeat or default_repeat(size)
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    return {
+        'name': name,
+        'size': size,
+        'repeat': repeat,
+        'min_s': min(timings),
+        'median_s': median,
+        'mean_s': statistics.fmean(timings),
+        'per_item_us': median / max(size, 1) * 1e6,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def metadata():
+    return {
+        'commit': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def write_results(path, results, extra_meta=None):
+    meta = metadata()
+    if extra_meta:
+        meta.update(extra_meta)
+    with open(path, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2)
+
+
+def print_results(results, value_key='median_s', unit=1e3, unit_name='ms'):
+    for result in results:
+        print(f"{result['name']:<36} n={result['size']:<7} "
+              f"{result[value_key] * unit:10.3f} {unit_name}")
+
+
+def compare_results(baseline_path, results, max_regression, value_key='median_s'):
+    """Print the change against a previous results file.
+
+    Returns the list of (name, size, ratio) entries that regressed by more than
+    `max_regression` (a fraction, e.g. 0.2 for 20%).
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r['name'], r['size']): r for r in baseline.get('results', [])}
+    regressions = []
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('meta', {}).get('commit')}):")
+    for result in results:
+        old = previous.get((result['name'], result['size']))
+        if old is None or not old.get(value_key):
+            continue
+        ratio = result[value_key] / old[value_key]
+        marker = ""
+        if ratio > 1 + max_regression:
+            marker = "  REGRESSION"
+            regressions.append((result['name'], result['size'], ratio))
+        print(f"{result['name']:<36} n={result['size']:<7} {(ratio - 1) * 100:+8.1f}%{marker}")
+    return regressions
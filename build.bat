@@ -34,7 +34,7 @@ if not exist icon.png (
 
 REM Create spec file with more control over the build
 echo Creating PyInstaller spec file...
-pyinstaller --onefile --windowed --icon=icon.ico --name=MagicScript --add-data "icon.ico;." --add-data "icon.png;." --specpath . magic_script.py
+pyinstaller --onefile --windowed --icon=icon.ico --name=MagicScript --add-data "icon.ico;." --add-data "icon.png;." --hidden-import magic_script_gui --specpath . magic_script.py
 
 echo.
 if %ERRORLEVEL% EQU 0 (
@@ -4,28 +4,31 @@
 """
 MagicScript - Automated Mouse and Keyboard Macro Tool
 A Windows application that automates mouse and keyboard actions after a period of idle time.
+
+This module holds the macro engine and is cheap to import: PyQt6, pyautogui
+and NumPy are only loaded when first needed, and nothing is logged or
+configured until main() runs. The GUI lives in magic_script_gui.
 """
 
 import sys
 import os
 import json
+import mmap
+import struct
 import time
-import random
 import ctypes
 from ctypes import wintypes
 import threading
+import tempfile
+import atexit
+import weakref
+from array import array
+from bisect import bisect_left, bisect_right, insort
 import logging
-from datetime import datetime
+import logging.handlers
+import queue
+from collections import deque
 from enum import Enum, auto
-import pyautogui
-import PyQt6.sip
-from PyQt6.QtCore import Qt, QTimer, QSize, QPoint, QEvent, pyqtSignal, QObject
-from PyQt6.QtGui import QIcon, QAction, QFont, QColor, QPalette, QDrag, QPixmap, QPainter
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QSystemTrayIcon, QMenu,
-                             QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-                             QSpinBox, QListWidget, QListWidgetItem, QComboBox,
-                             QMessageBox, QDialog, QDialogButtonBox, QLineEdit,
-                             QGroupBox, QFormLayout, QTabWidget, QCheckBox, QSlider, QDoubleSpinBox)
 
 # Function to get correct resource path for both development and PyInstaller
 def resource_path(relative_path):
@@ -38,7 +41,7 @@ def resource_path(relative_path):
 
     path = os.path.join(base_path, relative_path)
     if not os.path.exists(path):
-        logging.warning(f"Resource not found: {path}")
+        logging.warning("Resource not found: %s", path)
         # Try alternate locations
         alt_paths = [
             os.path.join(os.path.dirname(sys.executable), relative_path),
@@ -46,7 +49,7 @@ def resource_path(relative_path):
         ]
         for alt_path in alt_paths:
             if os.path.exists(alt_path):
-                logging.info(f"Found resource at alternate location: {alt_path}")
+                logging.info("Found resource at alternate location: %s", alt_path)
                 return alt_path
 
     return path
@@ -55,22 +58,76 @@ def resource_path(relative_path):
 APP_NAME = "MagicScript"
 APP_VERSION = "1.0.0"
 CONFIG_FILE = "magic_script_config.json"
+CONFIG_SAVE_DELAY = 1.0  # Seconds to coalesce config changes before writing
+DEFAULT_STEP_PAUSE = 0.0  # Seconds to pause after each action
 DEFAULT_IDLE_TIME = 300  # 5 minutes in seconds
+WINDOW_UNLOAD_DELAY = 300.0  # Seconds the main window stays loaded after it is hidden
 MUTEX_NAME = "Global\\MagicScript_SingleInstance_Mutex"
 
-# Setup logging
-log_file = "magic_script.log"
-logging.basicConfig(
-    level=logging.DEBUG,  # Set to DEBUG to capture more information
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
-)
+# Logging
+LOG_FILE = "magic_script.log"
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_MAX_BYTES = 1024 * 1024  # Rotate the log file once it reaches 1 MB
+LOG_BACKUP_COUNT = 3  # Rotated log files to keep
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+DEFAULT_LOG_LEVEL = "INFO"
+LOG_LEVEL_ENV = "MAGICSCRIPT_LOG_LEVEL"
+
 logger = logging.getLogger("MagicScript")
+_log_listener = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves all formatting to the listener thread.
+
+    The stock prepare() formats every record on the calling thread so it can
+    be pickled; our queue never leaves the process, so records are passed
+    through untouched.
+    """
+
+    def prepare(self, record):
+        return record
+
 
-# Add exception hook to catch unhandled exceptions
+def setup_logging(level=DEFAULT_LOG_LEVEL, log_file=LOG_FILE):
+    """Send all logging through a queue to a background writer thread.
+
+    Logging calls only build a record and put it on the queue; formatting,
+    console output and file I/O happen on the listener thread. The log file
+    is rotated at LOG_MAX_BYTES. Calling this again only changes the level.
+    """
+    global _log_listener
+    if _log_listener is None:
+        formatter = logging.Formatter(LOG_FORMAT)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+        stream_handler = logging.StreamHandler()
+        file_handler.setFormatter(formatter)
+        stream_handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        logging.getLogger().addHandler(DeferredQueueHandler(log_queue))
+        _log_listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+        _log_listener.start()
+        # Drains whatever is still queued on exit
+        atexit.register(_log_listener.stop)
+    set_log_level(level)
+    return _log_listener
+
+
+def set_log_level(level):
+    """Set the root log level by name or number; records below it cost a single check.
+
+    The MAGICSCRIPT_LOG_LEVEL environment variable overrides `level`.
+    """
+    level = os.environ.get(LOG_LEVEL_ENV) or level
+    value = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level: {level}")
+    logging.getLogger().setLevel(value)
+
+
+# Exception hook to catch unhandled exceptions (installed by main)
 def handle_exception(exc_type, exc_value, exc_traceback):
     if issubclass(exc_type, KeyboardInterrupt):
         # Don't log keyboard interrupt
@@ -79,11 +136,6 @@ def handle_exception(exc_type, exc_value, exc_traceback):
 
     logger.critical("Unhandled exception", exc_info=(exc_type, exc_value, exc_traceback))
 
-# Set the exception hook
-sys.excepthook = handle_exception
-
-logger.info(f"Starting {APP_NAME} v{APP_VERSION}")
-logger.info(f"Log file: {os.path.abspath(log_file)}")
 
 # Windows API for idle time detection
 class LastInputInfo(ctypes.Structure):
@@ -106,32 +158,1065 @@ def ensure_single_instance():
     try:
         mutex = ctypes.windll.kernel32.CreateMutexW(None, 1, MUTEX_NAME)
         if ctypes.windll.kernel32.GetLastError() == 183:  # ERROR_ALREADY_EXISTS
+            from PyQt6.QtWidgets import QApplication, QMessageBox
+            # The message box needs an application; it is destroyed as soon as nothing references it
+            app = QApplication.instance() or QApplication(sys.argv)
+            app.setApplicationName(APP_NAME)
             QMessageBox.warning(
-                None, 
-                "Already Running", 
+                None,
+                "Already Running",
                 f"{APP_NAME} is already running.\nCheck the system tray for the icon."
             )
             sys.exit(0)
         return mutex
     except Exception as e:
-        logger.error(f"Error creating mutex: {e}")
+        logger.error("Error creating mutex: %s", e)
         return None
 
-# Get idle time in milliseconds
-def get_idle_time():
-    last_input_info = LastInputInfo()
-    last_input_info.cbSize = ctypes.sizeof(last_input_info)
-    ctypes.windll.user32.GetLastInputInfo(ctypes.byref(last_input_info))
-    millis = ctypes.windll.kernel32.GetTickCount() - last_input_info.dwTime
-    return millis / 1000.0  # Convert to seconds
+# Idle time sources
+#
+# Idle detection and the activity watcher read the time since the last user
+# input through an IdleSource: the Windows input timer, the X11 screen saver
+# extension, evdev devices, or a script for tests and benchmarks. The
+# process-wide source is wrapped in a CachedIdleSource, which answers
+# repeated reads from the monotonic clock between real queries.
+IDLE_SOURCE_ENV = "MAGICSCRIPT_IDLE_SOURCE"
+DEFAULT_IDLE_SOURCE = "auto"
+IDLE_CACHE_MAX_AGE = 0.5  # Seconds a queried idle time is extrapolated before querying again
+EVDEV_POLL_TIMEOUT = 0.5  # Seconds the evdev reader blocks before checking whether it was closed
+
+
+class IdleSource:
+    """Reports the seconds since the last user input"""
+    name = "none"
+
+    def idle_time(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class WindowsIdleSource(IdleSource):
+    """GetLastInputInfo against GetTickCount.
+
+    Both are 32-bit millisecond counters that wrap after 49.7 days; their
+    difference is taken modulo 2**32, so it stays right across the wrap.
+    """
+    name = "windows"
+
+    def __init__(self):
+        self._user32 = ctypes.windll.user32
+        self._get_tick_count = ctypes.windll.kernel32.GetTickCount
+        self._get_tick_count.restype = ctypes.c_uint32
+
+    def idle_time(self):
+        info = LastInputInfo()
+        info.cbSize = ctypes.sizeof(info)
+        if not self._user32.GetLastInputInfo(ctypes.byref(info)):
+            raise OSError("GetLastInputInfo failed")
+        return ((self._get_tick_count() - info.dwTime) & 0xFFFFFFFF) / 1000.0
+
+
+class XScreenSaverInfo(ctypes.Structure):
+    _fields_ = [
+        ('window', ctypes.c_ulong),
+        ('state', ctypes.c_int),
+        ('kind', ctypes.c_int),
+        ('til_or_since', ctypes.c_ulong),
+        ('idle', ctypes.c_ulong),  # Milliseconds
+        ('event_mask', ctypes.c_ulong),
+    ]
+
+
+class X11IdleSource(IdleSource):
+    """Idle time from the X11 screen saver extension (libXss), on `display` or $DISPLAY"""
+    name = "x11"
+
+    def __init__(self, display=None):
+        import ctypes.util
+
+        libraries = [ctypes.util.find_library(name) for name in ("X11", "Xss")]
+        if not all(libraries):
+            raise OSError("libX11 and libXss are needed to read the X11 idle time")
+        x11, xss = (ctypes.CDLL(library) for library in libraries)
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        xss.XScreenSaverQueryExtension.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int),
+                                                   ctypes.POINTER(ctypes.c_int)]
+        xss.XScreenSaverAllocInfo.restype = ctypes.POINTER(XScreenSaverInfo)
+        xss.XScreenSaverQueryInfo.argtypes = [ctypes.c_void_p, ctypes.c_ulong,
+                                              ctypes.POINTER(XScreenSaverInfo)]
+
+        self._x11, self._xss = x11, xss
+        self._display = x11.XOpenDisplay(display.encode() if display else None)
+        if not self._display:
+            name = display or os.environ.get('DISPLAY', '(DISPLAY not set)')
+            raise OSError(f"Cannot open X display {name}")
+        event_base, error_base = ctypes.c_int(), ctypes.c_int()
+        if not xss.XScreenSaverQueryExtension(self._display, ctypes.byref(event_base),
+                                              ctypes.byref(error_base)):
+            x11.XCloseDisplay(self._display)
+            raise OSError("The X server does not support the screen saver extension")
+        self._root = x11.XDefaultRootWindow(self._display)
+        self._info = xss.XScreenSaverAllocInfo()
+        self._lock = threading.Lock()  # Xlib connections are not thread-safe
+
+    def idle_time(self):
+        with self._lock:
+            if self._display is None:
+                raise OSError("X display closed")
+            if not self._xss.XScreenSaverQueryInfo(self._display, self._root, self._info):
+                raise OSError("XScreenSaverQueryInfo failed")
+            return self._info.contents.idle / 1000.0
+
+    def close(self):
+        with self._lock:
+            if self._display is not None:
+                self._x11.XFree(self._info)
+                self._x11.XCloseDisplay(self._display)
+                self._display = None
+
+
+class EvdevIdleSource(IdleSource):
+    """Idle time from the Linux input devices, e.g. on Wayland or a console.
+
+    A reader thread drains the /dev/input/event* devices it may read (root,
+    or membership of the `input` group) and notes when events arrive. Only
+    hardware input is seen, not input injected by MagicScript.
+    """
+    name = "evdev"
+
+    def __init__(self, paths=None):
+        import glob
+
+        self._fds = []
+        for path in paths or sorted(glob.glob("/dev/input/event*")):
+            try:
+                self._fds.append(os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+            except OSError:
+                continue
+        if not self._fds:
+            raise OSError("No readable input devices in /dev/input "
+                          "(is the user in the input group?)")
+        self._last_input = time.monotonic()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="EvdevIdleSource", daemon=True)
+        self._thread.start()
+
+    def idle_time(self):
+        return time.monotonic() - self._last_input
+
+    def _run(self):
+        import select
+
+        fds = list(self._fds)
+        while fds and not self._closed.is_set():
+            readable, _, _ = select.select(fds, [], [], EVDEV_POLL_TIMEOUT)
+            for fd in readable:
+                try:
+                    while os.read(fd, 4096):
+                        self._last_input = time.monotonic()
+                except BlockingIOError:
+                    pass
+                except OSError:
+                    fds.remove(fd)  # Unplugged
+
+    def close(self):
+        self._closed.set()
+        self._thread.join()
+        for fd in self._fds:
+            os.close(fd)
+        self._fds = []
+
+
+class ScriptedIdleSource(IdleSource):
+    """Idle time following a script of input times, for tests and benchmarks.
+
+    `input_times` are seconds after creation on `clock` (time.monotonic by
+    default, or a simulated clock). Before the first input the system has
+    been idle since `initial_idle` seconds before creation.
+    """
+    name = "scripted"
+
+    def __init__(self, input_times=(), initial_idle=0.0, clock=None):
+        self.clock = clock or time.monotonic
+        self.input_times = sorted(input_times)
+        self.initial_idle = initial_idle
+        self.queries = 0
+        self._start = self.clock()
+
+    def add_input(self, at=None):
+        """Script an input at `at` seconds after creation (default: now)"""
+        insort(self.input_times, self.clock() - self._start if at is None else at)
+
+    def idle_time(self):
+        self.queries += 1
+        now = self.clock() - self._start
+        index = bisect_right(self.input_times, now) - 1
+        last_input = self.input_times[index] if index >= 0 else -self.initial_idle
+        return now - last_input
+
+
+class CachedIdleSource(IdleSource):
+    """Serves reads of `source` from the monotonic clock between real queries.
+
+    Idle time grows at wall-clock speed until input resets it, so a reading
+    up to `max_age` seconds old is extrapolated instead of queried again.
+    Readers that must see input at once (the activity watcher) pass
+    `max_age=0`. `mark_input()` records input the source may not see, such
+    as MagicScript's own with evdev; reads never exceed the time since then.
+    """
+
+    def __init__(self, source, max_age=IDLE_CACHE_MAX_AGE, clock=None):
+        self.source = source
+        self.name = source.name
+        self.max_age = max_age
+        self.clock = clock or time.monotonic
+        # (clock time of the last query, idle time it returned)
+        self._reading = (float('-inf'), 0.0)
+        self._marked = float('-inf')
+
+    def idle_time(self, max_age=None):
+        now = self.clock()
+        queried_at, idle = self._reading
+        if now - queried_at >= (self.max_age if max_age is None else max_age):
+            idle = self.source.idle_time()
+            self._reading = (now, idle)
+        else:
+            idle += now - queried_at
+        return min(idle, now - self._marked)
+
+    def mark_input(self):
+        self._marked = self.clock()
+
+    def close(self):
+        self.source.close()
+
+
+IDLE_SOURCES = {
+    WindowsIdleSource.name: WindowsIdleSource,
+    X11IdleSource.name: X11IdleSource,
+    EvdevIdleSource.name: EvdevIdleSource,
+    ScriptedIdleSource.name: ScriptedIdleSource,
+}
+
+_idle_source = None
+_idle_source_error = None
+
+
+def create_idle_source(name=DEFAULT_IDLE_SOURCE):
+    """Create an idle source by name.
+
+    The MAGICSCRIPT_IDLE_SOURCE environment variable overrides `name`.
+    "auto" picks the Windows timer on Windows, and the X11 screen saver
+    extension, else evdev, elsewhere. Raises OSError if none is usable.
+    """
+    name = os.environ.get(IDLE_SOURCE_ENV) or name or DEFAULT_IDLE_SOURCE
+    if name != "auto":
+        if name not in IDLE_SOURCES:
+            raise ValueError(f"Unknown idle source: {name}")
+        return IDLE_SOURCES[name]()
+    if sys.platform == "win32":
+        return WindowsIdleSource()
+    errors = []
+    for source_class in (X11IdleSource, EvdevIdleSource):
+        try:
+            return source_class()
+        except OSError as e:
+            errors.append(f"{source_class.name}: {e}")
+    raise OSError("No idle time source available (" + "; ".join(errors) + ")")
+
+
+def get_idle_source():
+    """Return the process-wide, cached idle source, creating the default on first use.
+
+    Raises OSError if no source is usable; the failure is remembered.
+    """
+    global _idle_source_error
+    if _idle_source is None:
+        if _idle_source_error is not None:
+            raise _idle_source_error
+        try:
+            set_idle_source(create_idle_source())
+        except OSError as e:
+            _idle_source_error = e
+            raise
+    return _idle_source
+
+
+def set_idle_source(source):
+    """Replace the process-wide idle source (accepts a name or an IdleSource)"""
+    global _idle_source, _idle_source_error
+    if isinstance(source, str):
+        source = create_idle_source(source)
+    if not isinstance(source, CachedIdleSource):
+        source = CachedIdleSource(source)
+    _idle_source, _idle_source_error = source, None
+    logger.info("Using idle source: %s", source.name)
+    return source
+
+
+def idle_source_available():
+    try:
+        get_idle_source()
+        return True
+    except OSError:
+        return False
+
+
+def get_idle_time(max_age=None):
+    """Seconds since the last user input, from the process-wide idle source"""
+    return get_idle_source().idle_time(max_age)
+
+
+class IdleScheduler:
+    """Works out when idle detection next needs to look at the idle timer.
+
+    Idle time grows at exactly wall-clock speed until input resets it, so the
+    threshold cannot be reached before `threshold - idle_time` seconds have
+    passed. Sleeping that long and re-checking on wake-up replaces fixed-rate
+    polling: if input happened meanwhile the check simply re-arms.
+    """
+
+    def __init__(self):
+        self.wakeups = 0
+
+    def next_delay(self, idle_time, threshold):
+        """Seconds to sleep before the threshold can be reached (0 means due now)"""
+        self.wakeups += 1
+        return max(0.0, threshold - idle_time)
+
+
+# Input backends
+#
+# Action.execute never talks to an input library directly; it goes through the
+# active InputBackend. This keeps the macro engine runnable (and measurable)
+# without a desktop session.
+INPUT_BACKEND_ENV = "MAGICSCRIPT_INPUT_BACKEND"
+DEFAULT_INPUT_BACKEND = "auto"
+
+
+class InputBackend:
+    """Base class for mouse and keyboard injection.
+
+    Subclasses implement the primitive operations used by Action.execute.
+    `move_to` and `move_rel` take a duration in seconds; backends that cannot
+    animate a move are free to jump straight to the target.
+    """
+    name = "base"
+    # Whether placing the cursor resets the OS idle timer (SetCursorPos does not)
+    moves_reset_idle = True
+
+    def position(self):
+        raise NotImplementedError
+
+    def size(self):
+        raise NotImplementedError
+
+    def move_to(self, x, y, duration=0.0):
+        raise NotImplementedError
+
+    def move_rel(self, x_offset, y_offset, duration=0.0):
+        current_x, current_y = self.position()
+        self.move_to(current_x + x_offset, current_y + y_offset, duration)
+
+    def set_cursor(self, x, y):
+        """Place the cursor immediately, without any per-call delay (used for path playback)"""
+        self.move_to(x, y)
+
+    def move_path(self, points, times, ctx):
+        """Play back a precomputed cursor path (see synthesize_path).
+
+        `points` are (x, y) pairs and `times` the matching offsets in seconds
+        from the run's scheduled current time (see RunContext.sleep_until).
+        Waits go through `ctx` so the move stays interruptible, and the run
+        is cancelled if the cursor turns up somewhere other than where it was
+        last placed, i.e. the user has taken the mouse back.
+        """
+        set_cursor, position, sleep_until = self.set_cursor, self.position, ctx.sleep_until
+        # Only count cursor placement as injection where it resets the idle timer
+        mark = self.moves_reset_idle
+        placed = position()
+        start = ctx.now()
+        ctx.end_injection()
+        try:
+            for (x, y), offset in zip(points, times):
+                sleep_until(start + offset)
+                current = position()
+                if (abs(current[0] - placed[0]) > CURSOR_TOLERANCE or
+                        abs(current[1] - placed[1]) > CURSOR_TOLERANCE):
+                    ctx.cancel_token.cancel("user moved the mouse")
+                    raise MacroCancelled(ctx.cancel_token.reason)
+                if mark:
+                    ctx.begin_injection()
+                set_cursor(x, y)
+                placed = position()
+                if mark:
+                    ctx.end_injection()
+        finally:
+            ctx.begin_injection()
+
+    def click(self, button='left', clicks=1):
+        raise NotImplementedError
+
+    def scroll(self, amount):
+        raise NotImplementedError
+
+    def press(self, key):
+        raise NotImplementedError
+
+    def hotkey(self, *keys):
+        raise NotImplementedError
+
+    def send(self, events):
+        """Submit a batch of input events.
+
+        Events are tuples naming one of the primitives above followed by its
+        arguments, e.g. ('click', 'left', 1) or ('hotkey', 'ctrl', 'c').
+        Backends that can inject several events in one native call override
+        this; the default replays them one primitive at a time.
+        """
+        for kind, *args in events:
+            getattr(self, kind)(*args)
+
+
+class PyAutoGUIBackend(InputBackend):
+    """Input backend delegating to pyautogui (the original behaviour)."""
+    name = "pyautogui"
+
+    def __init__(self):
+        # Imported lazily so the engine can be loaded without a display
+        import pyautogui
+        # Pauses between steps are explicit (the step_pause setting), not a
+        # blanket sleep after every pyautogui call
+        pyautogui.PAUSE = 0
+        self._pyautogui = pyautogui
+        # pyautogui moves the cursor with SetCursorPos on Windows, fake motion events elsewhere
+        self.moves_reset_idle = sys.platform != "win32"
+
+    def position(self):
+        return tuple(self._pyautogui.position())
+
+    def size(self):
+        return tuple(self._pyautogui.size())
+
+    def move_to(self, x, y, duration=0.0):
+        self._pyautogui.moveTo(x, y, duration=duration)
+
+    def move_rel(self, x_offset, y_offset, duration=0.0):
+        self._pyautogui.moveRel(x_offset, y_offset, duration=duration)
+
+    def set_cursor(self, x, y):
+        self._pyautogui.moveTo(x, y, _pause=False)
+
+    def click(self, button='left', clicks=1):
+        self._pyautogui.click(button=button, clicks=clicks)
+
+    def scroll(self, amount):
+        self._pyautogui.scroll(amount)
+
+    def press(self, key):
+        self._pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        self._pyautogui.hotkey(*keys)
+
+
+# Win32 SendInput structures for the native backend
+INPUT_MOUSE = 0
+INPUT_KEYBOARD = 1
+MOUSEEVENTF_MOVE = 0x0001
+MOUSEEVENTF_LEFTDOWN = 0x0002
+MOUSEEVENTF_LEFTUP = 0x0004
+MOUSEEVENTF_RIGHTDOWN = 0x0008
+MOUSEEVENTF_RIGHTUP = 0x0010
+MOUSEEVENTF_MIDDLEDOWN = 0x0020
+MOUSEEVENTF_MIDDLEUP = 0x0040
+MOUSEEVENTF_WHEEL = 0x0800
+MOUSEEVENTF_VIRTUALDESK = 0x4000
+MOUSEEVENTF_ABSOLUTE = 0x8000
+KEYEVENTF_EXTENDEDKEY = 0x0001
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+SM_XVIRTUALSCREEN = 76
+SM_YVIRTUALSCREEN = 77
+SM_CXVIRTUALSCREEN = 78
+SM_CYVIRTUALSCREEN = 79
+
+MOUSE_BUTTON_FLAGS = {
+    'left': (MOUSEEVENTF_LEFTDOWN, MOUSEEVENTF_LEFTUP),
+    'right': (MOUSEEVENTF_RIGHTDOWN, MOUSEEVENTF_RIGHTUP),
+    'middle': (MOUSEEVENTF_MIDDLEDOWN, MOUSEEVENTF_MIDDLEUP),
+}
+
+# Virtual-key codes for the key names accepted by pyautogui. Single printable
+# characters are resolved at runtime through VkKeyScanW.
+VIRTUAL_KEY_CODES = {
+    'backspace': 0x08, 'tab': 0x09, 'clear': 0x0C, 'enter': 0x0D, 'return': 0x0D,
+    'shift': 0x10, 'ctrl': 0x11, 'alt': 0x12, 'pause': 0x13, 'capslock': 0x14,
+    'esc': 0x1B, 'escape': 0x1B, 'space': 0x20, 'pgup': 0x21, 'pageup': 0x21,
+    'pgdn': 0x22, 'pagedown': 0x22, 'end': 0x23, 'home': 0x24, 'left': 0x25,
+    'up': 0x26, 'right': 0x27, 'down': 0x28, 'select': 0x29, 'print': 0x2A,
+    'execute': 0x2B, 'prtsc': 0x2C, 'prtscr': 0x2C, 'prntscrn': 0x2C,
+    'printscreen': 0x2C, 'insert': 0x2D, 'del': 0x2E, 'delete': 0x2E, 'help': 0x2F,
+    'win': 0x5B, 'winleft': 0x5B, 'super': 0x5B, 'winright': 0x5C, 'apps': 0x5D,
+    'sleep': 0x5F, 'multiply': 0x6A, 'add': 0x6B, 'separator': 0x6C,
+    'subtract': 0x6D, 'decimal': 0x6E, 'divide': 0x6F, 'numlock': 0x90,
+    'scrolllock': 0x91, 'shiftleft': 0xA0, 'shiftright': 0xA1, 'ctrlleft': 0xA2,
+    'ctrlright': 0xA3, 'altleft': 0xA4, 'altright': 0xA5,
+    'browserback': 0xA6, 'browserforward': 0xA7, 'browserrefresh': 0xA8,
+    'browserstop': 0xA9, 'browsersearch': 0xAA, 'browserfavorites': 0xAB,
+    'browserhome': 0xAC, 'volumemute': 0xAD, 'volumedown': 0xAE, 'volumeup': 0xAF,
+    'nexttrack': 0xB0, 'prevtrack': 0xB1, 'stop': 0xB2, 'playpause': 0xB3,
+}
+VIRTUAL_KEY_CODES.update({f'num{i}': 0x60 + i for i in range(10)})
+VIRTUAL_KEY_CODES.update({f'f{i}': 0x6F + i for i in range(1, 25)})
+
+# Keys that need KEYEVENTF_EXTENDEDKEY to be distinguished from the numpad
+EXTENDED_KEY_CODES = {0x21, 0x22, 0x23, 0x24, 0x25, 0x26, 0x27, 0x28, 0x2D, 0x2E,
+                      0x5B, 0x5C, 0x5D, 0x6F, 0x90, 0xA3, 0xA5}
+
+
+class MouseInput(ctypes.Structure):
+    _fields_ = [
+        ('dx', wintypes.LONG),
+        ('dy', wintypes.LONG),
+        ('mouseData', wintypes.DWORD),
+        ('dwFlags', wintypes.DWORD),
+        ('time', wintypes.DWORD),
+        ('dwExtraInfo', ctypes.c_size_t),
+    ]
+
+
+class KeyboardInput(ctypes.Structure):
+    _fields_ = [
+        ('wVk', wintypes.WORD),
+        ('wScan', wintypes.WORD),
+        ('dwFlags', wintypes.DWORD),
+        ('time', wintypes.DWORD),
+        ('dwExtraInfo', ctypes.c_size_t),
+    ]
+
+
+class HardwareInput(ctypes.Structure):
+    _fields_ = [
+        ('uMsg', wintypes.DWORD),
+        ('wParamL', wintypes.WORD),
+        ('wParamH', wintypes.WORD),
+    ]
+
+
+class _InputUnion(ctypes.Union):
+    _fields_ = [
+        ('mi', MouseInput),
+        ('ki', KeyboardInput),
+        ('hi', HardwareInput),
+    ]
+
+
+class Input(ctypes.Structure):
+    _fields_ = [
+        ('type', wintypes.DWORD),
+        ('union', _InputUnion),
+    ]
+
+
+class NativeWindowsBackend(InputBackend):
+    """Input backend calling SetCursorPos/SendInput directly through ctypes.
+
+    Avoids pyautogui's per-call bookkeeping (failsafe checks, implicit pause)
+    and submits every event batch, down to a single click or key chord, as
+    one SendInput call.
+    """
+    name = "native"
+    moves_reset_idle = False
+    move_interval = 0.01  # Seconds between tween steps
+
+    def __init__(self):
+        self._user32 = ctypes.windll.user32
+        self._user32.SendInput.argtypes = (wintypes.UINT, ctypes.POINTER(Input), ctypes.c_int)
+        self._user32.SendInput.restype = wintypes.UINT
+
+    def position(self):
+        point = wintypes.POINT()
+        self._user32.GetCursorPos(ctypes.byref(point))
+        return point.x, point.y
+
+    def size(self):
+        return self._user32.GetSystemMetrics(0), self._user32.GetSystemMetrics(1)
+
+    def move_to(self, x, y, duration=0.0):
+        x, y = int(x), int(y)
+        if duration > 0:
+            start_x, start_y = self.position()
+            steps = max(1, int(duration / self.move_interval))
+            start = time.perf_counter()
+            for step in range(1, steps):
+                progress = step / steps
+                self._user32.SetCursorPos(int(start_x + (x - start_x) * progress),
+                                          int(start_y + (y - start_y) * progress))
+                # Against absolute deadlines, so per-step overhead does not stretch the move
+                time.sleep(max(0.0, start + duration * (step + 1) / steps - time.perf_counter()))
+        self._user32.SetCursorPos(x, y)
+
+    def set_cursor(self, x, y):
+        self._user32.SetCursorPos(int(x), int(y))
+
+    def click(self, button='left', clicks=1):
+        self.send([('click', button, clicks)])
+
+    def scroll(self, amount):
+        self.send([('scroll', amount)])
+
+    def press(self, key):
+        self.send([('press', key)])
+
+    def hotkey(self, *keys):
+        self.send([('hotkey',) + keys])
+
+    def send(self, events):
+        inputs = []
+        for kind, *args in events:
+            inputs.extend(self._event_inputs(kind, args))
+        self._send(inputs)
+
+    def _event_inputs(self, kind, args):
+        """Build the Input records for one batch event"""
+        if kind == 'move_to':
+            return [self._move_input(*args)]
+        if kind == 'click':
+            button, clicks = args
+            down, up = MOUSE_BUTTON_FLAGS[button]
+            return [self._mouse_input(flags) for _ in range(clicks) for flags in (down, up)]
+        if kind == 'scroll':
+            # Matches pyautogui, which passes the amount through as raw wheel data
+            return [self._mouse_input(MOUSEEVENTF_WHEEL, int(args[0]))]
+        if kind in ('press', 'hotkey'):
+            down = []
+            for key in args:
+                down.extend(self._key_inputs(key))
+            up = []
+            for key in reversed(args):
+                up.extend(self._key_inputs(key, key_up=True))
+            return down + up
+        raise ValueError(f"Unknown input event: {kind}")
+
+    def _mouse_input(self, flags, data=0, dx=0, dy=0):
+        event = Input(type=INPUT_MOUSE)
+        event.union.mi = MouseInput(dx, dy, data & 0xFFFFFFFF, flags, 0, 0)
+        return event
+
+    def _move_input(self, x, y):
+        """Absolute move, in the 0-65535 virtual desktop coordinates SendInput expects"""
+        metrics = self._user32.GetSystemMetrics
+        left, top = metrics(SM_XVIRTUALSCREEN), metrics(SM_YVIRTUALSCREEN)
+        width, height = metrics(SM_CXVIRTUALSCREEN), metrics(SM_CYVIRTUALSCREEN)
+        dx = round((int(x) - left) * 65535 / max(1, width - 1))
+        dy = round((int(y) - top) * 65535 / max(1, height - 1))
+        return self._mouse_input(MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK,
+                                 dx=dx, dy=dy)
+
+    def _key_inputs(self, key, key_up=False):
+        """Build the Input records for pressing or releasing a single key"""
+        flags = KEYEVENTF_KEYUP if key_up else 0
+        name = key.lower() if len(key) > 1 else key
+        if name in VIRTUAL_KEY_CODES:
+            return [self._vk_input(VIRTUAL_KEY_CODES[name], flags)]
+        if len(key) != 1:
+            raise ValueError(f"Unknown key: {key}")
+
+        scan = self._user32.VkKeyScanW(ord(key)) & 0xFFFF
+        if scan == 0xFFFF:
+            # No key on the current layout produces this character; type it as unicode
+            event = Input(type=INPUT_KEYBOARD)
+            event.union.ki = KeyboardInput(0, ord(key), flags | KEYEVENTF_UNICODE, 0, 0)
+            return [event]
+
+        vk, shift_state = scan & 0xFF, scan >> 8
+        modifiers = [vk_mod for bit, vk_mod in ((1, 0x10), (2, 0x11), (4, 0x12))
+                     if shift_state & bit]
+        if key_up:
+            modifiers.reverse()
+            return [self._vk_input(vk, flags)] + [self._vk_input(m, flags) for m in modifiers]
+        return [self._vk_input(m, flags) for m in modifiers] + [self._vk_input(vk, flags)]
+
+    def _vk_input(self, vk, flags):
+        if vk in EXTENDED_KEY_CODES:
+            flags |= KEYEVENTF_EXTENDEDKEY
+        event = Input(type=INPUT_KEYBOARD)
+        event.union.ki = KeyboardInput(vk, 0, flags, 0, 0)
+        return event
+
+    def _send(self, inputs):
+        if not inputs:
+            return
+        array = (Input * len(inputs))(*inputs)
+        sent = self._user32.SendInput(len(inputs), array, ctypes.sizeof(Input))
+        if sent != len(inputs):
+            raise ctypes.WinError()
+
+
+class NullBackend(InputBackend):
+    """Input backend that injects nothing.
+
+    Keeps a virtual cursor so relative moves behave consistently. Durations
+    are only slept through when `realtime` is set.
+    """
+    name = "null"
+    moves_reset_idle = False
+
+    def __init__(self, screen_size=(1920, 1080), position=None, realtime=False):
+        self.screen_size = tuple(screen_size)
+        self.cursor = tuple(position) if position else (screen_size[0] // 2, screen_size[1] // 2)
+        self.realtime = realtime
+
+    def position(self):
+        return self.cursor
+
+    def size(self):
+        return self.screen_size
+
+    def move_to(self, x, y, duration=0.0):
+        if self.realtime and duration > 0:
+            time.sleep(duration)
+        self.cursor = (int(x), int(y))
+
+    def set_cursor(self, x, y):
+        self.cursor = (int(x), int(y))
+
+    def click(self, button='left', clicks=1):
+        pass
+
+    def scroll(self, amount):
+        pass
+
+    def press(self, key):
+        pass
+
+    def hotkey(self, *keys):
+        pass
+
+
+class RecordingBackend(NullBackend):
+    """Null backend that keeps the injected event stream in memory.
+
+    Each event is stored as a `(timestamp, kind, args)` tuple, with the
+    timestamp taken from `clock` (time.perf_counter() unless replaced)
+    relative to creation (or the last `clear()`).
+    """
+    name = "recording"
+
+    def __init__(self, screen_size=(1920, 1080), position=None, realtime=False):
+        super().__init__(screen_size, position, realtime)
+        self.events = []
+        self.clock = time.perf_counter
+        self._start = self.clock()
+
+    def clear(self):
+        self.events = []
+        self._start = self.clock()
+
+    def _record(self, kind, *args):
+        self.events.append((self.clock() - self._start, kind, args))
+
+    def move_to(self, x, y, duration=0.0):
+        super().move_to(x, y, duration)
+        self._record('move_to', self.cursor[0], self.cursor[1], duration)
+
+    def set_cursor(self, x, y):
+        super().set_cursor(x, y)
+        self._record('set_cursor', self.cursor[0], self.cursor[1])
+
+    def click(self, button='left', clicks=1):
+        self._record('click', button, clicks)
+
+    def scroll(self, amount):
+        self._record('scroll', amount)
+
+    def press(self, key):
+        self._record('press', key)
+
+    def hotkey(self, *keys):
+        self._record('hotkey', *keys)
+
+    def send(self, events):
+        """Record the whole batch as a single ('send', *events) entry"""
+        for kind, *args in events:
+            if kind == 'move_to':
+                self.cursor = (int(args[0]), int(args[1]))
+        self._record('send', *events)
+
+
+INPUT_BACKENDS = {
+    PyAutoGUIBackend.name: PyAutoGUIBackend,
+    NativeWindowsBackend.name: NativeWindowsBackend,
+    NullBackend.name: NullBackend,
+    RecordingBackend.name: RecordingBackend,
+}
+
+_input_backend = None
+
+
+def create_input_backend(name=DEFAULT_INPUT_BACKEND):
+    """Create an input backend by name.
+
+    The MAGICSCRIPT_INPUT_BACKEND environment variable overrides `name`.
+    "auto" picks the native backend on Windows and pyautogui elsewhere.
+    """
+    name = os.environ.get(INPUT_BACKEND_ENV) or name or DEFAULT_INPUT_BACKEND
+    if name == "auto":
+        name = NativeWindowsBackend.name if sys.platform == "win32" else PyAutoGUIBackend.name
+    if name not in INPUT_BACKENDS:
+        raise ValueError(f"Unknown input backend: {name}")
+    return INPUT_BACKENDS[name]()
+
+
+def get_input_backend():
+    """Return the process-wide input backend, creating the default on first use"""
+    global _input_backend
+    if _input_backend is None:
+        _input_backend = create_input_backend()
+        logger.info("Using input backend: %s", _input_backend.name)
+    return _input_backend
+
+
+def set_input_backend(backend):
+    """Replace the process-wide input backend (accepts a name or an instance)"""
+    global _input_backend
+    if isinstance(backend, str):
+        backend = create_input_backend(backend)
+    _input_backend = backend
+    logger.info("Using input backend: %s", backend.name)
+    return backend
+
+# Typed action params
+class ActionParams:
+    """Slotted params record; subclasses list the fields of one ActionType.
+
+    Stands in for the params dict (get, [], in, items, ...), but only the
+    fields that are actually set take up space and there is no per-instance
+    dict. Keys outside the schema are kept in `extra`, so converting to and
+    from the JSON schema is lossless. Item assignment is for filling a record
+    before it is given to an Action; the record is not edited after that.
+    """
+    __slots__ = ('extra', '_mask')
+    FIELDS = ()
+    _slot_of = {}  # Field name -> (slot attribute, bit in _mask)
+    _layouts = {}  # _mask -> ((field, slot), ...) of the fields it sets
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        slots = _param_slots(cls.FIELDS)
+        cls._slot_of = {field: (slot, 1 << index)
+                        for index, (field, slot) in enumerate(zip(cls.FIELDS, slots))}
+        cls._layouts = {}
+
+    def __init__(self, data=None):
+        self.extra = None
+        self._mask = 0
+        if data:
+            slot_of = self._slot_of
+            for key, value in data.items():
+                entry = slot_of.get(key)
+                if entry is None:
+                    if self.extra is None:
+                        self.extra = {}
+                    self.extra[key] = value
+                else:
+                    setattr(self, entry[0], value)
+                    self._mask |= entry[1]
+
+    def _layout(self):
+        layout = self._layouts.get(self._mask)
+        if layout is None:
+            layout = self._layouts[self._mask] = tuple(
+                (field, slot) for field, (slot, bit) in self._slot_of.items() if self._mask & bit)
+        return layout
+
+    def get(self, key, default=None):
+        entry = self._slot_of.get(key)
+        if entry is not None:
+            return getattr(self, entry[0], default)
+        return self.extra.get(key, default) if self.extra else default
+
+    def __getitem__(self, key):
+        entry = self._slot_of.get(key)
+        if entry is not None:
+            try:
+                return getattr(self, entry[0])
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        entry = self._slot_of.get(key)
+        if entry is not None:
+            setattr(self, entry[0], value)
+            self._mask |= entry[1]
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        entry = self._slot_of.get(key)
+        if entry is not None and self._mask & entry[1]:
+            delattr(self, entry[0])
+            self._mask &= ~entry[1]
+        elif entry is None and self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        entry = self._slot_of.get(key)
+        if entry is not None:
+            return bool(self._mask & entry[1])
+        return bool(self.extra) and key in self.extra
+
+    def keys(self):
+        keys = [field for field, _ in self._layout()]
+        if self.extra:
+            keys.extend(self.extra)
+        return keys
+
+    def items(self):
+        items = [(field, getattr(self, slot)) for field, slot in self._layout()]
+        if self.extra:
+            items.extend(self.extra.items())
+        return items
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return bin(self._mask).count('1') + (len(self.extra) if self.extra else 0)
+
+    def __eq__(self, other):
+        if isinstance(other, (ActionParams, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def to_dict(self):
+        data = {field: getattr(self, slot) for field, slot in self._layout()}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def copy(self):
+        return type(self)(self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def _param_slots(fields):
+    """Slot names for `fields`; one that clashes with a method (e.g. 'keys') gets a trailing _"""
+    return tuple(field + '_' if hasattr(ActionParams, field) else field for field in fields)
+
+
+class MouseMoveParams(ActionParams):
+    FIELDS = ('move_type', 'x', 'y', 'x_min', 'x_max', 'y_min', 'y_max',
+              'x_offset', 'y_offset', 'x_offset_min', 'x_offset_max',
+              'y_offset_min', 'y_offset_max', 'duration', 'curve')
+    __slots__ = _param_slots(FIELDS)
+
+
+class MouseClickParams(ActionParams):
+    FIELDS = ('button', 'clicks')
+    __slots__ = _param_slots(FIELDS)
+
+
+class MouseScrollParams(ActionParams):
+    FIELDS = ('scroll_type', 'amount', 'min_amount', 'max_amount')
+    __slots__ = _param_slots(FIELDS)
+
+
+class KeyPressParams(ActionParams):
+    FIELDS = ('key',)
+    __slots__ = _param_slots(FIELDS)
+
+
+class KeyCombinationParams(ActionParams):
+    FIELDS = ('keys',)
+    __slots__ = _param_slots(FIELDS)
+
+
+class WaitParams(ActionParams):
+    FIELDS = ('seconds',)
+    __slots__ = _param_slots(FIELDS)
+
+
+PARAM_TYPES = {
+    ActionType.MOUSE_MOVE: MouseMoveParams,
+    ActionType.MOUSE_CLICK: MouseClickParams,
+    ActionType.MOUSE_SCROLL: MouseScrollParams,
+    ActionType.KEY_PRESS: KeyPressParams,
+    ActionType.KEY_COMBINATION: KeyCombinationParams,
+    ActionType.WAIT: WaitParams,
+}
+
+
+def make_params(action_type, params=None):
+    """Return `params` (a dict or any ActionParams) as the record type for `action_type`"""
+    cls = PARAM_TYPES.get(action_type, ActionParams)
+    if type(params) is cls:
+        return params
+    return cls(params)
+
 
 # Action class to represent a macro action
 class Action:
+    """One macro step, read-only once built.
+
+    Published MacroSnapshots share their actions, so an edit builds a new
+    Action instead of changing the type or params of this one.
+    """
+    __slots__ = ('_action_type', '_params', 'name', '_display_name', '_tooltip')
+
     def __init__(self, action_type, params=None, name=None):
-        self.action_type = action_type
-        self.params = params or {}
-        self.name = name or self.generate_name()
-        
+        self._action_type = action_type
+        self._params = make_params(action_type, params)
+        # Interned so that the many identical names of a recorded macro share one string
+        self.name = sys.intern(name or self.generate_name())
+        # Display text, filled on first use
+        self._display_name = None
+        self._tooltip = None
+
+    @property
+    def action_type(self):
+        return self._action_type
+
+    @property
+    def params(self):
+        return self._params
+
+    def display_name(self):
+        """generate_name(), cached on first use"""
+        if self._display_name is None:
+            self._display_name = self.generate_name()
+        return self._display_name
+
+    def tooltip(self):
+        """Type and params summary for the action list, cached on first use"""
+        if self._tooltip is None:
+            action_type = self._action_type.name.replace('_', ' ').title()
+            params = ', '.join([f"{k}: {v}" for k, v in self._params.items()])
+            self._tooltip = f"Type: {action_type}\nParameters: {params}"
+        return self._tooltip
+
     def generate_name(self):
         if self.action_type == ActionType.MOUSE_MOVE:
             move_type = self.params.get('move_type', 0)
@@ -175,141 +1260,64 @@ class Action:
 
         return "Unknown action"
     
-    def execute(self):
+    def compile(self):
+        """Resolve params once and return a step callable taking a RunContext"""
+        emit = self.compile_events()
+        if emit is not None:
+            return _events_step(emit)
+        compiler = STEP_COMPILERS.get(self.action_type)
+        if compiler is None:
+            return _noop_step
+        return compiler(self.params)
+
+    def compile_events(self):
+        """Resolve params once and return an emitter adding this action's input
+        to an InputBatch, or None if the action needs a step of its own"""
+        compiler = EVENT_COMPILERS.get(self.action_type)
+        if compiler is None:
+            return None
+        return compiler(self.params)
+
+    def execute(self, backend=None, cancel_token=None):
         try:
             # Wrap the entire execution in a try-except to catch any unexpected errors
             try:
-                if self.action_type == ActionType.MOUSE_MOVE:
-                    duration = self.params.get('duration', 0.5)
-                    move_type = self.params.get('move_type', 0)
-
-                    logger.debug(f"Executing mouse move action with type {move_type} and params: {self.params}")
-
-                    # Determine coordinates based on movement type
-                    if move_type == 0:  # Specific Coordinates
-                        x = self.params.get('x', 500)
-                        y = self.params.get('y', 500)
-                        logger.info(f"Moving mouse to absolute position ({x}, {y}) with duration {duration}")
-                        pyautogui.moveTo(x, y, duration=duration)
-
-                    elif move_type == 1:  # Random in Range
-                        x_min = self.params.get('x_min', 0)
-                        x_max = self.params.get('x_max', 1000)
-                        y_min = self.params.get('y_min', 0)
-                        y_max = self.params.get('y_max', 1000)
-
-                        # Ensure min <= max
-                        if x_min > x_max:
-                            x_min, x_max = x_max, x_min
-                        if y_min > y_max:
-                            y_min, y_max = y_max, y_min
-
-                        x = random.randint(x_min, x_max)
-                        y = random.randint(y_min, y_max)
-                        logger.info(f"Moving mouse to random position in range ({x}, {y}) with duration {duration}")
-                        pyautogui.moveTo(x, y, duration=duration)
-
-                    elif move_type == 3:  # Relative to Current Position
-                        x_offset = self.params.get('x_offset', 50)
-                        y_offset = self.params.get('y_offset', 50)
-                        current_x, current_y = pyautogui.position()
-                        new_x = current_x + x_offset
-                        new_y = current_y + y_offset
-                        logger.info(f"Moving mouse from ({current_x}, {current_y}) to relative position ({new_x}, {new_y}) with offset ({x_offset}, {y_offset})")
-                        pyautogui.moveRel(x_offset, y_offset, duration=duration)
-
-                    elif move_type == 4:  # Random Range from Current Position
-                        # Get parameters with defaults
-                        x_offset_min = int(self.params.get('x_offset_min', -50))
-                        x_offset_max = int(self.params.get('x_offset_max', 50))
-                        y_offset_min = int(self.params.get('y_offset_min', -50))
-                        y_offset_max = int(self.params.get('y_offset_max', 50))
-
-                        # Ensure min <= max
-                        if x_offset_min > x_offset_max:
-                            x_offset_min, x_offset_max = x_offset_max, x_offset_min
-                        if y_offset_min > y_offset_max:
-                            y_offset_min, y_offset_max = y_offset_max, y_offset_min
-
-                        # Log the parameters for debugging
-                        logger.debug(f"Random range parameters: X: {x_offset_min}-{x_offset_max}, Y: {y_offset_min}-{y_offset_max}")
-
-                        # Generate random offsets
-                        x_offset = random.randint(x_offset_min, x_offset_max)
-                        y_offset = random.randint(y_offset_min, y_offset_max)
-
-                        # Get current position
-                        current_x, current_y = pyautogui.position()
-                        new_x = current_x + x_offset
-                        new_y = current_y + y_offset
-
-                        logger.info(f"Moving mouse from ({current_x}, {current_y}) to random relative position ({new_x}, {new_y}) with offset ({x_offset}, {y_offset})")
-                        pyautogui.moveRel(x_offset, y_offset, duration=duration)
-
-                    else:  # Fully Random
-                        screen_width, screen_height = pyautogui.size()
-                        x = random.randint(0, screen_width)
-                        y = random.randint(0, screen_height)
-                        logger.info(f"Moving mouse to fully random position ({x}, {y}) with duration {duration}")
-                        pyautogui.moveTo(x, y, duration=duration)
-
-                elif self.action_type == ActionType.MOUSE_CLICK:
-                    button = self.params.get('button', 'left')
-                    clicks = self.params.get('clicks', 1)
-                    logger.info(f"Clicking mouse button {button} {clicks} times")
-                    pyautogui.click(button=button, clicks=clicks)
-
-                elif self.action_type == ActionType.MOUSE_SCROLL:
-                    scroll_type = self.params.get('scroll_type', 0)
-
-                    if scroll_type == 0:  # Fixed Amount
-                        amount = self.params.get('amount', 0)
-                    else:  # Random in Range
-                        min_amount = self.params.get('min_amount', -20)
-                        max_amount = self.params.get('max_amount', 20)
-
-                        # Ensure min <= max
-                        if min_amount > max_amount:
-                            min_amount, max_amount = max_amount, min_amount
-
-                        amount = random.randint(min_amount, max_amount)
-
-                    logger.info(f"Scrolling mouse by {amount} clicks")
-                    pyautogui.scroll(amount)
-
-                elif self.action_type == ActionType.KEY_PRESS:
-                    key = self.params.get('key', '')
-                    if key:
-                        logger.info(f"Pressing key: {key}")
-                        pyautogui.press(key)
-
-                elif self.action_type == ActionType.KEY_COMBINATION:
-                    keys = self.params.get('keys', [])
-                    if keys:
-                        logger.info(f"Pressing key combination: {'+'.join(keys)}")
-                        pyautogui.hotkey(*keys)
-
-                elif self.action_type == ActionType.WAIT:
-                    seconds = self.params.get('seconds', 1)
-                    logger.info(f"Waiting for {seconds} seconds")
-                    time.sleep(seconds)
-
+                if backend is None:
+                    backend = get_input_backend()
+                count, seconds, failures = ACTION_METRICS[self.action_type]
+                count.inc()
+                start = time.perf_counter()
+                try:
+                    self.compile()(RunContext(backend, cancel_token))
+                except MacroCancelled as e:
+                    logger.info("Stopping action %s: %s", self.name, e)
+                    return False
+                except Exception:
+                    failures.inc()
+                    raise
+                finally:
+                    end = time.perf_counter()
+                    seconds.observe(end - start)
+                    session = _profile_session
+                    if session is not None:
+                        session.add_span(self.name, "action", start, end)
                 return True
 
             except Exception as e:
                 # Catch and log any unexpected errors during execution
-                logger.error(f"Unexpected error executing action {self.name}: {e}", exc_info=True)
+                logger.error("Unexpected error executing action %s: %s", self.name, e,
+                             exc_info=True)
                 return False
 
         except Exception as e:
             # This is a fallback in case the inner try-except fails
-            logger.critical(f"Critical error in execute method: {e}", exc_info=True)
+            logger.critical("Critical error in execute method: %s", e, exc_info=True)
             return False
     
     def to_dict(self):
         return {
             'action_type': self.action_type.name,
-            'params': self.params,
+            'params': self.params.to_dict(),
             'name': self.name
         }
     
@@ -322,7 +1330,7 @@ class Action:
             elif isinstance(data.get('action_type'), ActionType):
                 action_type = data['action_type']
             else:
-                logger.error(f"Invalid action_type in data: {data.get('action_type')}")
+                logger.error("Invalid action_type in data: %s", data.get('action_type'))
                 # Default to WAIT as a safe fallback
                 action_type = ActionType.WAIT
 
@@ -334,116 +1342,3291 @@ class Action:
 
             return cls(action_type, params, name)
         except Exception as e:
-            logger.error(f"Error creating Action from dict: {e}, data: {data}")
+            logger.error("Error creating Action from dict: %s, data: %s", e, data)
             # Return a safe default action
             return cls(ActionType.WAIT, {'seconds': 1}, "Error recovery action")
 
 
-# Configuration manager
-class ConfigManager:
-    def __init__(self, config_file=CONFIG_FILE):
-        self.config_file = config_file
-        self.config = self.load_config()
-        # Ensure actions are properly converted to Action objects
-        self._normalize_actions()
-        
-    def load_config(self):
-        default_config = {
-            'idle_time': DEFAULT_IDLE_TIME,
-            'actions': [],
-            'enabled': True,
-            'run_on_startup': False,
-            'random_delay': False,
-            'random_delay_min': 0,
-            'random_delay_max': 30
-        }
-        
+# Validation
+#
+# The same checks the action dialog makes, plus type checks for params that
+# were written by hand or by another tool, for validating macro files
+# without the GUI.
+MOUSE_BUTTONS = ('left', 'right', 'middle')
+MOVE_TYPE_COUNT = 5  # Specific, random in range, fully random, relative, random relative
+TEXT_PARAMS = {'curve', 'button', 'key', 'keys'}
+RANGE_PARAMS = {
+    ActionType.MOUSE_MOVE: (('x_min', 'x_max', 0, 1000, "X"), ('y_min', 'y_max', 0, 1000, "Y"),
+                            ('x_offset_min', 'x_offset_max', -50, 50, "X offset"),
+                            ('y_offset_min', 'y_offset_max', -50, 50, "Y offset")),
+    ActionType.MOUSE_SCROLL: (('min_amount', 'max_amount', -20, 20, "Scroll"),),
+}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_action(action):
+    """Problems with an Action's params, as a list of messages (empty when valid)"""
+    action_type, params = action.action_type, action.params
+    problems = [f"unknown param '{key}'" for key in (params.extra or ())]
+    for key, value in params.items():
+        if key not in TEXT_PARAMS and not _is_number(value):
+            problems.append(f"'{key}' must be a number, not {value!r}")
+    if problems:
+        return problems
+
+    if action_type == ActionType.MOUSE_MOVE:
+        if params.get('move_type', 0) not in range(MOVE_TYPE_COUNT):
+            problems.append(f"unknown move_type {params.get('move_type')!r}")
+        if params.get('duration', 0.5) < 0:
+            problems.append("duration must not be negative")
+        if params.get('curve', DEFAULT_MOUSE_CURVE) not in MOUSE_CURVES:
+            problems.append(f"unknown curve {params.get('curve')!r}")
+    elif action_type == ActionType.MOUSE_CLICK:
+        if params.get('button', 'left') not in MOUSE_BUTTONS:
+            problems.append(f"unknown button {params.get('button')!r}")
+        if params.get('clicks', 1) < 1:
+            problems.append("clicks must be at least 1")
+    elif action_type == ActionType.KEY_PRESS:
+        if not params.get('key') or not isinstance(params.get('key'), str):
+            problems.append("no key given")
+    elif action_type == ActionType.KEY_COMBINATION:
+        keys = params.get('keys')
+        if (not keys or not isinstance(keys, list)
+                or not all(key and isinstance(key, str) for key in keys)):
+            problems.append("keys must be a non-empty list of key names")
+    elif action_type == ActionType.WAIT:
+        if params.get('seconds', 1) < 0:
+            problems.append("seconds must not be negative")
+
+    for low_key, high_key, low_default, high_default, label in RANGE_PARAMS.get(action_type, ()):
+        if params.get(low_key, low_default) > params.get(high_key, high_default):
+            problems.append(f"{label} minimum must be less than or equal to {label} maximum")
+
+    if not problems:
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    # Ensure all default keys exist
-                    for key, value in default_config.items():
-                        if key not in config:
-                            config[key] = value
-                    return config
+            action.compile()
         except Exception as e:
-            logger.error(f"Error loading config: {e}")
-            
-        return default_config
-    
-    def save_config(self):
+            problems.append(f"cannot be compiled: {e}")
+    return problems
+
+
+def validate_action_data(data):
+    """Problems with one action in the config schema (a dict), before it becomes an Action.
+
+    Action.from_dict quietly falls back to a WAIT for unusable data; this
+    reports it instead.
+    """
+    if not isinstance(data, dict):
+        return [f"expected an object, not {type(data).__name__}"]
+    action_type = data.get('action_type')
+    if not isinstance(action_type, str) or action_type not in ActionType.__members__:
+        return [f"unknown action_type {action_type!r}"]
+    params = data.get('params', {})
+    if not isinstance(params, dict):
+        return ["params must be an object"]
+    return validate_action(Action(ActionType[action_type], params, data.get('name')))
+
+
+# Every schema field, in a fixed order; bit i of a column store mask stands for COLUMN_FIELDS[i]
+COLUMN_FIELDS = tuple(dict.fromkeys(field for cls in PARAM_TYPES.values() for field in cls.FIELDS))
+COLUMN_FIELD_INDEX = {field: index for index, field in enumerate(COLUMN_FIELDS)}
+MAX_EXACT_INT = 2 ** 53  # Larger ints do not survive a round trip through a double
+GENERATED_NAME = 0xFFFFFFFF  # Name index of rows whose name is the generated one
+
+
+class ActionColumnStore:
+    """Array-backed storage for long action sequences such as recorded macros.
+
+    Each action is one row across a few typed arrays: its type, an index into
+    a pool of distinct custom names (generated names are not stored), a
+    bitmask of the numeric fields it sets (see COLUMN_FIELDS), a bitmask of
+    which of those are ints, and an offset into one shared float64 value
+    array. Strings, lists and keys outside the schema go to a side table.
+    Rows come back out as Action objects, equal to the ones that went in.
+    """
+
+    def __init__(self, actions=()):
+        self._types = array('B')
+        self._names = array('I')
+        self._present = array('I')
+        self._ints = array('I')
+        self._offsets = array('I', [0])
+        self._values = array('d')
+        self._name_pool = []
+        self._name_index = {}
+        self._objects = {}  # row -> {key: value} for params that are not plain numbers
+        for action in actions:
+            self.append(action)
+
+    def __len__(self):
+        return len(self._types)
+
+    def append(self, action):
+        row = len(self._types)
+        if action.name == action.generate_name():
+            name_index = GENERATED_NAME
+        else:
+            name_index = self._name_index.get(action.name)
+            if name_index is None:
+                name_index = self._name_index[action.name] = len(self._name_pool)
+                self._name_pool.append(action.name)
+
+        numbers = []
+        objects = None
+        for key, value in action.params.items():
+            index = COLUMN_FIELD_INDEX.get(key)
+            kind = type(value)
+            exact = kind is float or (kind is int and -MAX_EXACT_INT <= value <= MAX_EXACT_INT)
+            if index is not None and exact:
+                numbers.append((index, value))
+            else:
+                if objects is None:
+                    objects = self._objects[row] = {}
+                objects[key] = value
+
+        present = ints = 0
+        numbers.sort()
+        for index, value in numbers:
+            present |= 1 << index
+            if type(value) is int:
+                ints |= 1 << index
+            self._values.append(value)
+
+        self._types.append(action.action_type.value)
+        self._names.append(name_index)
+        self._present.append(present)
+        self._ints.append(ints)
+        self._offsets.append(len(self._values))
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        values = self._values
+        offset = self._offsets[row]
+        present, ints = self._present[row], self._ints[row]
+        params = {}
+        while present:
+            bit = present & -present
+            index = bit.bit_length() - 1
+            value = values[offset]
+            params[COLUMN_FIELDS[index]] = int(value) if ints & bit else value
+            offset += 1
+            present ^= bit
+        objects = self._objects.get(row)
+        if objects:
+            params.update(objects)
+        name_index = self._names[row]
+        name = None if name_index == GENERATED_NAME else self._name_pool[name_index]
+        return Action(ActionType(self._types[row]), params, name)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def to_dicts(self):
+        return [action.to_dict() for action in self]
+
+    @classmethod
+    def from_dicts(cls, data):
+        return cls(Action.from_dict(item) for item in data)
+
+    def nbytes(self):
+        """Approximate memory held by the store (arrays, name pool and side table)"""
+        arrays = (self._types, self._names, self._present, self._ints, self._offsets, self._values)
+        size = sum(sys.getsizeof(column) for column in arrays)
+        size += sys.getsizeof(self._name_pool)
+        size += sum(sys.getsizeof(name) for name in self._name_pool)
+        size += sys.getsizeof(self._objects)
+        size += sum(sys.getsizeof(objects) for objects in self._objects.values())
+        return size
+
+
+# Binary macro files
+#
+# A .msmacro file stores an action list in the ActionColumnStore layout so it
+# can be memory-mapped and run in place. All integers are little-endian:
+#
+#   header        MACRO_FILE_HEADER (magic, version, record size, counts and
+#                 section offsets)
+#   records       one fixed-width record per action: six uint32 (type, name,
+#                 objects, present, ints, value offset)
+#   values        float64 numeric params, referenced by the record's offset
+#                 and its `present` bitmask
+#   string pool   uint32 offsets (count + 1) followed by UTF-8 data; holds the
+#                 field names (bit i of `present` is string i), custom action
+#                 names and the JSON of params that are not plain numbers
+MACRO_FILE_EXTENSION = ".msmacro"
+MACRO_FILE_MAGIC = b"MSMACRO\0"
+MACRO_FILE_VERSION = 1
+MACRO_FILE_HEADER = struct.Struct('<8sHHIIIQQQQ')
+MACRO_RECORD_FIELDS = 6
+MACRO_RECORD_SIZE = MACRO_RECORD_FIELDS * 4
+NO_STRING = 0xFFFFFFFF  # String index of records without a custom name or object params
+
+
+def _little_endian(column):
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def write_macro_file(path, actions):
+    """Write `actions` (Actions or an ActionColumnStore) to a .msmacro file, atomically"""
+    store = actions if isinstance(actions, ActionColumnStore) else ActionColumnStore(actions)
+    count = len(store)
+
+    strings = list(COLUMN_FIELDS)
+    names_base = len(strings)
+    strings.extend(store._name_pool)
+    objects = array('I', [NO_STRING]) * count
+    object_index = {}
+    for row, row_objects in store._objects.items():
+        text = json.dumps(row_objects, separators=(',', ':'))
+        index = object_index.get(text)
+        if index is None:
+            index = object_index[text] = len(strings)
+            strings.append(text)
+        objects[row] = index
+
+    records = array('I', bytes(MACRO_RECORD_SIZE * count))
+    records[0::MACRO_RECORD_FIELDS] = array('I', store._types)
+    records[1::MACRO_RECORD_FIELDS] = array('I', (
+        index if index == GENERATED_NAME else index + names_base for index in store._names))
+    records[2::MACRO_RECORD_FIELDS] = objects
+    records[3::MACRO_RECORD_FIELDS] = store._present
+    records[4::MACRO_RECORD_FIELDS] = store._ints
+    records[5::MACRO_RECORD_FIELDS] = store._offsets[:-1]
+
+    encoded = [text.encode('utf-8') for text in strings]
+    string_offsets = array('I', [0])
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+
+    records_offset = MACRO_FILE_HEADER.size
+    values_offset = records_offset + len(records) * 4
+    strings_offset = values_offset + len(store._values) * 8
+    header = MACRO_FILE_HEADER.pack(MACRO_FILE_MAGIC, MACRO_FILE_VERSION, MACRO_RECORD_SIZE, count,
+                                    len(COLUMN_FIELDS), len(strings), records_offset, values_offset,
+                                    len(store._values), strings_offset)
+    write_file_atomic(path, b"".join([header, _little_endian(records),
+                                      _little_endian(store._values),
+                                      _little_endian(string_offsets)] + encoded))
+
+
+class MacroFile:
+    """A .msmacro file, memory-mapped read-only.
+
+    Records are read straight from the mapping: len(), get() and
+    execute_macro_file() work without building an Action per row, so opening
+    a file costs the same whatever its size. action(), iteration and
+    to_dicts() decode rows into Actions or the JSON schema when needed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"{path} is not a macro file") from None
+        self._strings = {}  # Decoded pool strings by index
+        self._objects = {}  # Parsed object params by pool index
         try:
-            # Convert actions to serializable format
-            config_copy = self.config.copy()
-            if 'actions' in config_copy:
-                serialized_actions = []
-                for action in config_copy['actions']:
-                    if isinstance(action, Action):
-                        serialized_actions.append(action.to_dict())
-                    elif isinstance(action, dict):
-                        # If it's already a dict, keep it as is
-                        serialized_actions.append(action)
-                    else:
-                        logger.warning(f"Unknown action type: {type(action)}")
+            self._map_sections()
+        except Exception:
+            self.close()
+            raise
+
+    def _map_sections(self):
+        size = len(self._mmap)
+        if size < MACRO_FILE_HEADER.size:
+            raise ValueError(f"{self.path} is not a macro file")
+        (magic, version, record_size, count, field_count, string_count, records_offset,
+         values_offset, value_count, strings_offset) = MACRO_FILE_HEADER.unpack_from(self._mmap)
+        if magic != MACRO_FILE_MAGIC:
+            raise ValueError(f"{self.path} is not a macro file")
+        if version != MACRO_FILE_VERSION or record_size != MACRO_RECORD_SIZE:
+            raise ValueError(f"Unsupported macro file version {version} in {self.path}")
+        if sys.byteorder == 'big':
+            raise ValueError("Macro files can only be mapped on little-endian machines")
+
+        records_end = records_offset + count * MACRO_RECORD_SIZE
+        values_end = values_offset + value_count * 8
+        string_data = strings_offset + (string_count + 1) * 4
+        if max(records_end, values_end, string_data) > size or field_count > min(string_count, 32):
+            raise ValueError(f"{self.path} is truncated or corrupt")
+
+        with memoryview(self._mmap) as view:
+            self._records = view[records_offset:records_end].cast('I')
+            self._values = view[values_offset:values_end].cast('d')
+            self._string_offsets = view[strings_offset:string_data].cast('I')
+            self._string_data = view[string_data:]
+        if self._string_offsets[-1] > len(self._string_data):
+            raise ValueError(f"{self.path} is truncated or corrupt")
+        self._count = count
+        self.fields = tuple(self._string(index) for index in range(field_count))
+        self._bit_of = {field: 1 << index for index, field in enumerate(self.fields)}
+
+    def close(self):
+        for name in ('_records', '_values', '_string_offsets', '_string_data'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def _string(self, index):
+        text = self._strings.get(index)
+        if text is None:
+            start, end = self._string_offsets[index], self._string_offsets[index + 1]
+            text = self._strings[index] = str(self._string_data[start:end], 'utf-8')
+        return text
+
+    def _row_objects(self, row):
+        """Decoded non-numeric params of `row`, shared between rows; do not modify"""
+        index = self._records[row * MACRO_RECORD_FIELDS + 2]
+        if index == NO_STRING:
+            return None
+        objects = self._objects.get(index)
+        if objects is None:
+            objects = self._objects[index] = json.loads(self._string(index))
+        return objects
+
+    def type_code(self, row):
+        """ActionType value of `row`"""
+        return self._records[row * MACRO_RECORD_FIELDS]
+
+    def name(self, row):
+        """Custom name of `row`, or None when it uses the generated name"""
+        index = self._records[row * MACRO_RECORD_FIELDS + 1]
+        return None if index == GENERATED_NAME else self._string(index)
+
+    def get(self, row, field, default=None):
+        """Param `field` of `row`, read from the mapping"""
+        base = row * MACRO_RECORD_FIELDS
+        records = self._records
+        bit = self._bit_of.get(field, 0)
+        present = records[base + 3]
+        if present & bit:
+            value = self._values[records[base + 5] + bin(present & (bit - 1)).count('1')]
+            return int(value) if records[base + 4] & bit else value
+        objects = self._row_objects(row)
+        return objects.get(field, default) if objects else default
+
+    def params(self, row):
+        """All params of `row` as a new dict"""
+        base = row * MACRO_RECORD_FIELDS
+        records, values = self._records, self._values
+        present, ints, offset = records[base + 3], records[base + 4], records[base + 5]
+        params = {}
+        while present:
+            bit = present & -present
+            value = values[offset]
+            params[self.fields[bit.bit_length() - 1]] = int(value) if ints & bit else value
+            offset += 1
+            present ^= bit
+        if records[base + 2] != NO_STRING:
+            # Parsed again rather than copied from the cache, so lists are not shared
+            params.update(json.loads(self._string(records[base + 2])))
+        return params
+
+    def action(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("macro file row out of range")
+        return Action(ActionType(self.type_code(row)), self.params(row), self.name(row))
+
+    __getitem__ = action
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.action(row)
+
+    def to_dicts(self):
+        """The actions in the config JSON schema"""
+        return [action.to_dict() for action in self]
+
+
+def import_actions(path):
+    """Read an action list from a .msmacro or JSON file (a config, or a bare list of actions)"""
+    if path.lower().endswith(MACRO_FILE_EXTENSION):
+        with MacroFile(path) as macro:
+            return list(macro)
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('actions', [])
+    return [Action.from_dict(item) for item in data]
+
+
+def export_actions(path, actions):
+    """Write an action list as a .msmacro file, or as config-schema JSON for other extensions"""
+    if path.lower().endswith(MACRO_FILE_EXTENSION):
+        write_macro_file(path, actions)
+    else:
+        data = {'actions': [action.to_dict() for action in actions]}
+        write_file_atomic(path, json.dumps(data, indent=4))
+
+
+# Mouse path synthesis
+#
+# Animated moves are computed up front as a whole trajectory (one NumPy batch)
+# and handed to the input backend as a point array, instead of interpolating
+# and injecting one Python call at a time.
+MOUSE_CURVES = ('linear', 'ease', 'bezier', 'human')
+DEFAULT_MOUSE_CURVE = 'linear'
+MOUSE_PATH_RATE = 100  # Cursor updates per second during animated moves
+BEZIER_BEND = 0.25  # Max control point offset, as a fraction of the move length
+HUMAN_JITTER = 1.5  # Max standard deviation of hand tremor, in pixels
+
+
+def synthesize_path(start, end, duration, curve=DEFAULT_MOUSE_CURVE, rate=MOUSE_PATH_RATE,
+                    rng=None):
+    """Precompute an animated cursor path.
+
+    Returns `(points, times)`: an (N, 2) integer array of cursor positions
+    and the N matching time offsets in seconds, resampled to `rate` points
+    per second. The last point is exactly `end` and the last offset exactly
+    `duration`.
+
+    Curves:
+      linear  constant speed along a straight line
+      ease    straight line, accelerating and decelerating (smoothstep)
+      bezier  eased cubic Bezier arc with randomly bent control points
+      human   bezier plus small tremor that fades out at both ends
+    """
+    import numpy as np
+
+    if curve not in MOUSE_CURVES:
+        raise ValueError(f"Unknown mouse curve: {curve}")
+    if rng is None:
+        rng = np.random.default_rng()
+
+    count = max(1, int(round(duration * rate)))
+    times = np.linspace(duration / count, duration, count)
+    progress = times / duration if duration > 0 else np.ones(count)
+    if curve != 'linear':
+        progress = progress * progress * (3.0 - 2.0 * progress)
+
+    p0 = np.asarray(start, dtype=np.float64)
+    p3 = np.asarray(end, dtype=np.float64)
+    delta = p3 - p0
+    u = progress[:, None]
+
+    if curve in ('bezier', 'human'):
+        # Perpendicular to the move, with the same length
+        normal = np.array([-delta[1], delta[0]])
+        bend = rng.uniform(-BEZIER_BEND, BEZIER_BEND, 2)
+        c1 = p0 + delta * 0.3 + normal * bend[0]
+        c2 = p0 + delta * 0.7 + normal * bend[1]
+        v = 1.0 - u
+        path = v ** 3 * p0 + 3 * v ** 2 * u * c1 + 3 * v * u ** 2 * c2 + u ** 3 * p3
+    else:
+        path = p0 + delta * u
+
+    if curve == 'human':
+        sigma = min(HUMAN_JITTER, float(np.hypot(*delta)) * 0.01)
+        path += rng.normal(0.0, sigma, path.shape) * np.sin(np.pi * u)
+
+    points = np.rint(path).astype(np.int64)
+    points[-1] = p3
+    return points, times
+
+
+# Metrics
+#
+# A small in-process registry of counters, gauges and histograms, filled in
+# by the engine as macros run and written out by a MetricsExporter in the
+# Prometheus text format (for node_exporter's textfile collector or any
+# scraper that reads files) and as JSON.
+METRICS_FILE = "magic_script_metrics.prom"  # The JSON export goes next to it, as .json
+METRICS_EXPORT_INTERVAL = 60.0  # Seconds between metrics file writes
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)  # Seconds
+TIMING_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005, 0.01,
+                  0.025, 0.05, 0.1)  # Seconds, for jitter and drift
+
+# name: (kind, help, histogram buckets)
+METRIC_DEFINITIONS = {
+    'magicscript_info': ('gauge', "Always 1; labelled with the application version and host",
+                         None),
+    'magicscript_action_seconds': ('histogram',
+                                   "Time to run one step, by action type (BATCH for batched input)",
+                                   LATENCY_BUCKETS),
+    'magicscript_actions_total': ('counter', "Actions run, by action type", None),
+    'magicscript_action_failures_total': ('counter', "Steps that raised an error, by action type",
+                                          None),
+    'magicscript_backend_call_seconds': ('histogram', "Time spent in input backend calls, by call",
+                                         LATENCY_BUCKETS),
+    'magicscript_runs_total': ('counter', "Macro runs, by result (completed or cancelled)", None),
+    'magicscript_aborts_total': ('counter', "Cancelled macro runs, by reason", None),
+    'magicscript_run_seconds': ('histogram', "Duration of macro runs, by result", LATENCY_BUCKETS),
+    'magicscript_idle_trigger_seconds': (
+        'histogram', "Time from reaching the idle threshold to starting the macro",
+        LATENCY_BUCKETS),
+    'magicscript_step_jitter_seconds': ('histogram',
+                                        "How late steps started against their schedule",
+                                        TIMING_BUCKETS),
+    'magicscript_run_drift_seconds': ('histogram',
+                                      "How far past their scheduled end completed runs finished",
+                                      TIMING_BUCKETS),
+    'magicscript_last_run_timestamp_seconds': ('gauge', "Unix time the last macro run ended", None),
+    'magicscript_jobs_rejected_total': ('counter',
+                                        "Runs and tests refused because the run queue was full",
+                                        None),
+}
+
+
+class MetricValue:
+    """A counter or gauge"""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
 
-                config_copy['actions'] = serialized_actions
+    def set(self, value):
+        self.value = value
 
-            with open(self.config_file, 'w') as f:
-                json.dump(config_copy, f, indent=4)
+    def reset(self):
+        self.value = 0
+
+
+class Histogram:
+    """Bucketed observations; `counts[i]` counts values <= buckets[i] (not cumulative)"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets) + 1)  # The last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, count of values <= it) pairs, ending with +Inf"""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None when empty)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float('inf')
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+def _bound_text(bound):
+    return "+Inf" if bound == float('inf') else repr(float(bound))
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms keyed by metric name and label pairs.
+
+    Metrics must be listed in `definitions` (see METRIC_DEFINITIONS); labels
+    are passed as a tuple of (name, value) pairs, e.g.
+    `metrics.inc('magicscript_runs_total', (('result', 'completed'),))`.
+
+    Hot paths look a series up once with counter() or histogram() and keep
+    the returned object; updating it is a couple of attribute writes. Only
+    creating series is locked, so a series should have one writer at a time
+    (the macro thread, in practice) and an export may lag an observation.
+    reset() zeroes series in place, so kept objects stay valid.
+    """
+
+    def __init__(self, definitions=METRIC_DEFINITIONS):
+        self.definitions = definitions
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._series = {}  # (name, labels) -> MetricValue or Histogram
+
+    def _get(self, name, labels):
+        key = (name, labels)
+        series = self._series.get(key)
+        if series is None:
+            kind, _, buckets = self.definitions[name]
+            with self._lock:
+                series = self._series.get(key)
+                if series is None:
+                    series = Histogram(buckets) if kind == 'histogram' else MetricValue()
+                    self._series[key] = series
+        return series
+
+    def counter(self, name, labels=()):
+        """The MetricValue of a counter or gauge series, created on first use"""
+        return self._get(name, labels)
+
+    def histogram(self, name, labels=()):
+        """The Histogram of a histogram series, created on first use"""
+        return self._get(name, labels)
+
+    def inc(self, name, labels=(), amount=1):
+        self._get(name, labels).inc(amount)
+
+    def set(self, name, value, labels=()):
+        self._get(name, labels).set(value)
+
+    def observe(self, name, value, labels=()):
+        self._get(name, labels).observe(value)
+
+    def observe_many(self, name, values, labels=()):
+        observe = self._get(name, labels).observe
+        for value in values:
+            observe(value)
+
+    def series(self, name):
+        """{labels: MetricValue or Histogram} for every series of `name`"""
+        with self._lock:
+            return {labels: series for (series_name, labels), series in self._series.items()
+                    if series_name == name}
+
+    def reset(self):
+        with self._lock:
+            for series in self._series.values():
+                series.reset()
+
+    def _grouped(self):
+        """Copies of every series, grouped by metric name in definition order"""
+        with self._lock:
+            items = list(self._series.items())
+        copies = {}
+        for key, series in items:
+            if isinstance(series, Histogram):
+                copies[key] = (series.cumulative(), series.sum, series.count)
+            else:
+                copies[key] = series.value
+        grouped = []
+        for name, (kind, help_text, _) in self.definitions.items():
+            series = sorted((labels, value) for (series_name, labels), value in copies.items()
+                            if series_name == name)
+            if series:
+                grouped.append((name, kind, help_text, series))
+        return grouped
+
+    def to_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, kind, help_text, series in self._grouped():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                if kind != 'histogram':
+                    lines.append(f"{name}{_label_text(labels)} {value}")
+                    continue
+                buckets, total, count = value
+                for bound, cumulative in buckets:
+                    bucket_labels = _label_text(labels + (('le', _bound_text(bound)),))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{_label_text(labels)} {total}")
+                lines.append(f"{name}_count{_label_text(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        """All metrics as JSON-serializable data"""
+        exported = []
+        for name, kind, help_text, series in self._grouped():
+            entries = []
+            for labels, value in series:
+                entry = {'labels': dict(labels)}
+                if kind == 'histogram':
+                    buckets, total, count = value
+                    entry.update(buckets=[[_bound_text(bound), cumulative]
+                                          for bound, cumulative in buckets],
+                                 sum=total, count=count)
+                else:
+                    entry['value'] = value
+                entries.append(entry)
+            exported.append({'name': name, 'type': kind, 'help': help_text, 'series': entries})
+        return {'generated': time.time(), 'started': self.started, 'metrics': exported}
+
+    def summary(self):
+        """A few lines of plain text on macro health, for showing to the user"""
+        runs = {dict(labels)['result']: int(series.value)
+                for labels, series in self.series('magicscript_runs_total').items()}
+        lines = [f"Runs: {runs.get('completed', 0)} completed, "
+                 f"{runs.get('cancelled', 0)} cancelled"]
+        aborts = sorted((dict(labels)['reason'], int(series.value))
+                        for labels, series in self.series('magicscript_aborts_total').items()
+                        if series.value)
+        if aborts:
+            lines.append("Abort reasons: "
+                         + ", ".join(f"{reason} ({count})" for reason, count in aborts))
+        idle = self.series('magicscript_idle_trigger_seconds').get(())
+        if idle is not None and idle.count:
+            lines.append(f"Idle-to-trigger latency: mean {idle.sum / idle.count * 1000:.1f} ms")
+        drift = self.series('magicscript_run_drift_seconds').get(())
+        if drift is not None and drift.count:
+            lines.append(f"Run drift: mean {drift.sum / drift.count * 1000:.2f} ms")
+        failures = self.series('magicscript_action_failures_total')
+        for labels, histogram in sorted(self.series('magicscript_action_seconds').items()):
+            if not histogram.count:
+                continue
+            failed = int(failures[labels].value) if labels in failures else 0
+            lines.append(f"{dict(labels)['action_type']}: {histogram.count} steps, "
+                         f"mean {histogram.sum / histogram.count * 1000:.2f} ms, "
+                         f"p95 <= {histogram.quantile(0.95) * 1000:g} ms"
+                         + (f", {failed} failed" if failed else ""))
+        return "\n".join(lines)
+
+
+metrics = MetricsRegistry()  # Process-wide registry the engine reports to
+
+
+def _action_metrics(label):
+    """(actions run counter, step seconds histogram, failures counter) for one action type label"""
+    labels = (('action_type', label),)
+    return (metrics.counter('magicscript_actions_total', labels),
+            metrics.histogram('magicscript_action_seconds', labels),
+            metrics.counter('magicscript_action_failures_total', labels))
+
+
+# Resolved once, so that running a step only touches the series objects
+ACTION_METRICS = {action_type: _action_metrics(action_type.name) for action_type in ActionType}
+RECORD_METRICS = {action_type.value: series for action_type, series in ACTION_METRICS.items()}
+BATCH_METRICS = (None,  # Batched actions are counted under their own types
+                 metrics.histogram('magicscript_action_seconds', (('action_type', 'BATCH'),)),
+                 metrics.counter('magicscript_action_failures_total', (('action_type', 'BATCH'),)))
+SEND_SECONDS = metrics.histogram('magicscript_backend_call_seconds', (('call', 'send'),))
+
+
+def _record_run(ctx, completed):
+    """Report a finished run (its result, duration, timing and abort reason) to `metrics`"""
+    result = (('result', 'completed' if completed else 'cancelled'),)
+    timing = ctx.timing
+    metrics.inc('magicscript_runs_total', result)
+    metrics.observe('magicscript_run_seconds', time.perf_counter() - ctx.timeline_start, result)
+    metrics.set('magicscript_last_run_timestamp_seconds', time.time())
+    metrics.observe_many('magicscript_step_jitter_seconds', timing.jitter)
+    if completed:
+        metrics.observe('magicscript_run_drift_seconds', timing.drift)
+        _log_timing(timing)
+    else:
+        metrics.inc('magicscript_aborts_total', (('reason', ctx.cancel_token.reason),))
+
+
+def _host_name():
+    """This machine's network name, to tell machines apart in exported metrics"""
+    import platform
+    return platform.node()
+
+
+class MetricsExporter:
+    """Writes a MetricsRegistry to disk every `interval` seconds.
+
+    `path` gets the Prometheus text format and the same path with a .json
+    suffix the JSON form; both are replaced atomically. Runs on a daemon
+    thread; `close()` writes once more and stops it.
+    """
+
+    def __init__(self, registry=None, path=METRICS_FILE, interval=METRICS_EXPORT_INTERVAL):
+        self.registry = registry or metrics
+        self.path = path
+        self.json_path = os.path.splitext(path)[0] + ".json"
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.registry.set('magicscript_info', 1, (('version', APP_VERSION), ('host', _host_name())))
+        self._thread = threading.Thread(target=self._run, name="MetricsExporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self):
+        """Write both files now; returns False (and logs) on errors"""
+        try:
+            write_file_atomic(self.path, self.registry.to_prometheus())
+            write_file_atomic(self.json_path, json.dumps(self.registry.to_dict(), indent=2))
             return True
         except Exception as e:
-            logger.error(f"Error saving config: {e}")
+            logger.error("Error writing metrics to %s: %s", self.path, e)
             return False
-    
-    def get_actions(self):
-        actions = []
-        for action_data in self.config.get('actions', []):
-            try:
-                if isinstance(action_data, dict):
-                    # Convert dictionary to Action object
-                    actions.append(Action.from_dict(action_data))
-                elif isinstance(action_data, Action):
-                    # Already an Action object
-                    actions.append(action_data)
+
+    def close(self):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.write()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.write()
+
+
+# Profiling
+#
+# A ProfileSession turns on cProfile and tracemalloc for the next few macro
+# runs or seconds, and records spans of the hot paths: every run and step,
+# and the GUI's status refresh and run_macro. When it ends it writes three
+# files named after the time it started:
+#
+#   .pstats      cProfile stats of the profiled runs (for pstats or snakeviz)
+#   .memory      a tracemalloc snapshot (for tracemalloc.Snapshot.load)
+#   .trace.json  the spans as Chrome trace events (for chrome://tracing or Perfetto)
+PROFILE_FILE_PREFIX = "magic_script_profile"
+DEFAULT_PROFILE_RUNS = 1  # Runs profiled when neither a run count nor a duration is given
+DEFAULT_PROFILE_SECONDS = 60.0  # Duration offered in the tray menu
+PROFILE_MEMORY_FRAMES = 10  # Stack frames tracemalloc keeps per allocation
+TRACE_MAX_EVENTS = 200000  # Spans kept per session; later ones are only counted
+
+
+class ProfileSession:
+    """Profiles the next `runs` macro runs or `seconds` seconds, whichever ends first.
+
+    Spans are recorded on every thread. cProfile only follows the thread it
+    was enabled on, so it is switched on for each macro run, between
+    begin_run() and end_run() (see profile_run); runs never overlap. If the
+    session is stopped or runs out of time during a run, it ends with that
+    run. The files are then written to `directory` and `on_finished(session)`
+    is called, on whichever thread ended the session.
+    """
+
+    def __init__(self, directory=".", runs=None, seconds=None, on_finished=None):
+        self.directory = directory
+        self.runs = runs
+        self.seconds = seconds
+        self.on_finished = on_finished
+        self.runs_profiled = 0
+        self.files = []
+        self.dropped = 0  # Spans past TRACE_MAX_EVENTS
+        self.started = None
+        self._epoch = None
+        self._events = []  # (name, category, start, end, thread ident)
+        self._threads = {}  # thread ident -> name
+        self._lock = threading.Lock()
+        self._profile = None
+        self._run_start = None
+        self._running = False
+        self._stopping = False
+        self._finished = threading.Event()
+        self._timer = None
+        self._owns_tracemalloc = False
+
+    def start(self):
+        import tracemalloc
+        self.started = time.time()
+        self._epoch = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_MEMORY_FRAMES)
+            self._owns_tracemalloc = True
+        if self.seconds:
+            self._timer = threading.Timer(self.seconds, self.stop)
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    @property
+    def active(self):
+        return not self._stopping
+
+    def wait(self, timeout=None):
+        """Block until the files are written; returns False on timeout"""
+        return self._finished.wait(timeout)
+
+    def add_span(self, name, category, start, end):
+        """Record a span of the calling thread; `start` and `end` are time.perf_counter() values"""
+        if len(self._events) >= TRACE_MAX_EVENTS:
+            self.dropped += 1
+            return
+        ident = threading.get_ident()
+        if ident not in self._threads:
+            self._threads[ident] = threading.current_thread().name
+        self._events.append((name, category, start, end, ident))
+
+    def begin_run(self):
+        """Start profiling a macro run on the calling thread; False once the session is ending"""
+        import cProfile
+        with self._lock:
+            if self._stopping:
+                return False
+            self._running = True
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+        self._run_start = time.perf_counter()
+        try:
+            self._profile.enable()
+        except ValueError as e:  # Another profiler, e.g. a debugger's, is active
+            logger.warning("Cannot profile the macro run: %s", e)
+        return True
+
+    def end_run(self, name="macro run"):
+        """Stop profiling the run and record it as a span called `name`"""
+        self._profile.disable()
+        self.add_span(name, "run", self._run_start, time.perf_counter())
+        with self._lock:
+            self._running = False
+            self.runs_profiled += 1
+            if self.runs is not None and self.runs_profiled >= self.runs:
+                self._stopping = True
+            finish = self._stopping
+        if finish:
+            self._finish()
+
+    def stop(self):
+        """End the session: now, or when the run being profiled ends"""
+        with self._lock:
+            finish = not self._stopping and not self._running
+            self._stopping = True
+        if finish:
+            self._finish()
+
+    def trace(self):
+        """The recorded spans in the Chrome trace-event format"""
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                   'args': {'name': APP_NAME}}]
+        events.extend({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': ident,
+                       'args': {'name': name}}
+                      for ident, name in list(self._threads.items()))
+        for name, category, start, end, ident in list(self._events):
+            events.append({'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': ident,
+                           'ts': (start - self._epoch) * 1e6, 'dur': (end - start) * 1e6})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms',
+                'otherData': {'version': APP_VERSION, 'started': self.started,
+                              'dropped_spans': self.dropped}}
+
+    def _finish(self):
+        global _profile_session
+        import tracemalloc
+        if self._timer is not None:
+            self._timer.cancel()
+        if _profile_session is self:
+            _profile_session = None
+        prefix = os.path.join(self.directory, PROFILE_FILE_PREFIX +
+                              time.strftime("_%Y%m%d-%H%M%S", time.localtime(self.started)))
+        try:
+            snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        finally:
+            # Before writing anything: tracing slows down building the files several times over
+            if self._owns_tracemalloc:
+                successor = _profile_session
+                if successor is not None:
+                    successor._owns_tracemalloc = True  # Started while this one was finishing
                 else:
-                    logger.warning(f"Skipping unknown action type: {type(action_data)}")
-            except Exception as e:
-                logger.error(f"Error loading action: {e}")
-        return actions
-    
-    def set_actions(self, actions):
-        self.config['actions'] = actions
-        self.save_config()
-    
-    def get_idle_time(self):
-        return self.config.get('idle_time', DEFAULT_IDLE_TIME)
-    
-    def set_idle_time(self, seconds):
-        self.config['idle_time'] = seconds
-        self.save_config()
-    
-    def is_enabled(self):
-        return self.config.get('enabled', True)
-    
-    def set_enabled(self, enabled):
-        self.config['enabled'] = enabled
-        self.save_config()
-    
-    def get_run_on_startup(self):
-        return self.config.get('run_on_startup', False)
-    
-    def set_run_on_startup(self, enabled):
-        self.config['run_on_startup'] = enabled
-        self.save_config()
-        self._update_startup_registry(enabled)
-    
-    def _update_startup_registry(self, enabled):
+                    tracemalloc.stop()
         try:
-            import winreg
-            key = winreg.OpenKey(
-                winreg.HKEY_CURRENT_USER,
-                r"Software\Microsoft\Windows\CurrentVersion\Run",
+            if snapshot is not None:
+                snapshot.dump(prefix + ".memory")
+                self.files.append(prefix + ".memory")
+            if self.runs_profiled:
+                self._profile.dump_stats(prefix + ".pstats")
+                self.files.append(prefix + ".pstats")
+            write_file_atomic(prefix + ".trace.json", json.dumps(self.trace()))
+            self.files.append(prefix + ".trace.json")
+            logger.info("Profile written (%d macro runs): %s", self.runs_profiled,
+                        ", ".join(self.files))
+        except Exception as e:
+            logger.error("Error writing profile %s: %s", prefix, e)
+        finally:
+            self._finished.set()
+        if self.on_finished is not None:
+            self.on_finished(self)
+
+
+class _Span:
+    """Context manager recording one span in a ProfileSession"""
+
+    __slots__ = ('session', 'name', 'category', 'start')
+
+    def __init__(self, session, name, category):
+        self.session = session
+        self.name = name
+        self.category = category
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.session.add_span(self.name, self.category, self.start, time.perf_counter())
+        return False
+
+
+class _RunSpan:
+    """Context manager profiling one macro run in a ProfileSession"""
+
+    __slots__ = ('session', 'name', 'profiling')
+
+    def __init__(self, session, name):
+        self.session = session
+        self.name = name
+
+    def __enter__(self):
+        self.profiling = self.session.begin_run()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiling:
+            self.session.end_run(self.name)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+_profile_session = None
+
+
+def profile_span(name, category="gui"):
+    """`with profile_span(name):` records the block as a span while profiling, else does nothing"""
+    session = _profile_session
+    return _NO_SPAN if session is None else _Span(session, name, category)
+
+
+def profile_run(name="macro run"):
+    """`with profile_run():` around a macro run profiles it while a session is running"""
+    session = _profile_session
+    return _NO_SPAN if session is None else _RunSpan(session, name)
+
+
+def start_profiling(directory=".", runs=None, seconds=None, on_finished=None):
+    """Start a ProfileSession, replacing (and stopping) the current one.
+
+    Profiles the next `runs` macro runs or `seconds` seconds, or
+    DEFAULT_PROFILE_RUNS runs when neither is given.
+    """
+    global _profile_session
+    stop_profiling()
+    if runs is None and seconds is None:
+        runs = DEFAULT_PROFILE_RUNS
+    session = ProfileSession(directory, runs, seconds, on_finished)
+    _profile_session = session.start()
+    if seconds:
+        logger.info("Profiling for %g seconds%s", seconds, f" or {runs} macro runs" if runs else "")
+    else:
+        logger.info("Profiling the next %d macro runs", runs)
+    return session
+
+
+def stop_profiling():
+    """Stop the current ProfileSession, if any, and return it"""
+    session = _profile_session
+    if session is not None:
+        session.stop()
+    return session
+
+
+def get_profile_session():
+    """The running ProfileSession, or None"""
+    return _profile_session
+
+
+# Execution plan
+#
+# Each Action compiles into a step: a closure with its params already resolved
+# (defaults applied, ranges normalized, movement type dispatched). An
+# ExecutionPlan is the flat list of those steps and is rebuilt only when the
+# action list changes.
+ACTIVITY_POLL_INTERVAL = 0.01  # Seconds between idle checks while a macro runs
+INJECTION_GRACE = 0.05  # Input this soon after our own injection is assumed to be ours
+CURSOR_TOLERANCE = 2  # Pixels the cursor may drift during a move before we assume the user moved it
+MAX_BATCH_ACTIONS = 64  # Most actions merged into a single input batch
+TIMER_SPIN = 0.002  # Seconds before a deadline at which waiting switches from sleeping to spinning
+TIMER_RESOLUTION_MS = 1  # System timer period requested while a macro runs (Windows)
+RANDOM_BLOCK = 4096  # Random values a RandomStream draws at a time when a run did not reserve them
+
+
+class MacroCancelled(Exception):
+    """Raised inside a run once its CancelToken has been cancelled"""
+
+
+class CancelToken:
+    """Cooperative cancellation flag shared by a macro run and whoever may stop it"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+        self.cancelled_at = None  # time.perf_counter() of the first cancel()
+
+    def cancel(self, reason="cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self.cancelled_at = time.perf_counter()
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise MacroCancelled(self.reason)
+
+    def wait(self, seconds):
+        """Sleep up to `seconds`; returns True as soon as the token is cancelled"""
+        return self._event.wait(seconds)
+
+
+class TimerResolution:
+    """Raises the system timer resolution for the duration of a `with` block.
+
+    Windows wakes sleepers on a 15.6 ms tick by default, far coarser than the
+    final TIMER_SPIN of a wait; timeBeginPeriod brings that down to about a
+    millisecond. Elsewhere this does nothing.
+    """
+
+    def __init__(self, period_ms=TIMER_RESOLUTION_MS):
+        self.period_ms = period_ms
+        self._active = False
+
+    def __enter__(self):
+        if sys.platform == "win32":
+            # 0 is TIMERR_NOERROR
+            self._active = ctypes.windll.winmm.timeBeginPeriod(self.period_ms) == 0
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._active:
+            ctypes.windll.winmm.timeEndPeriod(self.period_ms)
+            self._active = False
+        return False
+
+
+class TimingStats:
+    """How closely a run kept to its schedule.
+
+    `jitter` holds, per step, the seconds it started after its scheduled
+    time; `drift` is how far past the scheduled end the run finished.
+    """
+
+    def __init__(self):
+        self.jitter = array('d')
+        self.nominal = 0.0
+        self.drift = None
+
+    def record(self, lateness):
+        self.jitter.append(lateness)
+
+    def summary(self):
+        jitter = sorted(self.jitter) or [0.0]
+        return {
+            'steps': len(self.jitter),
+            'nominal_s': self.nominal,
+            'jitter_mean_ms': sum(jitter) / len(jitter) * 1000,
+            'jitter_p95_ms': jitter[min(len(jitter) - 1, int(len(jitter) * 0.95))] * 1000,
+            'jitter_max_ms': jitter[-1] * 1000,
+            'drift_ms': None if self.drift is None else self.drift * 1000,
+        }
+
+
+class RandomStream:
+    """The random values of one run, drawn from a generator seeded with `seed`.
+
+    Values are drawn from NumPy in one vectorized batch (a whole run's worth
+    when the run reserves them, else RANDOM_BLOCK at a time) and only mapped
+    to the requested range as steps take them. Mouse paths get a second
+    generator spawned from the same seed, so they do not shift the other
+    draws. Two runs with the same seed, actions and starting cursor send the
+    same input. Without a seed a random one is picked, and kept in `seed`.
+    """
+
+    def __init__(self, seed=None, block=RANDOM_BLOCK):
+        self.seed = int.from_bytes(os.urandom(8), 'little') if seed is None else int(seed)
+        self.block = block
+        self._generator = None
+        self._path_rng = None
+        self._values = iter(())
+        self._next = self._values.__next__
+
+    def _start(self):
+        import numpy as np
+
+        values, paths = np.random.SeedSequence(self.seed).spawn(2)
+        self._generator = np.random.default_rng(values)
+        self._path_rng = np.random.default_rng(paths)
+
+    def reserve(self, count):
+        """Draw the next `count` values now, e.g. everything a run is going to take"""
+        if count <= 0:
+            return
+        if self._generator is None:
+            self._start()
+        # Leftovers come first, so the sequence does not depend on how it was drawn
+        values = list(self._values)
+        values.extend(self._generator.random(count).tolist())
+        self._values = iter(values)
+        self._next = self._values.__next__
+
+    def random(self):
+        """Next value in [0, 1)"""
+        try:
+            return self._next()
+        except StopIteration:
+            self.reserve(self.block)
+            return self._next()
+
+    def randint(self, low, high):
+        """Integer in [low, high], both included (like random.randint)"""
+        try:
+            value = self._next()
+        except StopIteration:
+            value = self.random()
+        return low + int(value * (high - low + 1))
+
+    def uniform(self, low, high):
+        try:
+            value = self._next()
+        except StopIteration:
+            value = self.random()
+        return low + (high - low) * value
+
+    @property
+    def path_rng(self):
+        """NumPy Generator for synthesize_path"""
+        if self._path_rng is None:
+            self._start()
+        return self._path_rng
+
+
+class RunContext:
+    """Per-run state handed to every compiled step.
+
+    Tracks when the engine itself is injecting input, so an ActivityWatcher
+    can tell the macro's own events apart from a returning user.
+
+    Waits are scheduled against `timeline`, the absolute perf_counter()
+    deadline the run has reached so far, rather than against the time a
+    wait happens to start. Time spent sending input or waking late is taken
+    out of the next wait, so the error does not add up over a long macro.
+
+    Random moves, scrolls and delays take their values from `random`, a
+    RandomStream seeded with `seed`.
+    """
+
+    def __init__(self, backend, cancel_token=None, seed=None):
+        self.backend = backend
+        self.cancel_token = cancel_token or CancelToken()
+        self.random = RandomStream(seed)
+        self.injecting = False
+        self.injection_seq = 0
+        self.last_injection = 0.0  # time.monotonic() when injection last stopped
+        self.timeline = None  # time.perf_counter() the schedule has reached
+        self.timeline_start = None
+        self.timing = TimingStats()
+
+    def begin_injection(self):
+        self.injection_seq += 1
+        self.injecting = True
+
+    def end_injection(self):
+        self.last_injection = time.monotonic()
+        self.injecting = False
+
+    def start_timeline(self):
+        """Anchor the schedule at the current time; called when a run starts"""
+        self.timeline = self.timeline_start = time.perf_counter()
+        self.timing = TimingStats()
+
+    def now(self):
+        """The scheduled current time, anchoring the schedule on first use"""
+        if self.timeline is None:
+            self.start_timeline()
+        return self.timeline
+
+    def mark_step(self):
+        """Record how late the step about to run is against the schedule"""
+        if self.timeline is not None:
+            self.timing.record(time.perf_counter() - self.timeline)
+
+    def finish_timeline(self):
+        """Record the total drift of a run that reached the end of its schedule"""
+        if self.timeline is not None:
+            self.timing.nominal = self.timeline - self.timeline_start
+            self.timing.drift = time.perf_counter() - self.timeline
+        return self.timing
+
+    def sleep(self, seconds):
+        """Advance the schedule by `seconds` and wait for it; see sleep_until"""
+        if seconds > 0:
+            self.sleep_until(self.now() + seconds)
+        else:
+            self.cancel_token.check()
+
+    def sleep_until(self, deadline):
+        """Wait until the perf_counter() `deadline` without counting as injection.
+
+        Sleeps on the cancel token until TIMER_SPIN seconds are left, then
+        spins (yielding the GIL) for the rest, so the wait ends within
+        microseconds of the deadline instead of a scheduler tick after it.
+        Raises MacroCancelled if the run is cancelled meanwhile.
+        """
+        if self.timeline is None or deadline > self.timeline:
+            self.timeline = deadline
+        token, perf_counter = self.cancel_token, time.perf_counter
+        remaining = deadline - perf_counter()
+        if remaining <= 0:
+            token.check()
+            return
+        injecting = self.injecting
+        if injecting:
+            self.end_injection()
+        if remaining > TIMER_SPIN and token.wait(remaining - TIMER_SPIN):
+            raise MacroCancelled(token.reason)
+        while perf_counter() < deadline:
+            token.check()
+            time.sleep(0)
+        token.check()
+        if injecting:
+            self.begin_injection()
+
+
+class ActivityWatcher:
+    """Cancels a run as soon as real (non-injected) user input shows up.
+
+    Polls the idle timer on its own thread every ACTIVITY_POLL_INTERVAL
+    seconds. Input is considered the user's when it happened after the run
+    started and more than INJECTION_GRACE seconds after the engine last
+    injected anything.
+    """
+
+    def __init__(self, ctx, idle_func=None, interval=ACTIVITY_POLL_INTERVAL, grace=INJECTION_GRACE):
+        self.ctx = ctx
+        self.idle_func = idle_func or (lambda: get_idle_time(max_age=0))
+        self.interval = interval
+        self.grace = grace
+        self._stopped = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def start(self):
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="ActivityWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        ctx = self.ctx
+        while not self._stopped.wait(self.interval):
+            seq = ctx.injection_seq
+            if ctx.injecting:
+                continue
+            try:
+                idle_time = self.idle_func()
+            except Exception as e:
+                logger.error("Activity watcher cannot read idle time: %s", e)
+                return
+            if ctx.injecting or seq != ctx.injection_seq:
+                # Injection started while we were reading; the reading is ambiguous
+                continue
+            last_input = time.monotonic() - idle_time
+            if last_input > max(self._started, ctx.last_injection + self.grace):
+                ctx.cancel_token.cancel("user activity detected")
+                return
+
+
+def _tween_move(ctx, x, y, duration, curve):
+    """Move the cursor to (x, y), animated over `duration` seconds along `curve`"""
+    backend = ctx.backend
+    if duration > 0:
+        points, times = synthesize_path(backend.position(), (x, y), duration, curve,
+                                        rng=ctx.random.path_rng)
+        backend.move_path(points.tolist(), times.tolist(), ctx)
+    else:
+        backend.move_to(x, y)
+
+
+def _ordered_range(low, high):
+    low, high = int(low), int(high)
+    return (high, low) if low > high else (low, high)
+
+
+def _noop_step(ctx):
+    pass
+
+
+def _compile_move_target(params):
+    """Return a function resolving the move target against `source`, a backend or
+    InputBatch, with random values from the RandomStream `rng`"""
+    move_type = params.get('move_type', 0)
+
+    if move_type == 0:  # Specific Coordinates
+        x = params.get('x', 500)
+        y = params.get('y', 500)
+
+        def target(source, rng):
+            logger.debug("Moving mouse to absolute position (%s, %s)", x, y)
+            return x, y
+
+    elif move_type == 1:  # Random in Range
+        x_min, x_max = _ordered_range(params.get('x_min', 0), params.get('x_max', 1000))
+        y_min, y_max = _ordered_range(params.get('y_min', 0), params.get('y_max', 1000))
+        def target(source, rng):
+            x = rng.randint(x_min, x_max)
+            y = rng.randint(y_min, y_max)
+            logger.debug("Moving mouse to random position in range (%s, %s)", x, y)
+            return x, y
+
+    elif move_type == 3:  # Relative to Current Position
+        x_offset = params.get('x_offset', 50)
+        y_offset = params.get('y_offset', 50)
+
+        def target(source, rng):
+            logger.debug("Moving mouse by offset (%s, %s)", x_offset, y_offset)
+            current_x, current_y = source.position()
+            return current_x + x_offset, current_y + y_offset
+
+    elif move_type == 4:  # Random Range from Current Position
+        x_min, x_max = _ordered_range(params.get('x_offset_min', -50),
+                                      params.get('x_offset_max', 50))
+        y_min, y_max = _ordered_range(params.get('y_offset_min', -50),
+                                      params.get('y_offset_max', 50))
+        def target(source, rng):
+            x_offset = rng.randint(x_min, x_max)
+            y_offset = rng.randint(y_min, y_max)
+            logger.debug("Moving mouse by random offset (%s, %s)", x_offset, y_offset)
+            current_x, current_y = source.position()
+            return current_x + x_offset, current_y + y_offset
+
+    else:  # Fully Random
+        def target(source, rng):
+            screen_width, screen_height = source.size()
+            x = rng.randint(0, screen_width)
+            y = rng.randint(0, screen_height)
+            logger.debug("Moving mouse to fully random position (%s, %s)", x, y)
+            return x, y
+
+    return target
+
+
+def _compile_mouse_move(params):
+    """Step for animated moves; instant ones are batched (see _emit_mouse_move)"""
+    duration = params.get('duration', 0.5)
+    curve = params.get('curve', DEFAULT_MOUSE_CURVE)
+    if curve not in MOUSE_CURVES:
+        raise ValueError(f"Unknown mouse curve: {curve}")
+    target = _compile_move_target(params)
+
+    def step(ctx):
+        x, y = target(ctx.backend, ctx.random)
+        _tween_move(ctx, x, y, duration, curve)
+
+    return step
+
+
+def _noop_emit(batch):
+    pass
+
+
+def _emit_mouse_move(params):
+    if params.get('duration', 0.5) > 0:
+        return None  # Animated moves are played back by a step of their own
+    target = _compile_move_target(params)
+
+    def emit(batch):
+        batch.add('move_to', *target(batch, batch.random))
+
+    return emit
+
+
+def _emit_mouse_click(params):
+    button = params.get('button', 'left')
+    clicks = params.get('clicks', 1)
+
+    def emit(batch):
+        batch.add('click', button, clicks)
+
+    return emit
+
+
+def _emit_mouse_scroll(params):
+    if params.get('scroll_type', 0) == 0:  # Fixed Amount
+        amount = params.get('amount', 0)
+
+        def emit(batch):
+            batch.add('scroll', amount)
+
+    else:  # Random in Range
+        min_amount, max_amount = _ordered_range(params.get('min_amount', -20),
+                                                params.get('max_amount', 20))
+        def emit(batch):
+            amount = batch.random.randint(min_amount, max_amount)
+            logger.debug("Scrolling mouse by %s clicks", amount)
+            batch.add('scroll', amount)
+
+    return emit
+
+
+def _emit_key_press(params):
+    key = params.get('key', '')
+    if not key:
+        return _noop_emit
+
+    def emit(batch):
+        batch.add('press', key)
+
+    return emit
+
+
+def _emit_key_combination(params):
+    keys = tuple(params.get('keys', []))
+    if not keys:
+        return _noop_emit
+
+    def emit(batch):
+        batch.add('hotkey', *keys)
+
+    return emit
+
+
+def _compile_wait(params):
+    seconds = params.get('seconds', 1)
+
+    def step(ctx):
+        ctx.sleep(seconds)
+
+    return step
+
+
+STEP_COMPILERS = {
+    ActionType.MOUSE_MOVE: _compile_mouse_move,
+    ActionType.WAIT: _compile_wait,
+}
+
+# Actions whose input can be merged with their neighbours' into one batch
+EVENT_COMPILERS = {
+    ActionType.MOUSE_MOVE: _emit_mouse_move,
+    ActionType.MOUSE_CLICK: _emit_mouse_click,
+    ActionType.MOUSE_SCROLL: _emit_mouse_scroll,
+    ActionType.KEY_PRESS: _emit_key_press,
+    ActionType.KEY_COMBINATION: _emit_key_combination,
+}
+
+
+class InputBatch:
+    """Input events collected from adjacent actions for one InputBackend.send call.
+
+    Mirrors the backend's position() and size() so that move targets are
+    resolved against the cursor as the batch will have left it. Random
+    values come from `rng`, the run's RandomStream.
+    """
+
+    def __init__(self, backend, rng=None):
+        self.backend = backend
+        self.random = rng if rng is not None else RandomStream()
+        self.events = []
+        self._cursor = None
+
+    def position(self):
+        if self._cursor is None:
+            self._cursor = self.backend.position()
+        return self._cursor
+
+    def size(self):
+        return self.backend.size()
+
+    def add(self, kind, *args):
+        if kind == 'move_to':
+            args = self._cursor = (int(args[0]), int(args[1]))
+        self.events.append((kind,) + tuple(args))
+
+
+def _events_step(*emitters):
+    """Step submitting the input of one or more emitters as a single batch"""
+    perf_counter = time.perf_counter
+
+    def step(ctx):
+        batch = InputBatch(ctx.backend, ctx.random)
+        for emit in emitters:
+            emit(batch)
+        if batch.events:
+            start = perf_counter()
+            ctx.backend.send(batch.events)
+            SEND_SECONDS.observe(perf_counter() - start)
+
+    return step
+
+
+def _random_draws(action):
+    """How many values `action` takes from the run's RandomStream"""
+    if action.action_type is ActionType.MOUSE_MOVE:
+        return 0 if action.params.get('move_type', 0) in (0, 3) else 2
+    if action.action_type is ActionType.MOUSE_SCROLL:
+        return 1 if action.params.get('scroll_type', 0) != 0 else 0
+    return 0
+
+
+class ActionBatch:
+    """Adjacent actions whose input is submitted to the backend in one go"""
+
+    def __init__(self, actions):
+        self.actions = tuple(actions)
+        self.name = " + ".join(action.name for action in self.actions)
+        counts = {}
+        for action in self.actions:
+            counts[action.action_type] = counts.get(action.action_type, 0) + 1
+        self.type_counts = tuple(counts.items())
+
+
+class ExecutionPlan:
+    """Flat list of (action, step) pairs compiled from an action list.
+
+    With `batch_inputs`, runs of adjacent input actions (clicks, key presses,
+    scrolls, instant moves) are merged into a single step that submits all
+    their events in one backend call; the action of such a step is an
+    ActionBatch. Only batch when nothing is meant to happen between those
+    actions, i.e. without a step pause or random delay.
+
+    `random_draws` is how many random values one pass over the steps takes.
+    """
+
+    def __init__(self, actions, batch_inputs=True):
+        self.steps = []
+        self.random_draws = 0
+        pending = []  # (action, emitter) pairs waiting to be batched
+        for action in actions:
+            try:
+                emit = action.compile_events() if batch_inputs else None
+                step = action.compile() if emit is None else None
+            except Exception as e:
+                logger.error("Error compiling action %s: %s", action.name, e)
+                continue
+            self.random_draws += _random_draws(action)
+            if emit is not None:
+                pending.append((action, emit))
+                if len(pending) >= MAX_BATCH_ACTIONS:
+                    self._add_batch(pending)
+                    pending = []
+                continue
+            if pending:
+                self._add_batch(pending)
+                pending = []
+            self.steps.append((action, step))
+        if pending:
+            self._add_batch(pending)
+
+    def _add_batch(self, pending):
+        if len(pending) == 1:
+            action, emit = pending[0]
+            self.steps.append((action, _events_step(emit)))
+        else:
+            batch = ActionBatch(action for action, _ in pending)
+            self.steps.append((batch, _events_step(*(emit for _, emit in pending))))
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    @staticmethod
+    def run_step(action, step, ctx):
+        """Run a single step, logging failures the same way Action.execute does.
+
+        The step's duration and outcome go to `metrics`. MacroCancelled is
+        propagated so the caller can stop the run.
+        """
+        if isinstance(action, ActionBatch):
+            _, seconds, failures = BATCH_METRICS
+            for action_type, count in action.type_counts:
+                ACTION_METRICS[action_type][0].inc(count)
+        else:
+            count, seconds, failures = ACTION_METRICS[action.action_type]
+            count.inc()
+        ctx.begin_injection()
+        start = time.perf_counter()
+        try:
+            step(ctx)
+            return True
+        except MacroCancelled:
+            raise
+        except Exception as e:
+            failures.inc()
+            logger.error("Unexpected error executing action %s: %s", action.name, e, exc_info=True)
+            return False
+        finally:
+            ctx.end_injection()
+            end = time.perf_counter()
+            seconds.observe(end - start)
+            session = _profile_session
+            if session is not None:
+                session.add_span(action.name, "step", start, end)
+
+
+class MacroSnapshot:
+    """One published version of the actions and run settings; never changes once built.
+
+    The GUI builds a new snapshot whenever the actions or a run setting
+    change and publishes it with a single attribute assignment. A run takes
+    the current snapshot once when it starts and reads nothing else, so
+    edits made meanwhile apply from the next run and the run loop needs no
+    locks. Actions are shared between versions, not copied, which is safe
+    because an Action's type and params cannot change once it is built.
+
+    The plan is compiled on first use and carried over to the next version
+    when neither the actions nor the batching change.
+    """
+
+    __slots__ = ('version', 'actions', 'delay_range', 'step_pause', 'enabled', 'idle_time', '_plan')
+
+    def __init__(self, actions=(), delay_range=None, step_pause=0.0, enabled=True,
+                 idle_time=DEFAULT_IDLE_TIME, version=0):
+        set_field = object.__setattr__
+        set_field(self, 'version', version)
+        set_field(self, 'actions', tuple(actions))
+        set_field(self, 'delay_range', tuple(delay_range) if delay_range is not None else None)
+        set_field(self, 'step_pause', step_pause)
+        set_field(self, 'enabled', enabled)
+        set_field(self, 'idle_time', idle_time)
+        set_field(self, '_plan', None)
+
+    @classmethod
+    def from_config(cls, config_manager, actions, previous=None):
+        """Snapshot `actions` with the run settings currently in `config_manager`"""
+        delay_range, step_pause = config_manager.get_run_settings()
+        version = previous.version + 1 if previous is not None else 1
+        snapshot = cls(actions, delay_range, step_pause, config_manager.is_enabled(),
+                       config_manager.get_idle_time(), version)
+        if (previous is not None and previous.actions == snapshot.actions and
+                previous.batch_inputs == snapshot.batch_inputs):
+            object.__setattr__(snapshot, '_plan', previous._plan)
+        return snapshot
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __len__(self):
+        return len(self.actions)
+
+    @property
+    def batch_inputs(self):
+        # Actions can only share an input batch when nothing is meant to happen between them
+        return self.delay_range is None and self.step_pause <= 0
+
+    @property
+    def plan(self):
+        """The compiled ExecutionPlan for these actions and settings"""
+        plan = self._plan
+        if plan is None:
+            plan = ExecutionPlan(self.actions, self.batch_inputs)
+            object.__setattr__(self, '_plan', plan)
+        return plan
+
+
+def execute_plan(plan, ctx, delay_range=None, step_pause=0.0):
+    """Run the steps of `plan` in order.
+
+    Timing is explicit: each step is followed by `step_pause` seconds plus,
+    when `delay_range` is given, a random delay drawn from it. Nothing else
+    sleeps between steps. All waits are scheduled on the run's timeline, and
+    the per-step jitter and total drift end up in ctx.timing.
+
+    The random values the run needs are drawn from ctx.random in one batch
+    before it starts.
+
+    Returns True when every step ran and False when the run was cancelled
+    through ctx.cancel_token.
+    """
+    uniform = ctx.random.uniform
+    ctx.random.reserve(plan.random_draws + (len(plan) if delay_range is not None else 0))
+    ctx.start_timeline()
+    try:
+        with TimerResolution():
+            for action, step in plan:
+                ctx.cancel_token.check()
+                ctx.mark_step()
+                logger.debug("Executing action: %s", action.name)
+                plan.run_step(action, step, ctx)
+
+                pause = step_pause
+                if delay_range is not None:
+                    delay = uniform(*delay_range)
+                    logger.debug("Random delay: %.1f seconds", delay)
+                    pause += delay
+                if pause > 0:
+                    ctx.sleep(pause)
+        ctx.finish_timeline()
+        _record_run(ctx, True)
+        return True
+    except MacroCancelled as e:
+        logger.info("Stopping macro execution: %s", e)
+        _record_run(ctx, False)
+        return False
+
+
+def _log_timing(timing):
+    summary = timing.summary()
+    logger.info("Macro timing: %d steps over %.3f s, jitter mean %.2f ms / max %.2f ms, "
+                "drift %.2f ms", summary['steps'], summary['nominal_s'], summary['jitter_mean_ms'],
+                summary['jitter_max_ms'], summary['drift_ms'])
+
+
+# Running macro files in place
+def _record_move_target(macro, row, source, rng):
+    """Move target of a mouse move row, as _compile_move_target resolves it"""
+    get = macro.get
+    move_type = get(row, 'move_type', 0)
+    randint = rng.randint
+
+    if move_type == 0:  # Specific Coordinates
+        return get(row, 'x', 500), get(row, 'y', 500)
+
+    elif move_type == 1:  # Random in Range
+        x_min, x_max = _ordered_range(get(row, 'x_min', 0), get(row, 'x_max', 1000))
+        y_min, y_max = _ordered_range(get(row, 'y_min', 0), get(row, 'y_max', 1000))
+        return randint(x_min, x_max), randint(y_min, y_max)
+
+    elif move_type == 3:  # Relative to Current Position
+        current_x, current_y = source.position()
+        return current_x + get(row, 'x_offset', 50), current_y + get(row, 'y_offset', 50)
+
+    elif move_type == 4:  # Random Range from Current Position
+        x_min, x_max = _ordered_range(get(row, 'x_offset_min', -50), get(row, 'x_offset_max', 50))
+        y_min, y_max = _ordered_range(get(row, 'y_offset_min', -50), get(row, 'y_offset_max', 50))
+        x_offset = randint(x_min, x_max)
+        y_offset = randint(y_min, y_max)
+        current_x, current_y = source.position()
+        return current_x + x_offset, current_y + y_offset
+
+    else:  # Fully Random
+        screen_width, screen_height = source.size()
+        return randint(0, screen_width), randint(0, screen_height)
+
+
+def _queue_mouse_move_record(macro, row, batch):
+    if macro.get(row, 'duration', 0.5) > 0:
+        return False  # Animated moves run as a step of their own
+    batch.add('move_to', *_record_move_target(macro, row, batch, batch.random))
+    return True
+
+
+def _queue_mouse_click_record(macro, row, batch):
+    batch.add('click', macro.get(row, 'button', 'left'), macro.get(row, 'clicks', 1))
+    return True
+
+
+def _queue_mouse_scroll_record(macro, row, batch):
+    if macro.get(row, 'scroll_type', 0) == 0:  # Fixed Amount
+        amount = macro.get(row, 'amount', 0)
+    else:  # Random in Range
+        min_amount, max_amount = _ordered_range(macro.get(row, 'min_amount', -20),
+                                                macro.get(row, 'max_amount', 20))
+        amount = batch.random.randint(min_amount, max_amount)
+    batch.add('scroll', amount)
+    return True
+
+
+def _queue_key_press_record(macro, row, batch):
+    key = macro.get(row, 'key', '')
+    if key:
+        batch.add('press', key)
+    return True
+
+
+def _queue_key_combination_record(macro, row, batch):
+    keys = macro.get(row, 'keys', [])
+    if keys:
+        batch.add('hotkey', *keys)
+    return True
+
+
+def _run_mouse_move_record(macro, row, ctx):
+    curve = macro.get(row, 'curve', DEFAULT_MOUSE_CURVE)
+    if curve not in MOUSE_CURVES:
+        raise ValueError(f"Unknown mouse curve: {curve}")
+    x, y = _record_move_target(macro, row, ctx.backend, ctx.random)
+    _tween_move(ctx, x, y, macro.get(row, 'duration', 0.5), curve)
+
+
+def _run_wait_record(macro, row, ctx):
+    ctx.sleep(macro.get(row, 'seconds', 1))
+
+
+# Record handlers by ActionType value. Queuers add a row's input to an
+# InputBatch and return False for rows that need a step of their own; runners
+# execute such a row. Any other row is decoded and compiled like an Action.
+RECORD_QUEUERS = {
+    ActionType.MOUSE_MOVE.value: _queue_mouse_move_record,
+    ActionType.MOUSE_CLICK.value: _queue_mouse_click_record,
+    ActionType.MOUSE_SCROLL.value: _queue_mouse_scroll_record,
+    ActionType.KEY_PRESS.value: _queue_key_press_record,
+    ActionType.KEY_COMBINATION.value: _queue_key_combination_record,
+}
+
+RECORD_RUNNERS = {
+    ActionType.MOUSE_MOVE.value: _run_mouse_move_record,
+    ActionType.WAIT.value: _run_wait_record,
+}
+
+
+def _record_label(macro, row):
+    try:
+        return macro.action(row).name
+    except Exception:
+        return f"row {row}"
+
+
+def _run_record(macro, row, ctx):
+    """Run one row as a step, logging failures and metrics like ExecutionPlan.run_step"""
+    type_code = macro.type_code(row)
+    _, seconds, failures = RECORD_METRICS.get(type_code, BATCH_METRICS)
+    ctx.begin_injection()
+    start = time.perf_counter()
+    try:
+        runner = RECORD_RUNNERS.get(type_code)
+        if runner is not None:
+            runner(macro, row, ctx)
+        else:
+            macro.action(row).compile()(ctx)
+    except MacroCancelled:
+        raise
+    except Exception as e:
+        failures.inc()
+        logger.error("Unexpected error executing action %s: %s", _record_label(macro, row), e,
+                     exc_info=True)
+    finally:
+        ctx.end_injection()
+        end = time.perf_counter()
+        seconds.observe(end - start)
+        session = _profile_session
+        if session is not None:
+            session.add_span(_record_label(macro, row), "step", start, end)
+
+
+def _submit_batch(ctx, batch):
+    if not batch.events:
+        return
+    _, seconds, failures = BATCH_METRICS
+    ctx.begin_injection()
+    start = time.perf_counter()
+    try:
+        ctx.backend.send(batch.events)
+    except Exception as e:
+        failures.inc()
+        logger.error("Unexpected error sending input: %s", e, exc_info=True)
+    finally:
+        ctx.end_injection()
+        end = time.perf_counter()
+        seconds.observe(end - start)
+        SEND_SECONDS.observe(end - start)  # The step is the send
+        session = _profile_session
+        if session is not None:
+            session.add_span("input batch", "step", start, end)
+
+
+def execute_macro_file(macro, ctx, delay_range=None, step_pause=0.0):
+    """Run a MacroFile straight from its mapped records.
+
+    Follows execute_plan: the same pauses and random delays, and adjacent
+    input rows are submitted as one batch when neither is set, so the input
+    matches running the decoded actions. Params are read from the mapping
+    as each row runs; no Action or step closure is built per row. Timing
+    is recorded in ctx.timing as for execute_plan. Random values are drawn
+    from ctx.random in blocks as the rows need them.
+
+    Returns True when every row ran and False when the run was cancelled.
+    """
+    batch_inputs = delay_range is None and step_pause <= 0
+    uniform = ctx.random.uniform
+    batch = InputBatch(ctx.backend, ctx.random)
+    queued = 0
+    ctx.start_timeline()
+    try:
+        with TimerResolution():
+            for row in range(len(macro)):
+                ctx.cancel_token.check()
+                ctx.mark_step()
+                type_code = macro.type_code(row)
+                record_metrics = RECORD_METRICS.get(type_code)
+                if record_metrics is not None:
+                    record_metrics[0].inc()
+                queue_input = RECORD_QUEUERS.get(type_code)
+                failed = False
+                try:
+                    is_input = queue_input is not None and queue_input(macro, row, batch)
+                except Exception as e:
+                    # Counted like a failing step; the row still gets its pause and delay
+                    RECORD_METRICS.get(type_code, BATCH_METRICS)[2].inc()
+                    logger.error("Unexpected error executing action %s: %s",
+                                 _record_label(macro, row), e, exc_info=True)
+                    is_input, failed = False, True
+
+                if is_input:
+                    queued += 1
+                    if batch_inputs and queued < MAX_BATCH_ACTIONS:
+                        continue
+                    _submit_batch(ctx, batch)
+                else:
+                    if queued:
+                        _submit_batch(ctx, batch)
+                    if not failed:
+                        _run_record(macro, row, ctx)
+                if queued:
+                    batch = InputBatch(ctx.backend, ctx.random)
+                    queued = 0
+
+                pause = step_pause
+                if delay_range is not None:
+                    delay = uniform(*delay_range)
+                    logger.debug("Random delay: %.1f seconds", delay)
+                    pause += delay
+                if pause > 0:
+                    ctx.sleep(pause)
+            _submit_batch(ctx, batch)
+        ctx.finish_timeline()
+        _record_run(ctx, True)
+        return True
+    except MacroCancelled as e:
+        logger.info("Stopping macro execution: %s", e)
+        _record_run(ctx, False)
+        return False
+
+
+def execute_watched(source, ctx, delay_range=None, step_pause=0.0, watch=True):
+    """Run an ExecutionPlan or MacroFile, cancelling it as soon as the user comes back.
+
+    This is how both the GUI and the command line run macros: execute_plan
+    (or execute_macro_file) with an ActivityWatcher for the duration of the
+    run. Pass `watch=False` where the idle timer cannot be read.
+    """
+    execute = execute_macro_file if isinstance(source, MacroFile) else execute_plan
+    logger.info("Random seed: %d", ctx.random.seed)
+    watcher = ActivityWatcher(ctx) if watch else None
+    if watcher is not None:
+        watcher.start()
+    try:
+        return execute(source, ctx, delay_range, step_pause)
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        if _idle_source is not None:
+            # The run's input counts as activity, also for sources that cannot see it
+            _idle_source.mark_input()
+
+
+def wait_for_idle(threshold, cancel_token=None, idle_func=None):
+    """Block until the system has been idle for `threshold` seconds.
+
+    Sleeps as IdleScheduler suggests instead of polling. Returns False if
+    `cancel_token` is cancelled first.
+    """
+    idle_func = idle_func or (lambda: get_idle_time(max_age=0))
+    cancel_token = cancel_token or CancelToken()
+    scheduler = IdleScheduler()
+    while True:
+        idle_time = idle_func()
+        delay = scheduler.next_delay(idle_time, threshold)
+        if delay <= 0:
+            metrics.observe('magicscript_idle_trigger_seconds', idle_time - threshold)
+            return True
+        if cancel_token.wait(delay):
+            return False
+
+
+class DryRunContext(RunContext):
+    """RunContext on a virtual clock: waits move the schedule on without sleeping"""
+
+    def start_timeline(self):
+        self.timeline = self.timeline_start = 0.0
+        self.timing = TimingStats()
+
+    def mark_step(self):
+        self.timing.record(0.0)
+
+    def finish_timeline(self):
+        self.timing.nominal = self.timeline - self.timeline_start
+        self.timing.drift = 0.0
+        return self.timing
+
+    def sleep_until(self, deadline):
+        if self.timeline is None or deadline > self.timeline:
+            self.timeline = deadline
+        self.cancel_token.check()
+
+
+def dry_run(source, seed=None, delay_range=None, step_pause=0.0, backend=None):
+    """Play an ExecutionPlan or MacroFile into a RecordingBackend without waiting.
+
+    Waits only advance a DryRunContext's virtual clock, so this returns at
+    once. With the same `seed`, starting cursor and screen size, the
+    recorded events are the input a real run would send, timestamped on
+    its schedule. Returns the context; the events are in ctx.backend.events
+    and the seed used in ctx.random.seed.
+    """
+    backend = backend or RecordingBackend()
+    ctx = DryRunContext(backend, seed=seed)
+    backend.clock = ctx.now
+    backend.clear()
+    execute = execute_macro_file if isinstance(source, MacroFile) else execute_plan
+    execute(source, ctx, delay_range, step_pause)
+    return ctx
+
+
+def format_events(events):
+    """Lines describing RecordingBackend events, one per input event"""
+    lines = []
+    for timestamp, kind, args in events:
+        batch = args if kind == 'send' else [(kind,) + args]
+        for event_kind, *event_args in batch:
+            args_text = ' '.join(map(str, event_args))
+            lines.append(f"{timestamp:10.4f}  {event_kind} {args_text}".rstrip())
+    return lines
+
+
+# Macro worker
+#
+# The GUI runs macros and action tests on one long-lived thread, fed through
+# a bounded queue, instead of starting a thread per run. Every job gets its
+# own CancelToken; cancelling stops the running job and drops queued ones.
+MACRO_QUEUE_SIZE = 4  # Jobs that may wait behind the running one; more are refused
+WORKER_SHUTDOWN_TIMEOUT = 5.0  # Seconds shutdown() waits for the running job to stop
+
+
+class WorkerState(Enum):
+    IDLE = auto()
+    RUNNING = auto()
+    CANCELLING = auto()  # The running job has been cancelled but has not returned yet
+    STOPPED = auto()
+
+
+class MacroJob:
+    """A job for a MacroWorker: `func(cancel_token)`, and its outcome once done"""
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+        self.cancel_token = CancelToken()
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job has run or was dropped; returns False on timeout"""
+        return self._done.wait(timeout)
+
+    def run(self):
+        try:
+            if self.cancel_token.cancelled:
+                logger.info("Skipping %s: %s", self.name, self.cancel_token.reason)
+            else:
+                self.result = self.func(self.cancel_token)
+        except Exception as e:
+            self.error = e
+            logger.error("Error in %s: %s", self.name, e, exc_info=True)
+        finally:
+            self._done.set()
+
+
+class MacroWorker:
+    """One thread running MacroJobs in order from a bounded queue.
+
+    `submit()` refuses jobs (returns None) once `max_queued` are waiting, so
+    triggers cannot pile up behind a long run. `on_finished(job)` is called
+    on the worker thread after each job, once `state` reflects that it has
+    ended. `shutdown()` cancels the running job, drops the queue and joins
+    the thread.
+    """
+
+    def __init__(self, max_queued=MACRO_QUEUE_SIZE, on_finished=None):
+        self.max_queued = max_queued
+        self.on_finished = on_finished
+        self._pending = deque()
+        self._current = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        with self._condition:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="MagicScriptWorker",
+                                                daemon=True)
+                self._thread.start()
+        return self
+
+    @property
+    def state(self):
+        job = self._current
+        if job is not None:
+            return WorkerState.CANCELLING if job.cancel_token.cancelled else WorkerState.RUNNING
+        return WorkerState.STOPPED if self._closed else WorkerState.IDLE
+
+    @property
+    def busy(self):
+        """True while a job runs or waits"""
+        return self._current is not None or bool(self._pending)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, func, name="macro run"):
+        """Queue `func(cancel_token)`; returns the MacroJob, or None if refused"""
+        self.start()
+        with self._condition:
+            if self._closed:
+                logger.warning("Not running %s: the worker is shut down", name)
+                return None
+            if len(self._pending) >= self.max_queued:
+                logger.warning("Not running %s: %d jobs are already waiting", name,
+                               len(self._pending))
+                metrics.inc('magicscript_jobs_rejected_total')
+                return None
+            job = MacroJob(name, func)
+            self._pending.append(job)
+            self._condition.notify()
+        return job
+
+    def cancel(self, reason="cancelled"):
+        """Cancel the running job and drop the queued ones"""
+        with self._condition:
+            self._drop_pending(reason)
+            job = self._current
+        if job is not None:
+            job.cancel_token.cancel(reason)
+
+    def _drop_pending(self, reason):
+        for job in self._pending:
+            job.cancel_token.cancel(reason)
+            job.run()  # Only marks it done
+        self._pending.clear()
+
+    def shutdown(self, timeout=WORKER_SHUTDOWN_TIMEOUT, reason="shutting down"):
+        """Stop accepting jobs, cancel the running one and wait for the thread to end.
+
+        Returns False if it was still running after `timeout` seconds.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.cancel(reason)
+        thread = self._thread
+        if thread is None or thread is threading.current_thread():
+            return True
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("Macro worker did not stop within %.1f seconds", timeout)
+            return False
+        return True
+
+    def _run(self):
+        condition = self._condition
+        while True:
+            with condition:
+                while not self._pending and not self._closed:
+                    condition.wait()
+                if not self._pending:
+                    return
+                job = self._current = self._pending.popleft()
+            try:
+                job.run()
+            finally:
+                self._current = None
+                if self.on_finished is not None:
+                    try:
+                        self.on_finished(job)
+                    except Exception as e:
+                        logger.error("Error after %s: %s", job.name, e, exc_info=True)
+
+
+# Macro optimizer
+#
+# A peephole pass over the action list: no-ops are dropped, adjacent waits
+# and instant moves are merged, and recorded mouse paths (instant moves
+# separated by short waits) are simplified with Ramer-Douglas-Peucker and
+# replayed as linear glides between the points that are kept. Actions with a
+# custom name are left alone, except for no-ops, so labelled steps survive.
+OPTIMIZE_PATH_TOLERANCE = 2.0  # Pixels a simplified path may deviate from the original
+OPTIMIZE_PATH_MAX_GAP = 0.1  # Seconds; a longer wait ends a path instead of joining a glide
+
+
+def simplify_path(points, tolerance=OPTIMIZE_PATH_TOLERANCE):
+    """Indices of the points of a polyline that Ramer-Douglas-Peucker keeps.
+
+    Distances are measured to the segment between the kept points (not the
+    infinite line), so a path that doubles back on itself is preserved.
+    """
+    import numpy as np
+
+    points = np.asarray(points, dtype=np.float64)
+    count = len(points)
+    if count < 3:
+        return list(range(count))
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start = points[first]
+        direction = points[last] - start
+        offsets = points[first + 1:last] - start
+        length_squared = float(direction @ direction)
+        if length_squared:
+            along = np.clip(offsets @ direction / length_squared, 0.0, 1.0)
+            offsets = offsets - along[:, None] * direction
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep).tolist()
+
+
+def predict_runtime(actions, step_pause=0.0, delay_range=None):
+    """Seconds a run of `actions` is expected to take: waits, mouse animations and step pauses"""
+    per_step = step_pause + (sum(delay_range) / 2 if delay_range else 0.0)
+    total = len(actions) * per_step
+    for action in actions:
+        if action.action_type == ActionType.WAIT:
+            total += max(0, action.params.get('seconds', 1))
+        elif action.action_type == ActionType.MOUSE_MOVE:
+            total += max(0, action.params.get('duration', 0.5))
+    return total
+
+
+class OptimizationReport:
+    """What optimize_actions removed, with the predicted runtime before and after"""
+
+    def __init__(self, steps_before, runtime_before):
+        self.steps_before = steps_before
+        self.steps_after = steps_before
+        self.runtime_before = runtime_before
+        self.runtime_after = runtime_before
+        self.dropped_noops = 0
+        self.merged_waits = 0
+        self.merged_moves = 0
+        self.path_steps_removed = 0
+
+    @property
+    def steps_removed(self):
+        return self.steps_before - self.steps_after
+
+    @property
+    def runtime_removed(self):
+        return self.runtime_before - self.runtime_after
+
+    def to_dict(self):
+        return {
+            'steps_before': self.steps_before,
+            'steps_after': self.steps_after,
+            'runtime_before': self.runtime_before,
+            'runtime_after': self.runtime_after,
+            'dropped_noops': self.dropped_noops,
+            'merged_waits': self.merged_waits,
+            'merged_moves': self.merged_moves,
+            'path_steps_removed': self.path_steps_removed,
+        }
+
+    def summary(self):
+        return (f"Removed {self.steps_removed} of {self.steps_before} steps "
+                f"({self.dropped_noops} no-ops, {self.merged_waits} merged waits, "
+                f"{self.merged_moves} merged moves, {self.path_steps_removed} path steps) "
+                f"and {self.runtime_removed:.2f} s of predicted runtime")
+
+
+def _is_noop(action):
+    params = action.params
+    action_type = action.action_type
+    if action_type == ActionType.WAIT:
+        return params.get('seconds', 1) <= 0
+    if action_type == ActionType.KEY_PRESS:
+        return not params.get('key', '')
+    if action_type == ActionType.KEY_COMBINATION:
+        return not params.get('keys', [])
+    if action_type == ActionType.MOUSE_SCROLL:
+        return params.get('scroll_type', 0) == 0 and params.get('amount', 0) == 0
+    if action_type == ActionType.MOUSE_MOVE:
+        return (params.get('move_type', 0) == 3 and params.get('x_offset', 50) == 0
+                and params.get('y_offset', 50) == 0 and params.get('duration', 0.5) <= 0)
+    return False
+
+
+def _mergeable(action):
+    return action.name == action.display_name()
+
+
+def _instant_move_type(action):
+    """move_type of an instant absolute (0) or relative (3) move, else None"""
+    if action.action_type != ActionType.MOUSE_MOVE or action.params.get('duration', 0.5) > 0:
+        return None
+    move_type = action.params.get('move_type', 0)
+    return move_type if move_type in (0, 3) else None
+
+
+def _instant_move(x, y, move_type=0):
+    if move_type == 3:
+        return Action(ActionType.MOUSE_MOVE,
+                      {'move_type': 3, 'x_offset': x, 'y_offset': y, 'duration': 0.0})
+    return Action(ActionType.MOUSE_MOVE, {'move_type': 0, 'x': x, 'y': y, 'duration': 0.0})
+
+
+def _merge_adjacent(previous, action, report):
+    """The single action replacing `previous` followed by `action`, or None if they do not merge"""
+    if previous.action_type == action.action_type == ActionType.WAIT:
+        report.merged_waits += 1
+        seconds = round(previous.params.get('seconds', 1) + action.params.get('seconds', 1), 6)
+        return Action(ActionType.WAIT, {'seconds': seconds})
+
+    first, second = _instant_move_type(previous), _instant_move_type(action)
+    if first is None or second is None:
+        return None
+    report.merged_moves += 1
+    if second == 0:  # An absolute move makes whatever came before it irrelevant
+        return _instant_move(action.params.get('x', 500), action.params.get('y', 500))
+    x_offset, y_offset = action.params.get('x_offset', 50), action.params.get('y_offset', 50)
+    if first == 0:
+        return _instant_move(previous.params.get('x', 500) + x_offset,
+                             previous.params.get('y', 500) + y_offset)
+    return _instant_move(previous.params.get('x_offset', 50) + x_offset,
+                         previous.params.get('y_offset', 50) + y_offset, 3)
+
+
+def _peephole(actions, report):
+    result = []
+    for action in actions:
+        if _is_noop(action):
+            report.dropped_noops += 1
+            continue
+        if result and _mergeable(action) and _mergeable(result[-1]):
+            merged = _merge_adjacent(result[-1], action, report)
+            if merged is not None:
+                result[-1] = merged
+                continue
+        result.append(action)
+    return result
+
+
+def _path_end(actions, start):
+    """Index past the recorded path starting at `start`: instant absolute moves, optionally
+    separated by single short waits, ending on a move"""
+    end = index = start + 1
+    while index < len(actions):
+        action = actions[index]
+        if not _mergeable(action):
+            break
+        if action.action_type == ActionType.WAIT:
+            if action.params.get('seconds', 1) > OPTIMIZE_PATH_MAX_GAP:
+                break
+            index += 1
+            continue
+        if _instant_move_type(action) != 0:
+            break
+        index += 1
+        end = index
+    return end
+
+
+def _simplify_paths(actions, tolerance, report):
+    result = []
+    index = 0
+    while index < len(actions):
+        action = actions[index]
+        if _instant_move_type(action) != 0 or not _mergeable(action):
+            result.append(action)
+            index += 1
+            continue
+
+        end = _path_end(actions, index)
+        points, times = [], []
+        elapsed = 0.0
+        for step in actions[index:end]:
+            if step.action_type == ActionType.WAIT:
+                elapsed += step.params.get('seconds', 1)
+            else:
+                points.append((step.params.get('x', 500), step.params.get('y', 500)))
+                times.append(round(elapsed, 6))
+        if len(points) < 3:
+            result.extend(actions[index:end])
+            index = end
+            continue
+
+        kept = simplify_path(points, tolerance)
+        report.path_steps_removed += end - index - len(kept)
+        result.append(action)
+        for previous, current in zip(kept, kept[1:]):
+            x, y = points[current]
+            duration = round(times[current] - times[previous], 6)
+            result.append(Action(ActionType.MOUSE_MOVE,
+                                 {'move_type': 0, 'x': x, 'y': y, 'duration': duration}))
+        index = end
+    return result
+
+
+def optimize_actions(actions, tolerance=OPTIMIZE_PATH_TOLERANCE, step_pause=0.0, delay_range=None):
+    """Return a simplified copy of `actions` and an OptimizationReport.
+
+    Recorded paths are replayed within `tolerance` pixels of the original
+    and take the same time; a negative tolerance leaves paths alone.
+    `step_pause` and `delay_range` only feed the runtime prediction.
+    """
+    report = OptimizationReport(len(actions), predict_runtime(actions, step_pause, delay_range))
+    optimized = _peephole(actions, report)
+    if tolerance >= 0:
+        optimized = _peephole(_simplify_paths(optimized, tolerance, report), report)
+    report.steps_after = len(optimized)
+    report.runtime_after = predict_runtime(optimized, step_pause, delay_range)
+    if report.steps_removed:
+        logger.info("Optimized macro: %s", report.summary())
+    return optimized, report
+
+
+# Macro recording
+#
+# Capture and encoding run on separate threads joined by an InputEventRing.
+# The capture side (a WindowsInputHook, or a test feeding synthetic events)
+# only writes numbers into preallocated arrays; a background encoder drains
+# the ring and turns the events into Actions.
+RECORDER_RING_SIZE = 65536  # Events buffered between capture and encoder (about a minute at 1 kHz)
+RECORDER_DRAIN_INTERVAL = 0.02  # Seconds between encoder passes
+RECORDER_MIN_WAIT = 0.01  # Shorter gaps are folded into the next WAIT instead of getting their own
+RECORDER_DOUBLE_CLICK_TIME = 0.5  # Clicks closer than this at the same spot become one multi-click
+RECORDER_STOP_KEY = 'f9'  # Ends a recording; never recorded itself
+WHEEL_DELTA = 120  # Wheel movement per notch
+
+# Input event kinds stored in the ring
+INPUT_EVENT_MOVE = 1  # x, y
+INPUT_EVENT_BUTTON_DOWN = 2  # x, y, code = index into RECORDER_BUTTONS
+INPUT_EVENT_BUTTON_UP = 3
+INPUT_EVENT_WHEEL = 4  # x, y, code = wheel delta (WHEEL_DELTA per notch, positive is up)
+INPUT_EVENT_KEY_DOWN = 5  # code = virtual-key code
+INPUT_EVENT_KEY_UP = 6
+
+RECORDER_BUTTONS = ('left', 'right', 'middle')
+MODIFIER_KEYS = ('ctrl', 'alt', 'shift', 'win')
+
+# Key names for recorded virtual-key codes: the first name VIRTUAL_KEY_CODES
+# gives each code, letters and digits, and the plain names for left/right modifiers
+KEY_NAMES = {}
+for _name, _code in VIRTUAL_KEY_CODES.items():
+    KEY_NAMES.setdefault(_code, _name)
+KEY_NAMES.update({code: chr(code).lower() for code in range(0x41, 0x5B)})
+KEY_NAMES.update({code: chr(code) for code in range(0x30, 0x3A)})
+KEY_NAMES.update({0xA0: 'shift', 0xA1: 'shift', 0xA2: 'ctrl', 0xA3: 'ctrl', 0xA4: 'alt',
+                  0xA5: 'alt', 0x5C: 'win'})
+del _name, _code
+
+
+def key_name(code):
+    """pyautogui key name for a virtual-key code, or None if it has none"""
+    name = KEY_NAMES.get(code)
+    if name is None and sys.platform == "win32":
+        char = ctypes.windll.user32.MapVirtualKeyW(code, 2) & 0xFFFF  # MAPVK_VK_TO_CHAR
+        if char:
+            name = chr(char).lower()
+    return name
+
+
+class InputEventRing:
+    """Preallocated single-producer, single-consumer queue of input events.
+
+    Events are stored column-wise in fixed-size arrays, so put() only writes
+    numbers into existing slots. Nothing is ever dropped: if the encoder
+    falls a whole ring behind, events spill into an overflow deque (counted
+    in `spilled`) and are drained after the ring, in order.
+    """
+
+    def __init__(self, capacity=RECORDER_RING_SIZE):
+        self.capacity = capacity
+        self.kinds = array('B', bytes(capacity))
+        self.times = array('d', bytes(8 * capacity))
+        self.xs = array('i', bytes(4 * capacity))
+        self.ys = array('i', bytes(4 * capacity))
+        self.codes = array('i', bytes(4 * capacity))
+        self.head = 0  # Events written; only the producer advances it
+        self.tail = 0  # Events read; only the consumer advances it
+        self.overflow = deque()
+        self.spilled = 0
+
+    def __len__(self):
+        return self.head - self.tail + len(self.overflow)
+
+    def put(self, kind, timestamp, x=0, y=0, code=0):
+        """Append one event; called from the capture thread"""
+        head = self.head
+        # Once anything has spilled, keep spilling until the encoder caught up, to keep the order
+        if self.overflow or head - self.tail >= self.capacity:
+            self.overflow.append((kind, timestamp, x, y, code))
+            self.spilled += 1
+            return
+        slot = head % self.capacity
+        self.kinds[slot] = kind
+        self.times[slot] = timestamp
+        self.xs[slot] = x
+        self.ys[slot] = y
+        self.codes[slot] = code
+        self.head = head + 1
+
+    def drain(self, handle):
+        """Pass every pending event to handle(kind, timestamp, x, y, code), oldest first.
+
+        Called from the consumer thread; returns the number of events handled.
+        """
+        capacity = self.capacity
+        kinds, times, xs, ys, codes = self.kinds, self.times, self.xs, self.ys, self.codes
+        tail = start = self.tail
+        spilled = 0
+        while True:
+            head = self.head
+            while tail < head:
+                slot = tail % capacity
+                handle(kinds[slot], times[slot], xs[slot], ys[slot], codes[slot])
+                tail += 1
+                self.tail = tail
+            if self.head != tail:
+                continue  # More events arrived meanwhile
+            if not self.overflow:
+                break
+            # The ring is empty, and the producer leaves it alone while the overflow holds events
+            while self.overflow:
+                handle(*self.overflow.popleft())
+                spilled += 1
+        return tail - start + spilled
+
+
+class RecordingEncoder:
+    """Turns recorded input events into Actions; used as the ring's drain handler.
+
+    Every new cursor position becomes an instant MOUSE_MOVE, button presses
+    MOUSE_CLICKs (quick repeats at the same spot merge into one multi-click),
+    wheel notches MOUSE_SCROLLs and keys KEY_PRESS, or KEY_COMBINATION while
+    modifiers are held. The time in between becomes WAITs of at least
+    RECORDER_MIN_WAIT, rounded to milliseconds against the recorded timeline
+    so the rounding does not add up over a long recording.
+    """
+
+    def __init__(self, stop_code=None, on_stop=None):
+        self.actions = []
+        self.events = 0
+        # Recorded time the emitted actions account for; starts at the first action
+        self._clock = None
+        self._cursor = None  # Last recorded cursor position
+        self._last_click = None  # (button, x, y, timestamp, index in actions) of the latest click
+        self._modifiers = {}  # Held modifier -> whether a combination used it
+        self._wheel = 0  # Wheel delta short of a whole notch
+        self._stop_code = stop_code
+        self._on_stop = on_stop
+
+    def __call__(self, kind, timestamp, x, y, code):
+        self.events += 1
+        if kind == INPUT_EVENT_MOVE:
+            self._move(timestamp, x, y)
+        elif kind == INPUT_EVENT_BUTTON_DOWN:
+            self._button_down(timestamp, x, y, code)
+        elif kind == INPUT_EVENT_WHEEL:
+            self._wheel_turned(timestamp, x, y, code)
+        elif kind == INPUT_EVENT_KEY_DOWN:
+            self._key_down(timestamp, code)
+        elif kind == INPUT_EVENT_KEY_UP:
+            self._key_up(timestamp, code)
+        # Button releases carry nothing a MOUSE_CLICK does not already replay
+
+    def _emit(self, timestamp, action_type, params):
+        if self._clock is None:
+            self._clock = timestamp
+        gap = timestamp - self._clock
+        if gap >= RECORDER_MIN_WAIT:
+            seconds = round(gap, 3)
+            self.actions.append(Action(ActionType.WAIT, {'seconds': seconds}))
+            self._clock += seconds
+        self.actions.append(Action(action_type, params))
+
+    def _move(self, timestamp, x, y):
+        if self._cursor != (x, y):
+            self._cursor = (x, y)
+            self._emit(timestamp, ActionType.MOUSE_MOVE,
+                       {'move_type': 0, 'x': x, 'y': y, 'duration': 0.0})
+
+    def _button_down(self, timestamp, x, y, code):
+        if not 0 <= code < len(RECORDER_BUTTONS):
+            return
+        button = RECORDER_BUTTONS[code]
+        self._move(timestamp, x, y)
+        actions = self.actions
+        last = self._last_click
+        if (last is not None and last[:3] == (button, x, y)
+                and timestamp - last[3] <= RECORDER_DOUBLE_CLICK_TIME
+                and last[4] == len(actions) - 1 - (actions[-1].action_type == ActionType.WAIT)):
+            if actions[-1].action_type == ActionType.WAIT:
+                self._clock -= actions.pop().params['seconds']
+            clicks = actions[-1].params.get('clicks', 1) + 1
+            actions[-1] = Action(ActionType.MOUSE_CLICK, {'button': button, 'clicks': clicks})
+        else:
+            self._emit(timestamp, ActionType.MOUSE_CLICK, {'button': button, 'clicks': 1})
+        self._last_click = (button, x, y, timestamp, len(actions) - 1)
+
+    def _wheel_turned(self, timestamp, x, y, delta):
+        self._wheel += delta
+        notches = int(self._wheel / WHEEL_DELTA)
+        if notches:
+            self._wheel -= notches * WHEEL_DELTA
+            self._move(timestamp, x, y)
+            self._emit(timestamp, ActionType.MOUSE_SCROLL, {'scroll_type': 0, 'amount': notches})
+
+    def _key_down(self, timestamp, code):
+        if code == self._stop_code:
+            if self._on_stop is not None:
+                self._on_stop()
+            return
+        name = key_name(code)
+        if name is None:
+            logger.debug("Not recording key without a name: %#x", code)
+            return
+        if name in MODIFIER_KEYS:
+            self._modifiers.setdefault(name, False)  # Ignores auto-repeat while it is held
+        elif self._modifiers:
+            keys = list(self._modifiers) + [name]
+            self._modifiers = dict.fromkeys(self._modifiers, True)
+            self._emit(timestamp, ActionType.KEY_COMBINATION, {'keys': keys})
+        else:
+            self._emit(timestamp, ActionType.KEY_PRESS, {'key': name})
+
+    def _key_up(self, timestamp, code):
+        if self._modifiers.pop(key_name(code), True) is False:
+            # A modifier pressed and released on its own
+            self._emit(timestamp, ActionType.KEY_PRESS, {'key': key_name(code)})
+
+
+# Windows low-level hooks
+WH_KEYBOARD_LL = 13
+WH_MOUSE_LL = 14
+WM_QUIT = 0x0012
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+WM_SYSKEYDOWN = 0x0104
+WM_SYSKEYUP = 0x0105
+LLMHF_INJECTED = 0x01
+LLKHF_INJECTED = 0x10
+
+# Mouse hook message -> (event kind, button index)
+MOUSE_HOOK_EVENTS = {
+    0x0200: (INPUT_EVENT_MOVE, 0),  # WM_MOUSEMOVE
+    0x0201: (INPUT_EVENT_BUTTON_DOWN, 0),  # WM_LBUTTONDOWN
+    0x0202: (INPUT_EVENT_BUTTON_UP, 0),
+    0x0204: (INPUT_EVENT_BUTTON_DOWN, 1),  # WM_RBUTTONDOWN
+    0x0205: (INPUT_EVENT_BUTTON_UP, 1),
+    0x0207: (INPUT_EVENT_BUTTON_DOWN, 2),  # WM_MBUTTONDOWN
+    0x0208: (INPUT_EVENT_BUTTON_UP, 2),
+    0x020A: (INPUT_EVENT_WHEEL, 0),  # WM_MOUSEWHEEL
+}
+KEY_HOOK_EVENTS = {
+    WM_KEYDOWN: INPUT_EVENT_KEY_DOWN,
+    WM_SYSKEYDOWN: INPUT_EVENT_KEY_DOWN,
+    WM_KEYUP: INPUT_EVENT_KEY_UP,
+    WM_SYSKEYUP: INPUT_EVENT_KEY_UP,
+}
+
+
+class MouseHookInfo(ctypes.Structure):
+    # MSLLHOOKSTRUCT, with the POINT flattened so reading it creates no sub-structure
+    _fields_ = [
+        ('x', wintypes.LONG),
+        ('y', wintypes.LONG),
+        ('mouseData', wintypes.DWORD),
+        ('flags', wintypes.DWORD),
+        ('time', wintypes.DWORD),
+        ('dwExtraInfo', ctypes.c_size_t),
+    ]
+
+
+class KeyboardHookInfo(ctypes.Structure):
+    # KBDLLHOOKSTRUCT
+    _fields_ = [
+        ('vkCode', wintypes.DWORD),
+        ('scanCode', wintypes.DWORD),
+        ('flags', wintypes.DWORD),
+        ('time', wintypes.DWORD),
+        ('dwExtraInfo', ctypes.c_size_t),
+    ]
+
+
+class WindowsInputHook:
+    """Capture source using WH_MOUSE_LL/WH_KEYBOARD_LL hooks on a thread of their own.
+
+    The hook callbacks copy the event into a preallocated struct and hand its
+    numbers to InputEventRing.put. Injected input (our own macro playback,
+    other automation) is skipped.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._thread_id = None
+
+    def start(self, ring):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ring, ready), name="InputHook",
+                                        daemon=True)
+        self._thread.start()
+        ready.wait(5.0)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        if self._thread_id is not None:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+        self._thread.join(5.0)
+        self._thread = self._thread_id = None
+
+    def _run(self, ring, ready):
+        user32 = ctypes.WinDLL('user32', use_last_error=True)
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        hook_proc = ctypes.WINFUNCTYPE(wintypes.LPARAM, ctypes.c_int, wintypes.WPARAM,
+                                       wintypes.LPARAM)
+        user32.SetWindowsHookExW.argtypes = (ctypes.c_int, hook_proc, wintypes.HINSTANCE,
+                                             wintypes.DWORD)
+        user32.SetWindowsHookExW.restype = wintypes.HHOOK
+        user32.CallNextHookEx.argtypes = (wintypes.HHOOK, ctypes.c_int, wintypes.WPARAM,
+                                          wintypes.LPARAM)
+        user32.CallNextHookEx.restype = wintypes.LPARAM
+        kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+
+        put = ring.put
+        clock = time.perf_counter
+        memmove = ctypes.memmove
+        call_next = user32.CallNextHookEx
+        mouse, keyboard = MouseHookInfo(), KeyboardHookInfo()
+        mouse_address, mouse_size = ctypes.addressof(mouse), ctypes.sizeof(mouse)
+        keyboard_address, keyboard_size = ctypes.addressof(keyboard), ctypes.sizeof(keyboard)
+
+        def on_mouse(n_code, w_param, l_param):
+            if n_code == 0:
+                event = MOUSE_HOOK_EVENTS.get(w_param)
+                if event is not None:
+                    memmove(mouse_address, l_param, mouse_size)
+                    if not mouse.flags & LLMHF_INJECTED:
+                        kind, code = event
+                        if kind == INPUT_EVENT_WHEEL:
+                            code = mouse.mouseData >> 16
+                            if code >= 0x8000:
+                                code -= 0x10000
+                        put(kind, clock(), mouse.x, mouse.y, code)
+            return call_next(None, n_code, w_param, l_param)
+
+        def on_keyboard(n_code, w_param, l_param):
+            if n_code == 0:
+                kind = KEY_HOOK_EVENTS.get(w_param)
+                if kind is not None:
+                    memmove(keyboard_address, l_param, keyboard_size)
+                    if not keyboard.flags & LLKHF_INJECTED:
+                        put(kind, clock(), 0, 0, keyboard.vkCode)
+            return call_next(None, n_code, w_param, l_param)
+
+        # Keep the callbacks referenced for as long as the hooks are installed
+        callbacks = (hook_proc(on_mouse), hook_proc(on_keyboard))
+        module = kernel32.GetModuleHandleW(None)
+        hooks = [user32.SetWindowsHookExW(WH_MOUSE_LL, callbacks[0], module, 0),
+                 user32.SetWindowsHookExW(WH_KEYBOARD_LL, callbacks[1], module, 0)]
+        self._thread_id = kernel32.GetCurrentThreadId()
+        ready.set()
+        try:
+            if not all(hooks):
+                logger.error("Could not install input hooks: %s",
+                             ctypes.WinError(ctypes.get_last_error()))
+                return
+            msg = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            for hook in hooks:
+                if hook:
+                    user32.UnhookWindowsHookEx(hook)
+
+
+def default_input_source():
+    """Capture source for this platform, or None where recording is not supported"""
+    return WindowsInputHook() if sys.platform == "win32" else None
+
+
+class MacroRecorder:
+    """Records the user's mouse and keyboard input as a list of Actions.
+
+    The capture source writes events into an InputEventRing from its own
+    thread; a background thread drains the ring every RECORDER_DRAIN_INTERVAL
+    into a RecordingEncoder. Pressing `stop_key` calls `on_stop` (from the
+    encoder thread); stop() then returns the actions.
+
+    Without a capture source (default_input_source() is None off Windows),
+    events are fed in with feed(), which is how synthetic streams are
+    recorded on Linux.
+    """
+
+    def __init__(self, source=None, capacity=RECORDER_RING_SIZE, stop_key=RECORDER_STOP_KEY,
+                 on_stop=None):
+        self.ring = InputEventRing(capacity)
+        self.source = source if source is not None else default_input_source()
+        self.encoder = RecordingEncoder(VIRTUAL_KEY_CODES.get(stop_key), on_stop)
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._encode_loop, name="MacroRecorder", daemon=True)
+        self._thread.start()
+        if self.source is not None:
+            self.source.start(self.ring)
+        logger.info("Recording started")
+
+    def feed(self, kind, timestamp, x=0, y=0, code=0):
+        """Add an event as a capture source would"""
+        self.ring.put(kind, timestamp, x, y, code)
+
+    def _encode_loop(self):
+        while not self._stop.wait(RECORDER_DRAIN_INTERVAL):
+            self._drain()
+
+    def _drain(self):
+        try:
+            self.ring.drain(self.encoder)
+        except Exception as e:
+            logger.error("Error encoding recorded input: %s", e, exc_info=True)
+
+    def stop(self):
+        """Stop capturing, encode what is left and return the recorded actions"""
+        if self.source is not None:
+            self.source.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._drain()
+        logger.info("Recorded %d actions from %d input events (%d past the ring)",
+                    len(self.encoder.actions), self.encoder.events, self.ring.spilled)
+        return self.encoder.actions
+
+
+# Background, atomic config persistence
+def write_file_atomic(path, data):
+    """Write text or bytes to `path` via a temp file in the same directory and a rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp",
+                                     dir=directory)
+    try:
+        with os.fdopen(fd, 'wb' if isinstance(data, bytes) else 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ConfigPersister:
+    """Write-behind saver for ConfigManager.
+
+    `schedule()` stores the latest snapshot and returns immediately. A
+    background thread writes it once `delay` seconds have passed since the
+    first unsaved change, so a burst of changes costs a single write.
+    `flush()` writes any pending snapshot right away on the calling thread.
+    """
+
+    def __init__(self, write, delay=CONFIG_SAVE_DELAY):
+        self._write = write
+        self.delay = delay
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending = None
+        self._pending_seq = 0
+        self._written_seq = 0
+        self._deadline = None
+        self._closed = False
+        self._thread = None
+        _open_persisters.add(self)
+
+    def schedule(self, snapshot):
+        with self._condition:
+            if self._closed:
+                # Late changes after shutdown are still written, just synchronously
+                self._pending_seq += 1
+                self._pending = snapshot
+            else:
+                if self._pending is None:
+                    self._deadline = time.monotonic() + self.delay
+                self._pending_seq += 1
+                self._pending = snapshot
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="ConfigPersister",
+                                                    daemon=True)
+                    self._thread.start()
+                self._condition.notify()
+                return
+        self.flush()
+
+    def has_pending(self):
+        with self._condition:
+            return self._pending is not None
+
+    def flush(self):
+        """Write the pending snapshot (if any) now; returns False on write errors"""
+        with self._condition:
+            snapshot, seq = self._take_pending()
+        if snapshot is None:
+            return True
+        return self._write_snapshot(snapshot, seq)
+
+    def close(self):
+        """Flush and stop the background thread"""
+        _open_persisters.discard(self)
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        result = self.flush()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        return result
+
+    def _take_pending(self):
+        snapshot, seq = self._pending, self._pending_seq
+        self._pending = None
+        self._deadline = None
+        return snapshot, seq
+
+    def _write_snapshot(self, snapshot, seq):
+        with self._write_lock:
+            if seq <= self._written_seq:
+                # A newer snapshot has already been written
+                return True
+            result = self._write(snapshot)
+            self._written_seq = seq
+            return result
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._pending is not None:
+                        remaining = self._deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    return
+                snapshot, seq = self._take_pending()
+            self._write_snapshot(snapshot, seq)
+
+
+# Persisters not closed yet; weak, so unused managers can still be collected
+_open_persisters = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_persisters():
+    """Write what open ConfigPersisters still hold before the process exits"""
+    for persister in list(_open_persisters):
+        persister.close()
+
+
+# Configuration manager
+class ConfigManager:
+    def __init__(self, config_file=CONFIG_FILE, save_delay=CONFIG_SAVE_DELAY):
+        self.config_file = config_file
+        self.config = self.load_config()
+        # Ensure actions are properly converted to Action objects
+        self._normalize_actions()
+        # Setters go through the persister; a zero delay saves synchronously
+        self.persister = ConfigPersister(self._write_snapshot, save_delay) if save_delay else None
+        
+    def load_config(self):
+        default_config = {
+            'idle_time': DEFAULT_IDLE_TIME,
+            'actions': [],
+            'enabled': True,
+            'run_on_startup': False,
+            'random_delay': False,
+            'random_delay_min': 0,
+            'random_delay_max': 30,
+            'step_pause': DEFAULT_STEP_PAUSE,
+            'log_level': DEFAULT_LOG_LEVEL,
+            'input_backend': DEFAULT_INPUT_BACKEND,
+            'metrics_file': METRICS_FILE,
+            'metrics_interval': METRICS_EXPORT_INTERVAL,
+            'start_in_tray': False,
+            'window_unload_delay': WINDOW_UNLOAD_DELAY
+        }
+        
+        try:
+            if os.path.exists(self.config_file):
+                with open(self.config_file, 'r') as f:
+                    config = json.load(f)
+                    # Ensure all default keys exist
+                    for key, value in default_config.items():
+                        if key not in config:
+                            config[key] = value
+                    return config
+        except Exception as e:
+            logger.error("Error loading config: %s", e)
+            
+        return default_config
+    
+    def save_config(self):
+        """Write the config to disk immediately (atomically).
+
+        Goes through the persister when there is one, so a snapshot it still
+        holds from an earlier change can never be written over this one.
+        """
+        if self.persister is None:
+            return self._write_snapshot(self._snapshot())
+        self.persister.schedule(self._snapshot())
+        return self.persister.flush()
+
+    def request_save(self):
+        """Schedule a save; changes made in quick succession are written once"""
+        if self.persister is None:
+            return self.save_config()
+        self.persister.schedule(self._snapshot())
+        return True
+
+    def flush(self):
+        """Write any pending changes now"""
+        if self.persister is None:
+            return True
+        return self.persister.flush()
+
+    def close(self):
+        """Write pending changes and stop the background writer"""
+        if self.persister is None:
+            return True
+        return self.persister.close()
+
+    def _snapshot(self):
+        # Copy the containers so later edits on the GUI thread don't race the writer
+        snapshot = self.config.copy()
+        if 'actions' in snapshot:
+            snapshot['actions'] = list(snapshot['actions'])
+        return snapshot
+
+    def _write_snapshot(self, snapshot):
+        try:
+            # Convert actions to serializable format
+            if 'actions' in snapshot:
+                serialized_actions = []
+                for action in snapshot['actions']:
+                    if isinstance(action, Action):
+                        serialized_actions.append(action.to_dict())
+                    elif isinstance(action, dict):
+                        # If it's already a dict, keep it as is
+                        serialized_actions.append(action)
+                    else:
+                        logger.warning("Unknown action type: %s", type(action))
+
+                snapshot['actions'] = serialized_actions
+
+            write_file_atomic(self.config_file, json.dumps(snapshot, indent=4))
+            return True
+        except Exception as e:
+            logger.error("Error saving config: %s", e)
+            return False
+    
+    def get_actions(self):
+        actions = []
+        for action_data in self.config.get('actions', []):
+            try:
+                if isinstance(action_data, dict):
+                    # Convert dictionary to Action object
+                    actions.append(Action.from_dict(action_data))
+                elif isinstance(action_data, Action):
+                    # Already an Action object
+                    actions.append(action_data)
+                else:
+                    logger.warning("Skipping unknown action type: %s", type(action_data))
+            except Exception as e:
+                logger.error("Error loading action: %s", e)
+        return actions
+    
+    def set_actions(self, actions):
+        self.config['actions'] = actions
+        self.request_save()
+    
+    def get_idle_time(self):
+        return self.config.get('idle_time', DEFAULT_IDLE_TIME)
+    
+    def set_idle_time(self, seconds):
+        self.config['idle_time'] = seconds
+        self.request_save()
+    
+    def is_enabled(self):
+        return self.config.get('enabled', True)
+    
+    def set_enabled(self, enabled):
+        self.config['enabled'] = enabled
+        self.request_save()
+    
+    def get_run_on_startup(self):
+        return self.config.get('run_on_startup', False)
+    
+    def set_run_on_startup(self, enabled):
+        self.config['run_on_startup'] = enabled
+        self.request_save()
+        self._update_startup_registry(enabled)
+    
+    def _update_startup_registry(self, enabled):
+        try:
+            import winreg
+            key = winreg.OpenKey(
+                winreg.HKEY_CURRENT_USER,
+                r"Software\Microsoft\Windows\CurrentVersion\Run",
                 0, winreg.KEY_SET_VALUE
             )
             
@@ -464,1159 +4647,372 @@ class ConfigManager:
             
             winreg.CloseKey(key)
         except Exception as e:
-            logger.error(f"Error updating startup registry: {e}")
+            logger.error("Error updating startup registry: %s", e)
     
     def get_random_delay(self):
         return self.config.get('random_delay', False)
     
     def set_random_delay(self, enabled):
         self.config['random_delay'] = enabled
-        self.save_config()
+        self.request_save()
     
     def get_random_delay_range(self):
         min_delay = self.config.get('random_delay_min', 0)
         max_delay = self.config.get('random_delay_max', 30)
         return min_delay, max_delay
+
+    def get_run_settings(self):
+        """(delay_range, step_pause) to run macros with; delay_range is None without delays"""
+        delay_range = self.get_random_delay_range() if self.get_random_delay() else None
+        return delay_range, self.get_step_pause()
     
     def set_random_delay_range(self, min_delay, max_delay):
         self.config['random_delay_min'] = min_delay
         self.config['random_delay_max'] = max_delay
-        self.save_config()
-
-    def _normalize_actions(self):
-        """Ensure all actions in the config are properly converted to Action objects"""
-        if 'actions' in self.config:
-            # Get actions as Action objects
-            actions = self.get_actions()
-            # Store them back in the config
-            self.config['actions'] = actions
-            # No need to save here as this is just normalizing the in-memory representation
-
-
-# Custom list widget item for actions
-class ActionListWidgetItem(QListWidgetItem):
-    def __init__(self, action, parent=None):
-        super().__init__(action.name, parent)
-        self.action = action
-        self.setToolTip(self._generate_tooltip())
-    
-    def _generate_tooltip(self):
-        action_type = self.action.action_type.name.replace('_', ' ').title()
-        params = ', '.join([f"{k}: {v}" for k, v in self.action.params.items()])
-        return f"Type: {action_type}\nParameters: {params}"
-
-
-# Dialog for adding/editing actions
-class ActionDialog(QDialog):
-    def __init__(self, parent=None, action=None):
-        super().__init__(parent)
-        self.action = action
-        self.setWindowTitle("Add Action" if action is None else "Edit Action")
-        self.setMinimumWidth(400)
-        self.setup_ui()
-        
-    def setup_ui(self):
-        layout = QVBoxLayout()
-        
-        # Action type selection
-        type_layout = QHBoxLayout()
-        type_layout.addWidget(QLabel("Action Type:"))
-        self.type_combo = QComboBox()
-        for action_type in ActionType:
-            self.type_combo.addItem(action_type.name.replace('_', ' ').title(), action_type)
-        self.type_combo.currentIndexChanged.connect(self.on_action_type_changed)
-        type_layout.addWidget(self.type_combo)
-        layout.addLayout(type_layout)
-        
-        # Parameters group
-        self.params_group = QGroupBox("Parameters")
-        self.params_layout = QFormLayout()
-        self.params_group.setLayout(self.params_layout)
-        layout.addWidget(self.params_group)
-        
-        # Buttons
-        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
-        button_box.accepted.connect(self.accept)
-        button_box.rejected.connect(self.reject)
-        layout.addWidget(button_box)
-        
-        self.setLayout(layout)
-
-        # Initialize with current action if editing, otherwise show default parameters
-        if self.action:
-            index = self.type_combo.findData(self.action.action_type)
-            if index >= 0:
-                self.type_combo.setCurrentIndex(index)
-            self.on_action_type_changed()
-            self.populate_params()
-        else:
-            # Show default parameters for first action type
-            self.on_action_type_changed()
-    
-    def on_action_type_changed(self):
-        # Clear previous parameters
-        while self.params_layout.rowCount() > 0:
-            self.params_layout.removeRow(0)
-        
-        action_type = self.type_combo.currentData()
-        
-        if action_type == ActionType.MOUSE_MOVE:
-            # Movement type
-            self.move_type_combo = QComboBox()
-            self.move_type_combo.addItems([
-                "Specific Coordinates",
-                "Random in Range",
-                "Fully Random",
-                "Relative to Current Position",
-                "Random Range from Current Position"
-            ])
-            self.move_type_combo.currentIndexChanged.connect(self._update_mouse_move_ui)
-            self.params_layout.addRow("Movement Type:", self.move_type_combo)
-
-            # Coordinates group
-            self.coords_group = QGroupBox("Coordinates")
-            coords_layout = QFormLayout()
-
-            # X coordinate
-            self.x_spin = QSpinBox()
-            self.x_spin.setRange(0, 9999)
-            self.x_spin.setValue(500)
-            self.x_label = QLabel("X Coordinate:")
-            coords_layout.addRow(self.x_label, self.x_spin)
-
-            # Y coordinate
-            self.y_spin = QSpinBox()
-            self.y_spin.setRange(0, 9999)
-            self.y_spin.setValue(500)
-            self.y_label = QLabel("Y Coordinate:")
-            coords_layout.addRow(self.y_label, self.y_spin)
-
-            # X range
-            range_x_layout = QHBoxLayout()
-            self.x_min_spin = QSpinBox()
-            self.x_min_spin.setRange(0, 9999)
-            self.x_min_spin.setValue(0)
-            self.x_max_spin = QSpinBox()
-            self.x_max_spin.setRange(0, 9999)
-            self.x_max_spin.setValue(1000)
-            range_x_layout.addWidget(QLabel("Min:"))
-            range_x_layout.addWidget(self.x_min_spin)
-            range_x_layout.addWidget(QLabel("Max:"))
-            range_x_layout.addWidget(self.x_max_spin)
-            self.x_range_label = QLabel("X Range:")
-            coords_layout.addRow(self.x_range_label, range_x_layout)
-
-            # Y range
-            range_y_layout = QHBoxLayout()
-            self.y_min_spin = QSpinBox()
-            self.y_min_spin.setRange(0, 9999)
-            self.y_min_spin.setValue(0)
-            self.y_max_spin = QSpinBox()
-            self.y_max_spin.setRange(0, 9999)
-            self.y_max_spin.setValue(1000)
-            range_y_layout.addWidget(QLabel("Min:"))
-            range_y_layout.addWidget(self.y_min_spin)
-            range_y_layout.addWidget(QLabel("Max:"))
-            range_y_layout.addWidget(self.y_max_spin)
-            self.y_range_label = QLabel("Y Range:")
-            coords_layout.addRow(self.y_range_label, range_y_layout)
-
-            self.coords_group.setLayout(coords_layout)
-            self.params_layout.addRow("", self.coords_group)
-
-            # Duration
-            self.duration_spin = QDoubleSpinBox()
-            self.duration_spin.setRange(0.1, 10.0)
-            self.duration_spin.setValue(0.5)
-            self.duration_spin.setSingleStep(0.1)
-            self.params_layout.addRow("Duration (seconds):", self.duration_spin)
-
-            # Initialize UI based on movement type
-            self._update_mouse_move_ui()
-            
-        elif action_type == ActionType.MOUSE_CLICK:
-            # Button
-            self.button_combo = QComboBox()
-            self.button_combo.addItems(["left", "right", "middle"])
-            self.params_layout.addRow("Button:", self.button_combo)
-            
-            # Clicks
-            self.clicks_spin = QSpinBox()
-            self.clicks_spin.setRange(1, 10)
-            self.clicks_spin.setValue(1)
-            self.params_layout.addRow("Clicks:", self.clicks_spin)
-            
-        elif action_type == ActionType.MOUSE_SCROLL:
-            # Scroll type
-            self.scroll_type_combo = QComboBox()
-            self.scroll_type_combo.addItems(["Fixed Amount", "Random in Range"])
-            self.scroll_type_combo.currentIndexChanged.connect(self._update_scroll_ui)
-            self.params_layout.addRow("Scroll Type:", self.scroll_type_combo)
-
-            # Fixed amount
-            self.amount_spin = QSpinBox()
-            self.amount_spin.setRange(-100, 100)
-            self.amount_spin.setValue(10)
-            self.params_layout.addRow("Amount (+ up, - down):", self.amount_spin)
-
-            # Random range
-            range_layout = QHBoxLayout()
-            self.min_amount_spin = QSpinBox()
-            self.min_amount_spin.setRange(-100, 100)
-            self.min_amount_spin.setValue(-20)
-            self.max_amount_spin = QSpinBox()
-            self.max_amount_spin.setRange(-100, 100)
-            self.max_amount_spin.setValue(20)
-            range_layout.addWidget(QLabel("Min:"))
-            range_layout.addWidget(self.min_amount_spin)
-            range_layout.addWidget(QLabel("Max:"))
-            range_layout.addWidget(self.max_amount_spin)
-            self.range_row = self.params_layout.addRow("Range:", range_layout)
-
-            # Initialize UI based on scroll type
-            self._update_scroll_ui()
-            
-        elif action_type == ActionType.KEY_PRESS:
-            # Key
-            self.key_edit = QLineEdit()
-            self.key_edit.setPlaceholderText("e.g. a, b, enter, space, tab, etc.")
-            self.params_layout.addRow("Key:", self.key_edit)
-            
-        elif action_type == ActionType.KEY_COMBINATION:
-            # Keys
-            self.keys_edit = QLineEdit()
-            self.keys_edit.setPlaceholderText("e.g. ctrl, alt, delete (comma separated)")
-            self.params_layout.addRow("Keys (comma separated):", self.keys_edit)
-            
-        elif action_type == ActionType.WAIT:
-            # Seconds
-            self.seconds_spin = QDoubleSpinBox()
-            self.seconds_spin.setRange(0.1, 60.0)
-            self.seconds_spin.setValue(1.0)
-            self.seconds_spin.setSingleStep(0.1)
-            self.params_layout.addRow("Seconds:", self.seconds_spin)
-    
-    def _update_mouse_move_ui(self, index=None):
-        """Update the mouse move UI based on the selected movement type"""
-        try:
-            if index is None:
-                index = self.move_type_combo.currentIndex()
-
-            # Show/hide appropriate controls based on movement type
-            if index == 0:  # Specific Coordinates
-                self.x_spin.setVisible(True)
-                self.y_spin.setVisible(True)
-                self.x_min_spin.setVisible(False)
-                self.x_max_spin.setVisible(False)
-                self.y_min_spin.setVisible(False)
-                self.y_max_spin.setVisible(False)
-
-                # Update labels for absolute coordinates
-                self.x_label.setText("X Coordinate:")
-                self.y_label.setText("Y Coordinate:")
-
-            elif index == 1:  # Random in Range
-                self.x_spin.setVisible(False)
-                self.y_spin.setVisible(False)
-                self.x_min_spin.setVisible(True)
-                self.x_max_spin.setVisible(True)
-                self.y_min_spin.setVisible(True)
-                self.y_max_spin.setVisible(True)
-
-                # Update labels for absolute range
-                self.x_range_label.setText("X Range:")
-                self.y_range_label.setText("Y Range:")
-
-            elif index == 3:  # Relative to Current Position
-                self.x_spin.setVisible(True)
-                self.y_spin.setVisible(True)
-                self.x_min_spin.setVisible(False)
-                self.x_max_spin.setVisible(False)
-                self.y_min_spin.setVisible(False)
-                self.y_max_spin.setVisible(False)
-
-                # Update labels for relative coordinates
-                self.x_label.setText("X Offset:")
-                self.y_label.setText("Y Offset:")
-
-                # Allow negative values for relative movement
-                self.x_spin.setRange(-9999, 9999)
-                self.y_spin.setRange(-9999, 9999)
-
-                # Set default values to small offsets
-                if self.x_spin.value() == 500 and self.y_spin.value() == 500:
-                    self.x_spin.setValue(50)
-                    self.y_spin.setValue(50)
-
-            elif index == 4:  # Random Range from Current Position
-                self.x_spin.setVisible(False)
-                self.y_spin.setVisible(False)
-                self.x_min_spin.setVisible(True)
-                self.x_max_spin.setVisible(True)
-                self.y_min_spin.setVisible(True)
-                self.y_max_spin.setVisible(True)
-
-                # Update labels for relative range
-                self.x_range_label.setText("X Offset Range:")
-                self.y_range_label.setText("Y Offset Range:")
-
-                # Allow negative values for relative range
-                self.x_min_spin.setRange(-9999, 9999)
-                self.x_max_spin.setRange(-9999, 9999)
-                self.y_min_spin.setRange(-9999, 9999)
-                self.y_max_spin.setRange(-9999, 9999)
-
-                # Set default values to small offset ranges
-                if self.x_min_spin.value() == 0 and self.x_max_spin.value() == 1000:
-                    self.x_min_spin.setValue(-50)
-                    self.x_max_spin.setValue(50)
-                    self.y_min_spin.setValue(-50)
-                    self.y_max_spin.setValue(50)
-
-            else:  # Fully Random
-                self.coords_group.setVisible(False)
-                return
-
-            self.coords_group.setVisible(True)
-
-        except Exception as e:
-            logger.error(f"Error in _update_mouse_move_ui: {e}", exc_info=True)
-            # Don't crash the application, just show the error
-            QMessageBox.warning(None, "Error", f"Error updating UI: {str(e)}")
-
-    def _update_scroll_ui(self, index=None):
-        """Update the scroll UI based on the selected scroll type"""
-        if index is None:
-            index = self.scroll_type_combo.currentIndex()
-
-        # Show/hide appropriate controls based on scroll type
-        if index == 0:  # Fixed Amount
-            self.amount_spin.setVisible(True)
-            self.min_amount_spin.setVisible(False)
-            self.max_amount_spin.setVisible(False)
-        else:  # Random in Range
-            self.amount_spin.setVisible(False)
-            self.min_amount_spin.setVisible(True)
-            self.max_amount_spin.setVisible(True)
-
-    def populate_params(self):
-        action_type = self.action.action_type
-        params = self.action.params
-
-        if action_type == ActionType.MOUSE_MOVE:
-            # Set movement type
-            move_type = params.get('move_type', 0)
-            self.move_type_combo.setCurrentIndex(move_type)
-
-            if move_type == 0:  # Specific Coordinates
-                if 'x' in params:
-                    self.x_spin.setValue(params['x'] if params['x'] is not None else 500)
-                if 'y' in params:
-                    self.y_spin.setValue(params['y'] if params['y'] is not None else 500)
-            elif move_type == 1:  # Random in Range
-                if 'x_min' in params:
-                    self.x_min_spin.setValue(params['x_min'])
-                if 'x_max' in params:
-                    self.x_max_spin.setValue(params['x_max'])
-                if 'y_min' in params:
-                    self.y_min_spin.setValue(params['y_min'])
-                if 'y_max' in params:
-                    self.y_max_spin.setValue(params['y_max'])
-            elif move_type == 3:  # Relative to Current Position
-                if 'x_offset' in params:
-                    self.x_spin.setValue(params['x_offset'])
-                if 'y_offset' in params:
-                    self.y_spin.setValue(params['y_offset'])
-            elif move_type == 4:  # Random Range from Current Position
-                if 'x_offset_min' in params:
-                    self.x_min_spin.setValue(params['x_offset_min'])
-                if 'x_offset_max' in params:
-                    self.x_max_spin.setValue(params['x_offset_max'])
-                if 'y_offset_min' in params:
-                    self.y_min_spin.setValue(params['y_offset_min'])
-                if 'y_offset_max' in params:
-                    self.y_max_spin.setValue(params['y_offset_max'])
-
-            if 'duration' in params:
-                self.duration_spin.setValue(params['duration'])
-
-        elif action_type == ActionType.MOUSE_CLICK:
-            if 'button' in params:
-                index = self.button_combo.findText(params['button'])
-                if index >= 0:
-                    self.button_combo.setCurrentIndex(index)
-            if 'clicks' in params:
-                self.clicks_spin.setValue(params['clicks'])
-
-        elif action_type == ActionType.MOUSE_SCROLL:
-            # Set scroll type
-            scroll_type = params.get('scroll_type', 0)
-            self.scroll_type_combo.setCurrentIndex(scroll_type)
-
-            if scroll_type == 0:  # Fixed Amount
-                if 'amount' in params:
-                    self.amount_spin.setValue(params['amount'])
-            else:  # Random in Range
-                if 'min_amount' in params:
-                    self.min_amount_spin.setValue(params['min_amount'])
-                if 'max_amount' in params:
-                    self.max_amount_spin.setValue(params['max_amount'])
-
-        elif action_type == ActionType.KEY_PRESS:
-            if 'key' in params:
-                self.key_edit.setText(params['key'])
-
-        elif action_type == ActionType.KEY_COMBINATION:
-            if 'keys' in params:
-                self.keys_edit.setText(', '.join(params['keys']))
-
-        elif action_type == ActionType.WAIT:
-            if 'seconds' in params:
-                self.seconds_spin.setValue(params['seconds'])
-    
-    def get_params(self):
-        action_type = self.type_combo.currentData()
-        params = {}
-
-        if action_type == ActionType.MOUSE_MOVE:
-            move_type = self.move_type_combo.currentIndex()
-            params['move_type'] = move_type
-
-            if move_type == 0:  # Specific Coordinates
-                params['x'] = self.x_spin.value()
-                params['y'] = self.y_spin.value()
-            elif move_type == 1:  # Random in Range
-                params['x_min'] = self.x_min_spin.value()
-                params['x_max'] = self.x_max_spin.value()
-                params['y_min'] = self.y_min_spin.value()
-                params['y_max'] = self.y_max_spin.value()
-            elif move_type == 3:  # Relative to Current Position
-                params['x_offset'] = self.x_spin.value()
-                params['y_offset'] = self.y_spin.value()
-            elif move_type == 4:  # Random Range from Current Position
-                params['x_offset_min'] = self.x_min_spin.value()
-                params['x_offset_max'] = self.x_max_spin.value()
-                params['y_offset_min'] = self.y_min_spin.value()
-                params['y_offset_max'] = self.y_max_spin.value()
-            # For fully random, no additional parameters needed
+        self.request_save()
 
-            params['duration'] = self.duration_spin.value()
+    def get_step_pause(self):
+        return self.config.get('step_pause', DEFAULT_STEP_PAUSE)
 
-        elif action_type == ActionType.MOUSE_CLICK:
-            params['button'] = self.button_combo.currentText()
-            params['clicks'] = self.clicks_spin.value()
+    def set_step_pause(self, seconds):
+        self.config['step_pause'] = seconds
+        self.request_save()
 
-        elif action_type == ActionType.MOUSE_SCROLL:
-            scroll_type = self.scroll_type_combo.currentIndex()
-            params['scroll_type'] = scroll_type
+    def get_log_level(self):
+        return self.config.get('log_level', DEFAULT_LOG_LEVEL)
 
-            if scroll_type == 0:  # Fixed Amount
-                params['amount'] = self.amount_spin.value()
-            else:  # Random in Range
-                params['min_amount'] = self.min_amount_spin.value()
-                params['max_amount'] = self.max_amount_spin.value()
+    def set_log_level(self, level):
+        self.config['log_level'] = level
+        self.request_save()
 
-        elif action_type == ActionType.KEY_PRESS:
-            params['key'] = self.key_edit.text().strip()
+    def get_input_backend(self):
+        return self.config.get('input_backend', DEFAULT_INPUT_BACKEND)
 
-        elif action_type == ActionType.KEY_COMBINATION:
-            keys_text = self.keys_edit.text()
-            params['keys'] = [k.strip() for k in keys_text.split(',') if k.strip()]
+    def set_input_backend(self, name):
+        self.config['input_backend'] = name
+        self.request_save()
 
-        elif action_type == ActionType.WAIT:
-            params['seconds'] = self.seconds_spin.value()
+    def get_metrics_file(self):
+        return self.config.get('metrics_file', METRICS_FILE)
 
-        return params
-    
-    def accept(self):
-        try:
-            action_type = self.type_combo.currentData()
-            params = self.get_params()
+    def set_metrics_file(self, path):
+        self.config['metrics_file'] = path
+        self.request_save()
 
-            # Validate parameters
-            if action_type == ActionType.KEY_PRESS and not params.get('key'):
-                QMessageBox.warning(self, "Validation Error", "Please enter a key.")
-                return
+    def get_metrics_interval(self):
+        """Seconds between metrics file writes; 0 turns the periodic export off"""
+        return self.config.get('metrics_interval', METRICS_EXPORT_INTERVAL)
 
-            if action_type == ActionType.KEY_COMBINATION and not params.get('keys'):
-                QMessageBox.warning(self, "Validation Error", "Please enter at least one key.")
-                return
+    def set_metrics_interval(self, seconds):
+        self.config['metrics_interval'] = seconds
+        self.request_save()
 
-            # Additional validation for random ranges
-            if action_type == ActionType.MOUSE_MOVE:
-                move_type = params.get('move_type')
-
-                # Validate Random in Range
-                if move_type == 1:
-                    x_min = params.get('x_min', 0)
-                    x_max = params.get('x_max', 1000)
-                    y_min = params.get('y_min', 0)
-                    y_max = params.get('y_max', 1000)
-
-                    if x_min > x_max:
-                        QMessageBox.warning(self, "Validation Error", "X minimum must be less than or equal to X maximum.")
-                        return
-
-                    if y_min > y_max:
-                        QMessageBox.warning(self, "Validation Error", "Y minimum must be less than or equal to Y maximum.")
-                        return
-
-                # Validate Random Range from Current Position
-                elif move_type == 4:
-                    x_min = params.get('x_offset_min', -50)
-                    x_max = params.get('x_offset_max', 50)
-                    y_min = params.get('y_offset_min', -50)
-                    y_max = params.get('y_offset_max', 50)
-
-                    if x_min > x_max:
-                        QMessageBox.warning(self, "Validation Error", "X offset minimum must be less than or equal to X offset maximum.")
-                        return
-
-                    if y_min > y_max:
-                        QMessageBox.warning(self, "Validation Error", "Y offset minimum must be less than or equal to Y offset maximum.")
-                        return
-
-            # Validate scroll ranges
-            if action_type == ActionType.MOUSE_SCROLL:
-                scroll_type = params.get('scroll_type')
-                if scroll_type == 1:  # Random in Range
-                    min_amount = params.get('min_amount', -20)
-                    max_amount = params.get('max_amount', 20)
-
-                    if min_amount > max_amount:
-                        QMessageBox.warning(self, "Validation Error", "Scroll minimum must be less than or equal to scroll maximum.")
-                        return
-
-            # Create or update action
-            try:
-                if self.action:
-                    # Update existing action
-                    self.action.action_type = action_type
-                    self.action.params = params
-                    self.action.name = self.action.generate_name()
-                else:
-                    # Create new action
-                    self.action = Action(action_type, params)
+    def get_start_in_tray(self):
+        return self.config.get('start_in_tray', False)
 
-                # Test if the action can generate a name without errors
-                test_name = self.action.generate_name()
-                logger.debug(f"Generated action name: {test_name}")
+    def set_start_in_tray(self, enabled):
+        self.config['start_in_tray'] = enabled
+        self.request_save()
 
-                super().accept()
-            except Exception as e:
-                logger.error(f"Error creating/updating action: {e}", exc_info=True)
-                QMessageBox.critical(self, "Error", f"Failed to create action: {str(e)}")
+    def get_window_unload_delay(self):
+        """Seconds the hidden main window is kept before it is destroyed; 0 keeps it loaded"""
+        return self.config.get('window_unload_delay', WINDOW_UNLOAD_DELAY)
 
-        except Exception as e:
-            logger.error(f"Unexpected error in accept method: {e}", exc_info=True)
-            QMessageBox.critical(self, "Error", f"An unexpected error occurred: {str(e)}")
+    def set_window_unload_delay(self, seconds):
+        self.config['window_unload_delay'] = seconds
+        self.request_save()
 
+    def optimize_actions(self, tolerance=OPTIMIZE_PATH_TOLERANCE):
+        """Optimize the saved action list and save it right away; returns the OptimizationReport"""
+        delay_range, step_pause = self.get_run_settings()
+        actions, report = optimize_actions(self.get_actions(), tolerance, step_pause, delay_range)
+        self.config['actions'] = actions
+        self.save_config()
+        return report
 
-# Main application window
-class MainWindow(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.config_manager = ConfigManager()
-        self.actions = self.config_manager.get_actions()
-        self.setup_ui()
-        self.setup_tray()
-        self.setup_macro_engine()
-        
-        # Apply settings
-        self.idle_spin.setValue(self.config_manager.get_idle_time())
-        self.enabled_check.setChecked(self.config_manager.is_enabled())
-        self.startup_check.setChecked(self.config_manager.get_run_on_startup())
-        self.random_delay_check.setChecked(self.config_manager.get_random_delay())
-        min_delay, max_delay = self.config_manager.get_random_delay_range()
-        self.min_delay_spin.setValue(min_delay)
-        self.max_delay_spin.setValue(max_delay)
-        
-        # Update UI state
-        self.update_action_list()
-        self.update_controls_state()
-        
-        # Set window properties
-        self.setWindowTitle(f"{APP_NAME} v{APP_VERSION}")
-
-        # Try to load the icon, with fallbacks
-        icon_path = resource_path("icon.ico")
-        if not os.path.exists(icon_path):
-            # Try PNG version
-            icon_path = resource_path("icon.png")
-
-        if os.path.exists(icon_path):
-            logger.info(f"Loading window icon from: {icon_path}")
-            self.setWindowIcon(QIcon(icon_path))
-        else:
-            # Create a simple fallback icon if no icon file is found
-            logger.warning("Icon files not found for window icon, creating fallback")
-            pixmap = QPixmap(64, 64)
-            pixmap.fill(Qt.GlobalColor.transparent)
-            painter = QPainter(pixmap)
-            painter.setPen(QColor(0, 120, 215))  # Windows blue
-            painter.setBrush(QColor(0, 120, 215))
-            painter.drawEllipse(8, 8, 48, 48)
-            painter.setPen(QColor(255, 255, 255))
-            painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter, "MS")
-            painter.end()
-            self.setWindowIcon(QIcon(pixmap))
-
-        self.resize(600, 500)
-        # Window should always show on first launch
-    
-    def setup_ui(self):
-        central_widget = QWidget()
-        main_layout = QVBoxLayout()
-        
-        # Create tabs
-        tabs = QTabWidget()
-        
-        # Actions tab
-        actions_tab = QWidget()
-        actions_layout = QVBoxLayout()
-        
-        # Action list
-        self.action_list = QListWidget()
-        self.action_list.setDragDropMode(QListWidget.DragDropMode.InternalMove)
-        self.action_list.model().rowsMoved.connect(self.on_actions_reordered)
-        actions_layout.addWidget(QLabel("Macro Actions:"))
-        actions_layout.addWidget(self.action_list)
-        
-        # Action buttons
-        action_buttons_layout = QHBoxLayout()
-        self.add_action_btn = QPushButton("Add Action")
-        self.add_action_btn.clicked.connect(self.on_add_action)
-        self.edit_action_btn = QPushButton("Edit Action")
-        self.edit_action_btn.clicked.connect(self.on_edit_action)
-        self.remove_action_btn = QPushButton("Remove Action")
-        self.remove_action_btn.clicked.connect(self.on_remove_action)
-        self.test_action_btn = QPushButton("Test Action")
-        self.test_action_btn.clicked.connect(self.on_test_action)
-        
-        action_buttons_layout.addWidget(self.add_action_btn)
-        action_buttons_layout.addWidget(self.edit_action_btn)
-        action_buttons_layout.addWidget(self.remove_action_btn)
-        action_buttons_layout.addWidget(self.test_action_btn)
-        actions_layout.addLayout(action_buttons_layout)
-        
-        # Test all button
-        self.test_all_btn = QPushButton("Test All Actions")
-        self.test_all_btn.clicked.connect(self.on_test_all_actions)
-        actions_layout.addWidget(self.test_all_btn)
-        
-        actions_tab.setLayout(actions_layout)
-        
-        # Settings tab
-        settings_tab = QWidget()
-        settings_layout = QVBoxLayout()
-        
-        # Idle time settings
-        idle_group = QGroupBox("Idle Detection")
-        idle_layout = QFormLayout()
-        
-        self.idle_spin = QSpinBox()
-        self.idle_spin.setRange(10, 3600)
-        self.idle_spin.setSingleStep(10)
-        self.idle_spin.setSuffix(" seconds")
-        self.idle_spin.valueChanged.connect(self.on_idle_time_changed)
-        idle_layout.addRow("Run macro after idle time:", self.idle_spin)
-        
-        self.enabled_check = QCheckBox("Enable macro automation")
-        self.enabled_check.stateChanged.connect(self.on_enabled_changed)
-        idle_layout.addRow("", self.enabled_check)
-        
-        idle_group.setLayout(idle_layout)
-        settings_layout.addWidget(idle_group)
-        
-        # Random delay settings
-        delay_group = QGroupBox("Random Delay")
-        delay_layout = QFormLayout()
-        
-        self.random_delay_check = QCheckBox("Add random delay between actions")
-        self.random_delay_check.stateChanged.connect(self.on_random_delay_changed)
-        delay_layout.addRow("", self.random_delay_check)
-        
-        delay_range_layout = QHBoxLayout()
-        self.min_delay_spin = QSpinBox()
-        self.min_delay_spin.setRange(0, 60)
-        self.min_delay_spin.setSuffix(" seconds")
-        self.min_delay_spin.valueChanged.connect(self.on_delay_range_changed)
-        
-        self.max_delay_spin = QSpinBox()
-        self.max_delay_spin.setRange(1, 300)
-        self.max_delay_spin.setSuffix(" seconds")
-        self.max_delay_spin.valueChanged.connect(self.on_delay_range_changed)
-        
-        delay_range_layout.addWidget(QLabel("Min:"))
-        delay_range_layout.addWidget(self.min_delay_spin)
-        delay_range_layout.addWidget(QLabel("Max:"))
-        delay_range_layout.addWidget(self.max_delay_spin)
-        delay_layout.addRow("Delay range:", delay_range_layout)
-        
-        delay_group.setLayout(delay_layout)
-        settings_layout.addWidget(delay_group)
-        
-        # General settings
-        general_group = QGroupBox("General Settings")
-        general_layout = QFormLayout()
-
-        self.startup_check = QCheckBox("Run on Windows startup")
-        self.startup_check.stateChanged.connect(self.on_startup_changed)
-        general_layout.addRow("", self.startup_check)
-
-        # Add minimize to tray button
-        minimize_btn = QPushButton("Minimize to Tray")
-        minimize_btn.clicked.connect(self.hide)
-        minimize_btn.setIcon(QIcon(resource_path("icon.ico")))
-        general_layout.addRow("", minimize_btn)
-
-        general_group.setLayout(general_layout)
-        settings_layout.addWidget(general_group)
-        
-        # Status display
-        status_group = QGroupBox("Status")
-        status_layout = QFormLayout()
-        
-        self.status_label = QLabel("Idle time: 0 seconds")
-        status_layout.addRow("", self.status_label)
-        
-        self.next_run_label = QLabel("Next run: Not scheduled")
-        status_layout.addRow("", self.next_run_label)
-        
-        status_group.setLayout(status_layout)
-        settings_layout.addWidget(status_group)
-        
-        # Add spacer
-        settings_layout.addStretch()
-        
-        settings_tab.setLayout(settings_layout)
-        
-        # Add tabs
-        tabs.addTab(actions_tab, "Actions")
-        tabs.addTab(settings_tab, "Settings")
-        
-        main_layout.addWidget(tabs)
-        
-        central_widget.setLayout(main_layout)
-        self.setCentralWidget(central_widget)
-        
-        # Update status timer
-        self.status_timer = QTimer(self)
-        self.status_timer.timeout.connect(self.update_status)
-        self.status_timer.start(1000)  # Update every second
-    
-    def setup_tray(self):
-        self.tray_icon = QSystemTrayIcon(self)
-
-        # Try to load the icon, with fallbacks
-        icon_path = resource_path("icon.ico")
-        if not os.path.exists(icon_path):
-            # Try PNG version
-            icon_path = resource_path("icon.png")
-
-        if os.path.exists(icon_path):
-            logger.info(f"Loading tray icon from: {icon_path}")
-            self.tray_icon.setIcon(QIcon(icon_path))
-        else:
-            # Create a simple fallback icon if no icon file is found
-            logger.warning("Icon files not found, creating fallback icon")
-            pixmap = QPixmap(64, 64)
-            pixmap.fill(Qt.GlobalColor.transparent)
-            painter = QPainter(pixmap)
-            painter.setPen(QColor(0, 120, 215))  # Windows blue
-            painter.setBrush(QColor(0, 120, 215))
-            painter.drawEllipse(8, 8, 48, 48)
-            painter.setPen(QColor(255, 255, 255))
-            painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter, "MS")
-            painter.end()
-            self.tray_icon.setIcon(QIcon(pixmap))
-
-        self.tray_icon.setToolTip(f"{APP_NAME} v{APP_VERSION}")
-        
-        # Create tray menu
-        tray_menu = QMenu()
-        
-        self.toggle_action = QAction("Disable", self)
-        self.toggle_action.triggered.connect(self.toggle_enabled)
-        tray_menu.addAction(self.toggle_action)
-        
-        show_action = QAction("Show Window", self)
-        show_action.triggered.connect(self.show_window)
-        tray_menu.addAction(show_action)
-        
-        quit_action = QAction("Quit", self)
-        quit_action.triggered.connect(self.quit_application)
-        tray_menu.addAction(quit_action)
-        
-        self.tray_icon.setContextMenu(tray_menu)
-        self.tray_icon.activated.connect(self.on_tray_activated)
-        
-        # Show the tray icon
-        self.tray_icon.show()
-        
-        # Update tray icon state
-        self.update_tray_state()
-    
-    def setup_macro_engine(self):
-        self.macro_thread = None
-        self.macro_running = False
-        self.last_idle_time = 0
-        self.next_run_time = None
-    
-    def update_action_list(self):
-        self.action_list.clear()
-        for action in self.actions:
-            item = ActionListWidgetItem(action)
-            self.action_list.addItem(item)
+    def _normalize_actions(self):
+        """Ensure all actions in the config are properly converted to Action objects"""
+        if 'actions' in self.config:
+            # Get actions as Action objects
+            actions = self.get_actions()
+            # Store them back in the config
+            self.config['actions'] = actions
+            # No need to save here as this is just normalizing the in-memory representation
 
-        # Connect selection change signal if not already connected
-        if not hasattr(self, '_selection_connected'):
-            self.action_list.itemSelectionChanged.connect(self.update_controls_state)
-            self._selection_connected = True
 
-        # Select the first item if available
-        if self.action_list.count() > 0:
-            self.action_list.setCurrentRow(0)
-    
-    def update_controls_state(self):
-        # Update button states based on selection
-        has_selection = self.action_list.currentRow() >= 0
-        self.edit_action_btn.setEnabled(has_selection)
-        self.remove_action_btn.setEnabled(has_selection)
-        self.test_action_btn.setEnabled(has_selection)
-        
-        # Update test all button
-        self.test_all_btn.setEnabled(len(self.actions) > 0)
-        
-        # Update delay controls
-        delay_enabled = self.random_delay_check.isChecked()
-        self.min_delay_spin.setEnabled(delay_enabled)
-        self.max_delay_spin.setEnabled(delay_enabled)
-        
-        # Update tray icon state
-        self.update_tray_state()
-    
-    def update_tray_state(self):
-        enabled = self.config_manager.is_enabled()
-        self.toggle_action.setText("Disable" if enabled else "Enable")
-        
-        # Update tooltip with status
-        status = "Enabled" if enabled else "Disabled"
-        self.tray_icon.setToolTip(f"{APP_NAME} v{APP_VERSION} - {status}")
-    
-    def update_status(self):
-        idle_time = get_idle_time()
-        self.last_idle_time = idle_time
-        self.status_label.setText(f"Idle time: {idle_time:.1f} seconds")
-        
-        if self.next_run_time is not None:
-            time_left = max(0, self.next_run_time - idle_time)
-            self.next_run_label.setText(f"Next run: in {time_left:.1f} seconds")
-        else:
-            self.next_run_label.setText("Next run: Not scheduled")
-        
-        # Check if we should start the macro
-        if (self.config_manager.is_enabled() and 
-            not self.macro_running and 
-            idle_time >= self.config_manager.get_idle_time()):
-            self.start_macro()
-    
-    def start_macro(self):
-        if self.macro_running or not self.actions:
-            return
-        
-        self.macro_running = True
-        self.macro_thread = threading.Thread(target=self.run_macro)
-        self.macro_thread.daemon = True
-        self.macro_thread.start()
-    
-    def run_macro(self):
-        try:
+# Command line
+#
+# `magic_script.py run|validate|bench ...` works on a config or macro file
+# without the GUI: PyQt6 is never imported, so it starts quickly and fits on
+# servers and kiosk machines. Run without arguments to start the GUI.
+CLI_COMMANDS = ('run', 'validate', 'bench')
+EXIT_OK = 0
+EXIT_FAILED = 1  # Cancelled runs, invalid macros
+EXIT_USAGE = 2  # Bad arguments or unreadable files (argparse uses 2 as well)
+EXIT_INTERRUPTED = 130
+
+
+def build_arg_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="magic_script.py",
+        description=f"{APP_NAME} v{APP_VERSION}. Without a command, starts the GUI.")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    def add_source_options(command):
+        command.add_argument("--config", default=CONFIG_FILE,
+                             help=f"Config file with the actions and settings "
+                                  f"(default: {CONFIG_FILE})")
+        command.add_argument("--macro",
+                             help="Use the actions from this .json or .msmacro file instead")
+        command.add_argument("--log-level", choices=LOG_LEVELS,
+                             help="Log level (default: from the config)")
+
+    run = commands.add_parser("run", help="Run the macro now, or once the system is idle")
+    add_source_options(run)
+    run.add_argument("--when-idle", action="store_true",
+                     help="Wait until the system has been idle for the configured idle time first")
+    run.add_argument("--idle-time", type=float, metavar="SECONDS",
+                     help="Wait for this much idle time first (implies --when-idle)")
+    run.add_argument("--repeat", type=int, default=1, metavar="N",
+                     help="Run N times, waiting for idle before each run with --when-idle; "
+                          "0 repeats forever")
+    run.add_argument("--backend", choices=sorted(INPUT_BACKENDS) + [DEFAULT_INPUT_BACKEND],
+                     help="Input backend (default: from the config)")
+    run.add_argument("--no-watch", action="store_true",
+                     help="Do not stop the run when the user moves the mouse or types")
+    run.add_argument("--seed", type=int,
+                     help="Seed for random moves, scrolls and delays; "
+                          "runs with the same seed send the same input")
+    run.add_argument("--dry-run", action="store_true",
+                     help="Print the input the run would send, with its timing, "
+                          "instead of sending it")
+    run.add_argument("--profile-runs", type=int, metavar="N",
+                     help="Profile the first N runs; the files are written next to the config")
+    run.add_argument("--profile-seconds", type=float, metavar="SECONDS",
+                     help="Profile the runs of the first SECONDS seconds")
+
+    validate = commands.add_parser("validate", help="Check the actions without running them")
+    add_source_options(validate)
+
+    bench = commands.add_parser("bench",
+                                help="Time runs of the macro, by default on the null backend")
+    add_source_options(bench)
+    bench.add_argument("--runs", type=int, default=3, help="Runs to time (default: 3)")
+    bench.add_argument("--backend", choices=sorted(INPUT_BACKENDS) + [DEFAULT_INPUT_BACKEND],
+                       default="null", help="Input backend (default: null, which sends no input)")
+    bench.add_argument("--seed", type=int, help="Seed for random moves, scrolls and delays")
+    bench.add_argument("--json", action="store_true", help="Print the results as JSON")
+    return parser
+
+
+def _cli_config(args):
+    if args.config != CONFIG_FILE and not os.path.exists(args.config):
+        raise ValueError(f"Config file not found: {args.config}")
+    config_manager = ConfigManager(args.config, save_delay=0)
+    default_level = config_manager.get_log_level() if args.command == 'run' else "WARNING"
+    setup_logging(args.log_level or default_level)
+    return config_manager
+
+
+def _cli_backend(name):
+    try:
+        set_input_backend(name)
+    except Exception as e:
+        raise ValueError(f"Cannot use the {name} input backend: {e!r}") from e
+
+
+def _cli_source(args, config_manager, delay_range, step_pause):
+    """What to run: a mapped MacroFile for .msmacro files, otherwise a compiled ExecutionPlan"""
+    if args.macro and args.macro.lower().endswith(MACRO_FILE_EXTENSION):
+        return MacroFile(args.macro)
+    actions = import_actions(args.macro) if args.macro else config_manager.get_actions()
+    return ExecutionPlan(actions, delay_range is None and step_pause <= 0)
+
+
+def _read_action_data(path):
+    """The raw action dicts of a JSON macro or config file; a missing default config has none"""
+    if path == CONFIG_FILE and not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return data.get('actions', []) if isinstance(data, dict) else data
+
+
+def cli_validate(args):
+    """Report every invalid action; exits with EXIT_FAILED if there are any"""
+    config_manager = _cli_config(args)
+    if args.macro and args.macro.lower().endswith(MACRO_FILE_EXTENSION):
+        with MacroFile(args.macro) as macro:
+            actions = list(macro)
+        problems = [(index, action.name, validate_action(action))
+                    for index, action in enumerate(actions)]
+    else:
+        actions, problems = [], []
+        for index, item in enumerate(_read_action_data(args.macro or args.config)):
+            messages = validate_action_data(item)
+            name = item.get('name') if isinstance(item, dict) else None
+            if not messages:
+                actions.append(Action.from_dict(item))
+                name = actions[-1].name
+            problems.append((index, name, messages))
+
+    invalid = [(index, name, messages) for index, name, messages in problems if messages]
+    for index, name, messages in invalid:
+        label = f"action {index + 1}" + (f" ({name})" if name else "")
+        for message in messages:
+            print(f"{label}: {message}")
+    delay_range, step_pause = config_manager.get_run_settings()
+    runtime = predict_runtime(actions, step_pause, delay_range)
+    print(f"{len(problems)} actions, {len(invalid)} invalid, predicted runtime {runtime:.1f} s")
+    return EXIT_FAILED if invalid else EXIT_OK
+
+
+def cli_dry_run(args):
+    """Print the input a run would send, starting from the configured backend's cursor"""
+    config_manager = _cli_config(args)
+    delay_range, step_pause = config_manager.get_run_settings()
+    source = _cli_source(args, config_manager, delay_range, step_pause)
+    try:
+        live = create_input_backend(args.backend or config_manager.get_input_backend())
+        backend = RecordingBackend(live.size(), live.position())
+    except Exception as e:
+        logger.warning("Cannot read the cursor from the input backend, "
+                       "starting at the screen centre: %s", e)
+        backend = RecordingBackend()
+    try:
+        ctx = dry_run(source, args.seed, delay_range, step_pause, backend)
+    finally:
+        if isinstance(source, MacroFile):
+            source.close()
+    for line in format_events(backend.events):
+        print(line)
+    print(f"{len(source)} steps, {ctx.timing.nominal:.3f} s, random seed {ctx.random.seed}")
+    return EXIT_OK
+
+
+def cli_run(args):
+    """Run the macro like the GUI does, optionally once the system is idle"""
+    if args.dry_run:
+        return cli_dry_run(args)
+    when_idle = args.when_idle or args.idle_time is not None
+    if (args.profile_runs is not None and args.profile_runs < 1) or (
+            args.profile_seconds is not None and args.profile_seconds <= 0):
+        raise ValueError("--profile-runs and --profile-seconds must be positive")
+    config_manager = _cli_config(args)
+    # Both waiting for idle time and the activity watcher need an idle source
+    if when_idle and not idle_source_available():
+        raise ValueError(f"Cannot wait for idle time: {_idle_source_error}")
+    watch = not args.no_watch and idle_source_available()
+    _cli_backend(args.backend or config_manager.get_input_backend())
+    delay_range, step_pause = config_manager.get_run_settings()
+    source = _cli_source(args, config_manager, delay_range, step_pause)
+    threshold = args.idle_time if args.idle_time is not None else config_manager.get_idle_time()
+
+    exporter = MetricsExporter(path=config_manager.get_metrics_file(),
+                               interval=config_manager.get_metrics_interval())
+    if exporter.interval > 0:
+        exporter.start()
+    session = None
+    if args.profile_runs is not None or args.profile_seconds is not None:
+        session = start_profiling(os.path.dirname(os.path.abspath(args.config)),
+                                  args.profile_runs, args.profile_seconds)
+    completed = True
+    runs = 0
+    try:
+        while args.repeat <= 0 or runs < args.repeat:
+            if when_idle:
+                logger.info("Waiting for %.0f seconds of idle time", threshold)
+                wait_for_idle(threshold)
             logger.info("Starting macro execution")
-            
-            # Reset next run time
-            self.next_run_time = None
-            
-            for action in self.actions:
-                # Check if we should stop (if disabled or user activity detected)
-                if not self.config_manager.is_enabled() or get_idle_time() < 1.0:
-                    logger.info("Stopping macro execution: user activity detected or disabled")
-                    break
-                
-                # Execute the action
-                logger.info(f"Executing action: {action.name}")
-                action.execute()
-                
-                # Add random delay if enabled
-                if self.config_manager.get_random_delay():
-                    min_delay, max_delay = self.config_manager.get_random_delay_range()
-                    delay = random.uniform(min_delay, max_delay)
-                    logger.info(f"Random delay: {delay:.1f} seconds")
-                    time.sleep(delay)
-            
-            logger.info("Macro execution completed")
-        except Exception as e:
-            logger.error(f"Error in macro execution: {e}")
-        finally:
-            self.macro_running = False
-            
-            # Schedule next run if still idle and enabled
-            if self.config_manager.is_enabled() and get_idle_time() >= 1.0:
-                self.next_run_time = self.config_manager.get_idle_time()
-    
-    def on_add_action(self):
-        try:
-            dialog = ActionDialog(self)
-            if dialog.exec():
-                try:
-                    action = dialog.action
-                    if action:
-                        # Verify the action can be executed without errors
-                        logger.debug(f"Verifying new action: {action.name}")
-
-                        self.actions.append(action)
-                        self.update_action_list()
-                        self.config_manager.set_actions(self.actions)
-                        self.update_controls_state()
-                    else:
-                        logger.error("Action dialog returned but action is None")
-                        QMessageBox.warning(self, "Error", "Failed to create action. Please try again.")
-                except Exception as e:
-                    logger.error(f"Error adding action: {e}", exc_info=True)
-                    QMessageBox.critical(self, "Error", f"Failed to add action: {str(e)}")
-        except Exception as e:
-            logger.error(f"Unexpected error in on_add_action: {e}", exc_info=True)
-            QMessageBox.critical(self, "Error", f"An unexpected error occurred: {str(e)}")
+            ctx = RunContext(get_input_backend(), seed=args.seed)
+            with profile_run():
+                completed = execute_watched(source, ctx, delay_range, step_pause, watch)
+            runs += 1
+            if completed:
+                logger.info("Macro execution completed")
+            elif not when_idle:
+                break
+    finally:
+        if isinstance(source, MacroFile):
+            source.close()
+        if exporter.interval > 0:
+            exporter.close()
+        if session is not None:
+            session.stop()
+    return EXIT_OK if completed else EXIT_FAILED
+
+
+def cli_bench(args):
+    """Time `args.runs` runs of the macro and print how closely they kept to schedule"""
+    config_manager = _cli_config(args)
+    _cli_backend(args.backend)
+    delay_range, step_pause = config_manager.get_run_settings()
+    started = time.perf_counter()
+    source = _cli_source(args, config_manager, delay_range, step_pause)
+    load_seconds = time.perf_counter() - started
+
+    results = []
+    try:
+        for _ in range(args.runs):
+            ctx = RunContext(get_input_backend(), seed=args.seed)
+            started = time.perf_counter()
+            completed = execute_watched(source, ctx, delay_range, step_pause, watch=False)
+            result = {'completed': completed, 'seconds': time.perf_counter() - started}
+            result.update(ctx.timing.summary())
+            results.append(result)
+    finally:
+        if isinstance(source, MacroFile):
+            source.close()
+
+    if args.json:
+        report = {'load_seconds': load_seconds, 'steps': len(source), 'runs': results}
+        print(json.dumps(report, indent=2))
+        return EXIT_OK
+    print(f"Loaded {len(source)} steps in {load_seconds * 1000:.1f} ms")
+    for index, result in enumerate(results, 1):
+        print(f"run {index}: {result['seconds']:.3f} s (nominal {result['nominal_s']:.3f} s), "
+              f"drift {result['drift_ms']:.2f} ms, jitter mean {result['jitter_mean_ms']:.2f} ms "
+              f"/ max {result['jitter_max_ms']:.2f} ms")
+    print()
+    print(metrics.summary())
+    return EXIT_OK
+
+
+CLI_HANDLERS = {'run': cli_run, 'validate': cli_validate, 'bench': cli_bench}
+
+
+def run_cli(argv):
+    """Run a command-line command; returns the exit code"""
+    args = build_arg_parser().parse_args(argv)
+    try:
+        return CLI_HANDLERS[args.command](args)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_USAGE
 
-    def on_edit_action(self):
-        try:
-            current_row = self.action_list.currentRow()
-            if current_row >= 0:
-                action = self.actions[current_row]
-                dialog = ActionDialog(self, action)
-                if dialog.exec():
-                    try:
-                        # Verify the action is valid
-                        if action:
-                            logger.debug(f"Updated action: {action.name}")
-                            self.update_action_list()
-                            self.config_manager.set_actions(self.actions)
-                        else:
-                            logger.error("Action dialog returned but action is None")
-                            QMessageBox.warning(self, "Error", "Failed to update action. Please try again.")
-                    except Exception as e:
-                        logger.error(f"Error updating action: {e}", exc_info=True)
-                        QMessageBox.critical(self, "Error", f"Failed to update action: {str(e)}")
-        except Exception as e:
-            logger.error(f"Unexpected error in on_edit_action: {e}", exc_info=True)
-            QMessageBox.critical(self, "Error", f"An unexpected error occurred: {str(e)}")
-    
-    def on_remove_action(self):
-        current_row = self.action_list.currentRow()
-        if current_row >= 0:
-            del self.actions[current_row]
-            self.update_action_list()
-            self.config_manager.set_actions(self.actions)
-            self.update_controls_state()
-    
-    def on_test_action(self):
-        current_row = self.action_list.currentRow()
-        if current_row >= 0:
-            action = self.actions[current_row]
-            
-            # Hide window during test to avoid interference
-            was_visible = self.isVisible()
-            if was_visible:
-                self.hide()
-            
-            # Wait a moment before executing
-            QTimer.singleShot(500, lambda: self.execute_test_action(action, was_visible))
-    
-    def execute_test_action(self, action, restore_visibility):
-        success = action.execute()
-        
-        # Show window again if it was visible
-        if restore_visibility:
-            QTimer.singleShot(500, self.show)
-        
-        # Show result
-        if success:
-            self.tray_icon.showMessage(
-                "Action Test", 
-                f"Action '{action.name}' executed successfully",
-                QSystemTrayIcon.MessageIcon.Information,
-                2000
-            )
-        else:
-            self.tray_icon.showMessage(
-                "Action Test", 
-                f"Failed to execute action '{action.name}'",
-                QSystemTrayIcon.MessageIcon.Warning,
-                2000
-            )
-    
-    def on_test_all_actions(self):
-        if not self.actions:
-            return
-        
-        # Hide window during test to avoid interference
-        was_visible = self.isVisible()
-        if was_visible:
-            self.hide()
-        
-        # Wait a moment before executing
-        QTimer.singleShot(500, lambda: self.execute_test_all_actions(was_visible))
-    
-    def execute_test_all_actions(self, restore_visibility):
-        success_count = 0
-        fail_count = 0
-        
-        for action in self.actions:
-            if action.execute():
-                success_count += 1
-            else:
-                fail_count += 1
-            
-            # Add a small delay between actions
-            time.sleep(0.5)
-        
-        # Show window again if it was visible
-        if restore_visibility:
-            QTimer.singleShot(500, self.show)
-        
-        # Show result
-        self.tray_icon.showMessage(
-            "Actions Test", 
-            f"Executed {success_count} actions successfully, {fail_count} failed",
-            QSystemTrayIcon.MessageIcon.Information,
-            2000
-        )
-    
-    def on_actions_reordered(self):
-        # Update actions list after drag and drop reordering
-        new_actions = []
-        for i in range(self.action_list.count()):
-            item = self.action_list.item(i)
-            if isinstance(item, ActionListWidgetItem):
-                new_actions.append(item.action)
-        
-        self.actions = new_actions
-        self.config_manager.set_actions(self.actions)
-    
-    def on_idle_time_changed(self, value):
-        self.config_manager.set_idle_time(value)
-    
-    def on_enabled_changed(self, state):
-        enabled = state == Qt.CheckState.Checked.value
-        self.config_manager.set_enabled(enabled)
-        self.update_controls_state()
-    
-    def on_startup_changed(self, state):
-        enabled = state == Qt.CheckState.Checked.value
-        self.config_manager.set_run_on_startup(enabled)
-    
-    def on_random_delay_changed(self, state):
-        enabled = state == Qt.CheckState.Checked.value
-        self.config_manager.set_random_delay(enabled)
-        self.update_controls_state()
-    
-    def on_delay_range_changed(self):
-        min_delay = self.min_delay_spin.value()
-        max_delay = self.max_delay_spin.value()
-        
-        # Ensure max is always >= min
-        if max_delay < min_delay:
-            self.max_delay_spin.setValue(min_delay)
-            max_delay = min_delay
-        
-        self.config_manager.set_random_delay_range(min_delay, max_delay)
-    
-    def toggle_enabled(self):
-        enabled = not self.config_manager.is_enabled()
-        self.config_manager.set_enabled(enabled)
-        self.enabled_check.setChecked(enabled)
-        self.update_controls_state()
-        
-        # Show notification
-        status = "enabled" if enabled else "disabled"
-        self.tray_icon.showMessage(
-            APP_NAME,
-            f"Macro automation {status}",
-            QSystemTrayIcon.MessageIcon.Information,
-            2000
-        )
-    
-    def on_tray_activated(self, reason):
-        if reason == QSystemTrayIcon.ActivationReason.DoubleClick:
-            self.show_window()
-    
-    def show_window(self):
-        self.showNormal()
-        self.activateWindow()
-
-    def closeEvent(self, event):
-        """Handle window close event"""
-        # Minimize to tray instead of closing
-        event.ignore()
-        self.hide()
-
-        # Show notification first time
-        if not hasattr(self, '_shown_minimize_notice'):
-            self.tray_icon.showMessage(
-                APP_NAME,
-                f"{APP_NAME} is still running in the system tray.",
-                QSystemTrayIcon.MessageIcon.Information,
-                2000
-            )
-            self._shown_minimize_notice = True
-
-    def quit_application(self):
-        reply = QMessageBox.question(
-            self,
-            "Quit Confirmation",
-            f"Are you sure you want to quit {APP_NAME}?",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
-            QMessageBox.StandardButton.No
-        )
-        
-        if reply == QMessageBox.StandardButton.Yes:
-            QApplication.quit()
-    
-    def closeEvent(self, event):
-        # Minimize to tray instead of closing
-        event.ignore()
-        self.hide()
-        
-        # Show notification first time
-        if not hasattr(self, '_shown_minimize_notice'):
-            self.tray_icon.showMessage(
-                APP_NAME,
-                f"{APP_NAME} is still running in the system tray.",
-                QSystemTrayIcon.MessageIcon.Information,
-                2000
-            )
-            self._shown_minimize_notice = True
 
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and (argv[0] in CLI_COMMANDS or argv[0] in ('-h', '--help')):
+        sys.exit(run_cli(argv))
+
+    setup_logging()
+    sys.excepthook = handle_exception
+    logger.info("Starting %s v%s", APP_NAME, APP_VERSION)
+    logger.info("Log file: %s", os.path.abspath(LOG_FILE))
 
-def main():
     # Ensure single instance
     mutex = ensure_single_instance()
     if mutex is None:
         sys.exit(1)
     
-    # Create application
-    app = QApplication(sys.argv)
-    app.setQuitOnLastWindowClosed(False)  # Don't quit when window is closed
-    
-    # Set application style
-    app.setStyle("Fusion")
-    
-    # Create and show main window
-    window = MainWindow()
-    window.show()
-    
-    # Start application event loop
-    exit_code = app.exec()
+    # PyQt6 is only imported once we know the GUI is going to start
+    from magic_script_gui import run_gui
+    exit_code = run_gui()
     
     # Release mutex on exit
     ctypes.windll.kernel32.ReleaseMutex(mutex)
@@ -1626,4 +5022,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Make `import magic_script` (as done by the GUI) resolve to this module
+    # instead of loading a second copy of the engine
+    sys.modules.setdefault("magic_script", sys.modules[__name__])
     main()
\ No newline at end of file
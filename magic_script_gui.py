@@ -0,0 +1,1629 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+MagicScript GUI - tray controller, main window and action editor.
+
+Imported by magic_script.main() when the application starts, so that the
+macro engine itself can be loaded without PyQt6.
+"""
+
+import sys
+import os
+import gc
+import ctypes
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QObject, QAbstractListModel, QModelIndex, QMimeData
+from PyQt6.QtGui import QIcon, QAction, QColor, QPixmap, QPainter
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QSystemTrayIcon, QMenu,
+                             QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QSpinBox, QListView, QAbstractItemView, QComboBox,
+                             QMessageBox, QDialog, QDialogButtonBox, QLineEdit,
+                             QGroupBox, QFormLayout, QTabWidget, QCheckBox, QDoubleSpinBox,
+                             QFileDialog)
+
+from magic_script import (APP_NAME, APP_VERSION, DEFAULT_PROFILE_SECONDS, LOG_LEVELS,
+                          MACRO_FILE_EXTENSION, RECORDER_STOP_KEY, Action, ActionType, CancelToken,
+                          ConfigManager, IdleScheduler, MacroRecorder, MacroSnapshot, MacroWorker,
+                          MetricsExporter, RunContext, default_input_source, execute_watched,
+                          export_actions, get_idle_time, get_input_backend, get_profile_session,
+                          import_actions, logger, metrics, optimize_actions, profile_run,
+                          profile_span, resource_path, set_input_backend, set_log_level,
+                          start_profiling, stop_profiling)
+
+
+ACTION_ROLE = Qt.ItemDataRole.UserRole
+ACTION_ROWS_MIME_TYPE = "application/x-magicscript-action-rows"
+MACRO_FILE_FILTER = f"Macro files (*{MACRO_FILE_EXTENSION});;JSON files (*.json)"
+
+
+# List model for the macro actions
+class ActionListModel(QAbstractListModel):
+    """Model over the main window's action list.
+
+    Edits the list it was given in place, one row at a time, so adding,
+    editing, removing or moving an action costs O(1) rows and the view keeps
+    its selection. Display text and tooltips are produced in data(), i.e.
+    only for rows the view actually shows, and tooltips are cached on the
+    actions, which ActionDialog replaces rather than edits.
+    """
+
+    def __init__(self, actions, parent=None):
+        super().__init__(parent)
+        self.actions = actions
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.actions)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        action = self.actions[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return action.name
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return action.tooltip()
+        if role == ACTION_ROLE:
+            return action
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.ItemIsDropEnabled
+        return (Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+                | Qt.ItemFlag.ItemIsDragEnabled)
+
+    def reset(self, actions):
+        """Replace the whole list (the only O(n) operation)"""
+        self.beginResetModel()
+        self.actions = actions
+        self.endResetModel()
+
+    def insert_action(self, row, action):
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.actions.insert(row, action)
+        self.endInsertRows()
+
+    def remove_action(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.actions[row]
+        self.endRemoveRows()
+
+    def action_changed(self, row):
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def replace_action(self, row, action):
+        self.actions[row] = action
+        self.action_changed(row)
+
+    def move_action(self, source, destination):
+        """Move the action at `source` so it ends up before the current `destination` row"""
+        if destination in (source, source + 1):
+            return False
+        if not self.beginMoveRows(QModelIndex(), source, source, QModelIndex(), destination):
+            return False
+        action = self.actions.pop(source)
+        self.actions.insert(destination if destination < source else destination - 1, action)
+        self.endMoveRows()
+        return True
+
+    # Drag and drop reordering, as row moves rather than remove + insert
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction
+
+    def mimeTypes(self):
+        return [ACTION_ROWS_MIME_TYPE]
+
+    def mimeData(self, indexes):
+        data = QMimeData()
+        rows = ','.join(str(index.row()) for index in indexes if index.isValid())
+        data.setData(ACTION_ROWS_MIME_TYPE, rows.encode())
+        return data
+
+    def dropMimeData(self, data, action, row, column, parent):
+        if action == Qt.DropAction.IgnoreAction:
+            return True
+        if action != Qt.DropAction.MoveAction or not data.hasFormat(ACTION_ROWS_MIME_TYPE):
+            return False
+        rows = bytes(data.data(ACTION_ROWS_MIME_TYPE)).decode()
+        if not rows:
+            return False
+        if row < 0:
+            row = parent.row() if parent.isValid() else len(self.actions)
+        self.move_action(int(rows.split(',')[0]), row)
+        # Returning False stops the view from removing the source row itself
+        return False
+
+
+# Dialog for adding/editing actions
+class ActionDialog(QDialog):
+    def __init__(self, parent=None, action=None):
+        super().__init__(parent)
+        # One per add or edit; freed when closed rather than kept until the main window goes
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.action = action
+        self.setWindowTitle("Add Action" if action is None else "Edit Action")
+        self.setMinimumWidth(400)
+        self.setup_ui()
+        
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        
+        # Action type selection
+        type_layout = QHBoxLayout()
+        type_layout.addWidget(QLabel("Action Type:"))
+        self.type_combo = QComboBox()
+        for action_type in ActionType:
+            self.type_combo.addItem(action_type.name.replace('_', ' ').title(), action_type)
+        self.type_combo.currentIndexChanged.connect(self.on_action_type_changed)
+        type_layout.addWidget(self.type_combo)
+        layout.addLayout(type_layout)
+        
+        # Parameters group
+        self.params_group = QGroupBox("Parameters")
+        self.params_layout = QFormLayout()
+        self.params_group.setLayout(self.params_layout)
+        layout.addWidget(self.params_group)
+        
+        # Buttons
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+        
+        self.setLayout(layout)
+
+        # Initialize with current action if editing, otherwise show default parameters
+        if self.action:
+            index = self.type_combo.findData(self.action.action_type)
+            if index >= 0:
+                self.type_combo.setCurrentIndex(index)
+            self.on_action_type_changed()
+            self.populate_params()
+        else:
+            # Show default parameters for first action type
+            self.on_action_type_changed()
+    
+    def on_action_type_changed(self):
+        # Clear previous parameters
+        while self.params_layout.rowCount() > 0:
+            self.params_layout.removeRow(0)
+        
+        action_type = self.type_combo.currentData()
+        
+        if action_type == ActionType.MOUSE_MOVE:
+            # Movement type
+            self.move_type_combo = QComboBox()
+            self.move_type_combo.addItems([
+                "Specific Coordinates",
+                "Random in Range",
+                "Fully Random",
+                "Relative to Current Position",
+                "Random Range from Current Position"
+            ])
+            self.move_type_combo.currentIndexChanged.connect(self._update_mouse_move_ui)
+            self.params_layout.addRow("Movement Type:", self.move_type_combo)
+
+            # Coordinates group
+            self.coords_group = QGroupBox("Coordinates")
+            coords_layout = QFormLayout()
+
+            # X coordinate
+            self.x_spin = QSpinBox()
+            self.x_spin.setRange(0, 9999)
+            self.x_spin.setValue(500)
+            self.x_label = QLabel("X Coordinate:")
+            coords_layout.addRow(self.x_label, self.x_spin)
+
+            # Y coordinate
+            self.y_spin = QSpinBox()
+            self.y_spin.setRange(0, 9999)
+            self.y_spin.setValue(500)
+            self.y_label = QLabel("Y Coordinate:")
+            coords_layout.addRow(self.y_label, self.y_spin)
+
+            # X range
+            range_x_layout = QHBoxLayout()
+            self.x_min_spin = QSpinBox()
+            self.x_min_spin.setRange(0, 9999)
+            self.x_min_spin.setValue(0)
+            self.x_max_spin = QSpinBox()
+            self.x_max_spin.setRange(0, 9999)
+            self.x_max_spin.setValue(1000)
+            range_x_layout.addWidget(QLabel("Min:"))
+            range_x_layout.addWidget(self.x_min_spin)
+            range_x_layout.addWidget(QLabel("Max:"))
+            range_x_layout.addWidget(self.x_max_spin)
+            self.x_range_label = QLabel("X Range:")
+            coords_layout.addRow(self.x_range_label, range_x_layout)
+
+            # Y range
+            range_y_layout = QHBoxLayout()
+            self.y_min_spin = QSpinBox()
+            self.y_min_spin.setRange(0, 9999)
+            self.y_min_spin.setValue(0)
+            self.y_max_spin = QSpinBox()
+            self.y_max_spin.setRange(0, 9999)
+            self.y_max_spin.setValue(1000)
+            range_y_layout.addWidget(QLabel("Min:"))
+            range_y_layout.addWidget(self.y_min_spin)
+            range_y_layout.addWidget(QLabel("Max:"))
+            range_y_layout.addWidget(self.y_max_spin)
+            self.y_range_label = QLabel("Y Range:")
+            coords_layout.addRow(self.y_range_label, range_y_layout)
+
+            self.coords_group.setLayout(coords_layout)
+            self.params_layout.addRow("", self.coords_group)
+
+            # Duration
+            self.duration_spin = QDoubleSpinBox()
+            self.duration_spin.setRange(0.0, 10.0)
+            self.duration_spin.setValue(0.5)
+            self.duration_spin.setSingleStep(0.1)
+            self.params_layout.addRow("Duration (seconds):", self.duration_spin)
+
+            # Movement curve
+            self.curve_combo = QComboBox()
+            for label, curve in (("Linear", 'linear'), ("Eased", 'ease'),
+                                 ("Bezier Curve", 'bezier'), ("Human-like", 'human')):
+                self.curve_combo.addItem(label, curve)
+            self.params_layout.addRow("Movement Curve:", self.curve_combo)
+
+            # Initialize UI based on movement type
+            self._update_mouse_move_ui()
+            
+        elif action_type == ActionType.MOUSE_CLICK:
+            # Button
+            self.button_combo = QComboBox()
+            self.button_combo.addItems(["left", "right", "middle"])
+            self.params_layout.addRow("Button:", self.button_combo)
+            
+            # Clicks
+            self.clicks_spin = QSpinBox()
+            self.clicks_spin.setRange(1, 10)
+            self.clicks_spin.setValue(1)
+            self.params_layout.addRow("Clicks:", self.clicks_spin)
+            
+        elif action_type == ActionType.MOUSE_SCROLL:
+            # Scroll type
+            self.scroll_type_combo = QComboBox()
+            self.scroll_type_combo.addItems(["Fixed Amount", "Random in Range"])
+            self.scroll_type_combo.currentIndexChanged.connect(self._update_scroll_ui)
+            self.params_layout.addRow("Scroll Type:", self.scroll_type_combo)
+
+            # Fixed amount
+            self.amount_spin = QSpinBox()
+            self.amount_spin.setRange(-100, 100)
+            self.amount_spin.setValue(10)
+            self.params_layout.addRow("Amount (+ up, - down):", self.amount_spin)
+
+            # Random range
+            range_layout = QHBoxLayout()
+            self.min_amount_spin = QSpinBox()
+            self.min_amount_spin.setRange(-100, 100)
+            self.min_amount_spin.setValue(-20)
+            self.max_amount_spin = QSpinBox()
+            self.max_amount_spin.setRange(-100, 100)
+            self.max_amount_spin.setValue(20)
+            range_layout.addWidget(QLabel("Min:"))
+            range_layout.addWidget(self.min_amount_spin)
+            range_layout.addWidget(QLabel("Max:"))
+            range_layout.addWidget(self.max_amount_spin)
+            self.range_row = self.params_layout.addRow("Range:", range_layout)
+
+            # Initialize UI based on scroll type
+            self._update_scroll_ui()
+            
+        elif action_type == ActionType.KEY_PRESS:
+            # Key
+            self.key_edit = QLineEdit()
+            self.key_edit.setPlaceholderText("e.g. a, b, enter, space, tab, etc.")
+            self.params_layout.addRow("Key:", self.key_edit)
+            
+        elif action_type == ActionType.KEY_COMBINATION:
+            # Keys
+            self.keys_edit = QLineEdit()
+            self.keys_edit.setPlaceholderText("e.g. ctrl, alt, delete (comma separated)")
+            self.params_layout.addRow("Keys (comma separated):", self.keys_edit)
+            
+        elif action_type == ActionType.WAIT:
+            # Seconds
+            self.seconds_spin = QDoubleSpinBox()
+            self.seconds_spin.setRange(0.1, 60.0)
+            self.seconds_spin.setValue(1.0)
+            self.seconds_spin.setSingleStep(0.1)
+            self.params_layout.addRow("Seconds:", self.seconds_spin)
+    
+    def _update_mouse_move_ui(self, index=None):
+        """Update the mouse move UI based on the selected movement type"""
+        try:
+            if index is None:
+                index = self.move_type_combo.currentIndex()
+
+            # Show/hide appropriate controls based on movement type
+            if index == 0:  # Specific Coordinates
+                self.x_spin.setVisible(True)
+                self.y_spin.setVisible(True)
+                self.x_min_spin.setVisible(False)
+                self.x_max_spin.setVisible(False)
+                self.y_min_spin.setVisible(False)
+                self.y_max_spin.setVisible(False)
+
+                # Update labels for absolute coordinates
+                self.x_label.setText("X Coordinate:")
+                self.y_label.setText("Y Coordinate:")
+
+            elif index == 1:  # Random in Range
+                self.x_spin.setVisible(False)
+                self.y_spin.setVisible(False)
+                self.x_min_spin.setVisible(True)
+                self.x_max_spin.setVisible(True)
+                self.y_min_spin.setVisible(True)
+                self.y_max_spin.setVisible(True)
+
+                # Update labels for absolute range
+                self.x_range_label.setText("X Range:")
+                self.y_range_label.setText("Y Range:")
+
+            elif index == 3:  # Relative to Current Position
+                self.x_spin.setVisible(True)
+                self.y_spin.setVisible(True)
+                self.x_min_spin.setVisible(False)
+                self.x_max_spin.setVisible(False)
+                self.y_min_spin.setVisible(False)
+                self.y_max_spin.setVisible(False)
+
+                # Update labels for relative coordinates
+                self.x_label.setText("X Offset:")
+                self.y_label.setText("Y Offset:")
+
+                # Allow negative values for relative movement
+                self.x_spin.setRange(-9999, 9999)
+                self.y_spin.setRange(-9999, 9999)
+
+                # Set default values to small offsets
+                if self.x_spin.value() == 500 and self.y_spin.value() == 500:
+                    self.x_spin.setValue(50)
+                    self.y_spin.setValue(50)
+
+            elif index == 4:  # Random Range from Current Position
+                self.x_spin.setVisible(False)
+                self.y_spin.setVisible(False)
+                self.x_min_spin.setVisible(True)
+                self.x_max_spin.setVisible(True)
+                self.y_min_spin.setVisible(True)
+                self.y_max_spin.setVisible(True)
+
+                # Update labels for relative range
+                self.x_range_label.setText("X Offset Range:")
+                self.y_range_label.setText("Y Offset Range:")
+
+                # Allow negative values for relative range
+                self.x_min_spin.setRange(-9999, 9999)
+                self.x_max_spin.setRange(-9999, 9999)
+                self.y_min_spin.setRange(-9999, 9999)
+                self.y_max_spin.setRange(-9999, 9999)
+
+                # Set default values to small offset ranges
+                if self.x_min_spin.value() == 0 and self.x_max_spin.value() == 1000:
+                    self.x_min_spin.setValue(-50)
+                    self.x_max_spin.setValue(50)
+                    self.y_min_spin.setValue(-50)
+                    self.y_max_spin.setValue(50)
+
+            else:  # Fully Random
+                self.coords_group.setVisible(False)
+                return
+
+            self.coords_group.setVisible(True)
+
+        except Exception as e:
+            logger.error("Error in _update_mouse_move_ui: %s", e, exc_info=True)
+            # Don't crash the application, just show the error
+            QMessageBox.warning(None, "Error", f"Error updating UI: {str(e)}")
+
+    def _update_scroll_ui(self, index=None):
+        """Update the scroll UI based on the selected scroll type"""
+        if index is None:
+            index = self.scroll_type_combo.currentIndex()
+
+        # Show/hide appropriate controls based on scroll type
+        if index == 0:  # Fixed Amount
+            self.amount_spin.setVisible(True)
+            self.min_amount_spin.setVisible(False)
+            self.max_amount_spin.setVisible(False)
+        else:  # Random in Range
+            self.amount_spin.setVisible(False)
+            self.min_amount_spin.setVisible(True)
+            self.max_amount_spin.setVisible(True)
+
+    def populate_params(self):
+        action_type = self.action.action_type
+        params = self.action.params
+
+        if action_type == ActionType.MOUSE_MOVE:
+            # Set movement type
+            move_type = params.get('move_type', 0)
+            self.move_type_combo.setCurrentIndex(move_type)
+
+            if move_type == 0:  # Specific Coordinates
+                if 'x' in params:
+                    self.x_spin.setValue(params['x'] if params['x'] is not None else 500)
+                if 'y' in params:
+                    self.y_spin.setValue(params['y'] if params['y'] is not None else 500)
+            elif move_type == 1:  # Random in Range
+                if 'x_min' in params:
+                    self.x_min_spin.setValue(params['x_min'])
+                if 'x_max' in params:
+                    self.x_max_spin.setValue(params['x_max'])
+                if 'y_min' in params:
+                    self.y_min_spin.setValue(params['y_min'])
+                if 'y_max' in params:
+                    self.y_max_spin.setValue(params['y_max'])
+            elif move_type == 3:  # Relative to Current Position
+                if 'x_offset' in params:
+                    self.x_spin.setValue(params['x_offset'])
+                if 'y_offset' in params:
+                    self.y_spin.setValue(params['y_offset'])
+            elif move_type == 4:  # Random Range from Current Position
+                if 'x_offset_min' in params:
+                    self.x_min_spin.setValue(params['x_offset_min'])
+                if 'x_offset_max' in params:
+                    self.x_max_spin.setValue(params['x_offset_max'])
+                if 'y_offset_min' in params:
+                    self.y_min_spin.setValue(params['y_offset_min'])
+                if 'y_offset_max' in params:
+                    self.y_max_spin.setValue(params['y_offset_max'])
+
+            if 'duration' in params:
+                self.duration_spin.setValue(params['duration'])
+            if 'curve' in params:
+                index = self.curve_combo.findData(params['curve'])
+                if index >= 0:
+                    self.curve_combo.setCurrentIndex(index)
+
+        elif action_type == ActionType.MOUSE_CLICK:
+            if 'button' in params:
+                index = self.button_combo.findText(params['button'])
+                if index >= 0:
+                    self.button_combo.setCurrentIndex(index)
+            if 'clicks' in params:
+                self.clicks_spin.setValue(params['clicks'])
+
+        elif action_type == ActionType.MOUSE_SCROLL:
+            # Set scroll type
+            scroll_type = params.get('scroll_type', 0)
+            self.scroll_type_combo.setCurrentIndex(scroll_type)
+
+            if scroll_type == 0:  # Fixed Amount
+                if 'amount' in params:
+                    self.amount_spin.setValue(params['amount'])
+            else:  # Random in Range
+                if 'min_amount' in params:
+                    self.min_amount_spin.setValue(params['min_amount'])
+                if 'max_amount' in params:
+                    self.max_amount_spin.setValue(params['max_amount'])
+
+        elif action_type == ActionType.KEY_PRESS:
+            if 'key' in params:
+                self.key_edit.setText(params['key'])
+
+        elif action_type == ActionType.KEY_COMBINATION:
+            if 'keys' in params:
+                self.keys_edit.setText(', '.join(params['keys']))
+
+        elif action_type == ActionType.WAIT:
+            if 'seconds' in params:
+                self.seconds_spin.setValue(params['seconds'])
+    
+    def get_params(self):
+        action_type = self.type_combo.currentData()
+        params = {}
+
+        if action_type == ActionType.MOUSE_MOVE:
+            move_type = self.move_type_combo.currentIndex()
+            params['move_type'] = move_type
+
+            if move_type == 0:  # Specific Coordinates
+                params['x'] = self.x_spin.value()
+                params['y'] = self.y_spin.value()
+            elif move_type == 1:  # Random in Range
+                params['x_min'] = self.x_min_spin.value()
+                params['x_max'] = self.x_max_spin.value()
+                params['y_min'] = self.y_min_spin.value()
+                params['y_max'] = self.y_max_spin.value()
+            elif move_type == 3:  # Relative to Current Position
+                params['x_offset'] = self.x_spin.value()
+                params['y_offset'] = self.y_spin.value()
+            elif move_type == 4:  # Random Range from Current Position
+                params['x_offset_min'] = self.x_min_spin.value()
+                params['x_offset_max'] = self.x_max_spin.value()
+                params['y_offset_min'] = self.y_min_spin.value()
+                params['y_offset_max'] = self.y_max_spin.value()
+            # For fully random, no additional parameters needed
+
+            params['duration'] = self.duration_spin.value()
+            params['curve'] = self.curve_combo.currentData()
+
+        elif action_type == ActionType.MOUSE_CLICK:
+            params['button'] = self.button_combo.currentText()
+            params['clicks'] = self.clicks_spin.value()
+
+        elif action_type == ActionType.MOUSE_SCROLL:
+            scroll_type = self.scroll_type_combo.currentIndex()
+            params['scroll_type'] = scroll_type
+
+            if scroll_type == 0:  # Fixed Amount
+                params['amount'] = self.amount_spin.value()
+            else:  # Random in Range
+                params['min_amount'] = self.min_amount_spin.value()
+                params['max_amount'] = self.max_amount_spin.value()
+
+        elif action_type == ActionType.KEY_PRESS:
+            params['key'] = self.key_edit.text().strip()
+
+        elif action_type == ActionType.KEY_COMBINATION:
+            keys_text = self.keys_edit.text()
+            params['keys'] = [k.strip() for k in keys_text.split(',') if k.strip()]
+
+        elif action_type == ActionType.WAIT:
+            params['seconds'] = self.seconds_spin.value()
+
+        return params
+    
+    def accept(self):
+        try:
+            action_type = self.type_combo.currentData()
+            params = self.get_params()
+
+            # Validate parameters
+            if action_type == ActionType.KEY_PRESS and not params.get('key'):
+                QMessageBox.warning(self, "Validation Error", "Please enter a key.")
+                return
+
+            if action_type == ActionType.KEY_COMBINATION and not params.get('keys'):
+                QMessageBox.warning(self, "Validation Error", "Please enter at least one key.")
+                return
+
+            # Additional validation for random ranges
+            if action_type == ActionType.MOUSE_MOVE:
+                move_type = params.get('move_type')
+
+                # Validate Random in Range
+                if move_type == 1:
+                    x_min = params.get('x_min', 0)
+                    x_max = params.get('x_max', 1000)
+                    y_min = params.get('y_min', 0)
+                    y_max = params.get('y_max', 1000)
+
+                    if x_min > x_max:
+                        QMessageBox.warning(self, "Validation Error", "X minimum must be less than or equal to X maximum.")
+                        return
+
+                    if y_min > y_max:
+                        QMessageBox.warning(self, "Validation Error", "Y minimum must be less than or equal to Y maximum.")
+                        return
+
+                # Validate Random Range from Current Position
+                elif move_type == 4:
+                    x_min = params.get('x_offset_min', -50)
+                    x_max = params.get('x_offset_max', 50)
+                    y_min = params.get('y_offset_min', -50)
+                    y_max = params.get('y_offset_max', 50)
+
+                    if x_min > x_max:
+                        QMessageBox.warning(self, "Validation Error", "X offset minimum must be less than or equal to X offset maximum.")
+                        return
+
+                    if y_min > y_max:
+                        QMessageBox.warning(self, "Validation Error", "Y offset minimum must be less than or equal to Y offset maximum.")
+                        return
+
+            # Validate scroll ranges
+            if action_type == ActionType.MOUSE_SCROLL:
+                scroll_type = params.get('scroll_type')
+                if scroll_type == 1:  # Random in Range
+                    min_amount = params.get('min_amount', -20)
+                    max_amount = params.get('max_amount', 20)
+
+                    if min_amount > max_amount:
+                        QMessageBox.warning(self, "Validation Error", "Scroll minimum must be less than or equal to scroll maximum.")
+                        return
+
+            # Create or update action
+            try:
+                # Actions are read-only: the old one may be in a published MacroSnapshot
+                self.action = Action(action_type, params)
+
+                # Test if the action can generate a name without errors
+                test_name = self.action.display_name()
+                logger.debug("Generated action name: %s", test_name)
+
+                super().accept()
+            except Exception as e:
+                logger.error("Error creating/updating action: %s", e, exc_info=True)
+                QMessageBox.critical(self, "Error", f"Failed to create action: {str(e)}")
+
+        except Exception as e:
+            logger.error("Unexpected error in accept method: %s", e, exc_info=True)
+            QMessageBox.critical(self, "Error", f"An unexpected error occurred: {str(e)}")
+
+
+# Tray-resident application
+class TrayController(QObject):
+    """Everything that keeps running while MagicScript sits in the tray.
+
+    Owns the config, the action list and its published MacroSnapshot, idle
+    detection, the macro worker, the recorder and the tray icon, none of which
+    needs a widget. The MainWindow is built by show_window() and destroyed
+    once it has been hidden for the configured unload delay, so a day spent
+    in the tray does not keep the tabs, spin boxes and action list loaded.
+    """
+    # Emitted from the macro worker when a run or test ends
+    macro_finished = pyqtSignal()
+    # Emitted from the macro worker with a test's (title, message, succeeded)
+    test_finished = pyqtSignal(str, str, bool)
+    # Emitted from the recorder's encoder thread when the stop key is pressed
+    recording_stop_requested = pyqtSignal()
+    # Emitted with the ProfileSession once its files are written
+    profile_finished = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.config_manager = ConfigManager()
+        self.actions = self.config_manager.get_actions()
+        # Built by show_window, destroyed by unload_window
+        self.window = None
+        self.shown_minimize_notice = False
+
+        # Idle detection: a single-shot timer armed for the moment the idle
+        # threshold can next be reached (see schedule_idle_check)
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.idle_timer.timeout.connect(self.check_idle)
+
+        # Started when the window is hidden, stopped when it is shown again
+        self.unload_timer = QTimer(self)
+        self.unload_timer.setSingleShot(True)
+        self.unload_timer.timeout.connect(self.unload_window)
+
+        self.setup_tray()
+        self.setup_macro_engine()
+        self.schedule_idle_check()
+
+    def setup_tray(self):
+        self.tray_icon = QSystemTrayIcon(self)
+
+        # Try to load the icon, with fallbacks
+        icon_path = resource_path("icon.ico")
+        if not os.path.exists(icon_path):
+            # Try PNG version
+            icon_path = resource_path("icon.png")
+
+        if os.path.exists(icon_path):
+            logger.info("Loading tray icon from: %s", icon_path)
+            self.tray_icon.setIcon(QIcon(icon_path))
+        else:
+            # Create a simple fallback icon if no icon file is found
+            logger.warning("Icon files not found, creating fallback icon")
+            pixmap = QPixmap(64, 64)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(pixmap)
+            painter.setPen(QColor(0, 120, 215))  # Windows blue
+            painter.setBrush(QColor(0, 120, 215))
+            painter.drawEllipse(8, 8, 48, 48)
+            painter.setPen(QColor(255, 255, 255))
+            painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter, "MS")
+            painter.end()
+            self.tray_icon.setIcon(QIcon(pixmap))
+
+        self.tray_icon.setToolTip(f"{APP_NAME} v{APP_VERSION}")
+
+        # Create tray menu; kept on self, nothing else owns it without a window
+        self.tray_menu = QMenu()
+        tray_menu = self.tray_menu
+
+        self.toggle_action = QAction("Disable", self)
+        self.toggle_action.triggered.connect(self.toggle_enabled)
+        tray_menu.addAction(self.toggle_action)
+
+        show_action = QAction("Show Window", self)
+        show_action.triggered.connect(self.show_window)
+        tray_menu.addAction(show_action)
+
+        run_action = QAction("Run Now", self)
+        run_action.triggered.connect(self.run_now)
+        tray_menu.addAction(run_action)
+
+        metrics_action = QAction("Metrics...", self)
+        metrics_action.triggered.connect(self.show_metrics)
+        tray_menu.addAction(metrics_action)
+
+        profile_menu = tray_menu.addMenu("Profiling")
+        profile_run_action = QAction("Profile Next Run", self)
+        profile_run_action.triggered.connect(lambda: self.start_profile(runs=1))
+        profile_menu.addAction(profile_run_action)
+        profile_time_action = QAction(f"Profile for {DEFAULT_PROFILE_SECONDS:g} Seconds", self)
+        profile_time_action.triggered.connect(
+            lambda: self.start_profile(seconds=DEFAULT_PROFILE_SECONDS))
+        profile_menu.addAction(profile_time_action)
+        self.stop_profile_action = QAction("Stop Profiling", self)
+        self.stop_profile_action.triggered.connect(stop_profiling)
+        self.stop_profile_action.setEnabled(False)
+        profile_menu.addAction(self.stop_profile_action)
+        self.profile_finished.connect(self.on_profile_finished)
+
+        quit_action = QAction("Quit", self)
+        quit_action.triggered.connect(self.quit_application)
+        tray_menu.addAction(quit_action)
+
+        self.tray_icon.setContextMenu(tray_menu)
+        self.tray_icon.activated.connect(self.on_tray_activated)
+
+        # Show the tray icon
+        self.tray_icon.show()
+
+        # Update tray icon state
+        self.update_tray_state()
+
+    def setup_macro_engine(self):
+        self.idle_scheduler = IdleScheduler()
+        self.macro_finished.connect(self.schedule_idle_check)
+
+        try:
+            set_log_level(self.config_manager.get_log_level())
+        except ValueError as e:
+            logger.error("Error setting log level: %s", e)
+
+        try:
+            set_input_backend(self.config_manager.get_input_backend())
+        except Exception as e:
+            logger.error("Error creating input backend: %s", e)
+
+        # Runs and tests go through one worker thread, one at a time
+        self.macro_worker = MacroWorker(on_finished=lambda job: self.macro_finished.emit()).start()
+        self.test_finished.connect(self.on_test_finished)
+        self.restore_after_test = False
+        self.recorder = None
+        self.recording_stop_requested.connect(self.stop_recording)
+        # What the next run uses; replaced, never modified, when actions or settings change
+        self.snapshot = MacroSnapshot.from_config(self.config_manager, self.actions)
+        self.last_idle_time = 0
+        self.next_run_time = None
+
+        self.metrics_exporter = MetricsExporter(path=self.config_manager.get_metrics_file(),
+                                                interval=self.config_manager.get_metrics_interval())
+        if self.metrics_exporter.interval > 0:
+            self.metrics_exporter.start()
+
+    def update_tray_state(self):
+        enabled = self.config_manager.is_enabled()
+        self.toggle_action.setText("Disable" if enabled else "Enable")
+
+        # Update tooltip with status
+        status = "Enabled" if enabled else "Disabled"
+        self.tray_icon.setToolTip(f"{APP_NAME} v{APP_VERSION} - {status}")
+
+    def schedule_idle_check(self):
+        """(Re)arm the idle timer for when the idle threshold can next be reached"""
+        self.idle_timer.stop()
+        if not self.config_manager.is_enabled() or self.macro_worker.busy or not self.actions:
+            # Nothing to trigger; re-armed when settings, actions or run state change
+            return
+        self.check_idle()
+
+    def check_idle(self):
+        idle_time = get_idle_time(max_age=0)  # Never trigger on an extrapolated reading
+        self.last_idle_time = idle_time
+        threshold = self.config_manager.get_idle_time()
+        delay = self.idle_scheduler.next_delay(idle_time, threshold)
+        if delay <= 0:
+            metrics.observe('magicscript_idle_trigger_seconds', max(0.0, idle_time - threshold))
+            self.start_macro()
+        else:
+            # Round up so we never wake a hair before the threshold
+            self.idle_timer.start(int(delay * 1000) + 1)
+
+    def start_macro(self):
+        """Start an idle-triggered run unless the worker already has something to do"""
+        if self.macro_worker.busy or not self.actions or self.recorder is not None:
+            return
+        self.macro_worker.submit(self.run_macro, "macro run")
+
+    def run_now(self):
+        """Queue a run of the macro, e.g. from the tray menu"""
+        if not self.actions or self.recorder is not None:
+            return
+        self.submit_job(self.run_macro, "manual run")
+
+    def submit_job(self, func, name):
+        """Queue `func(cancel_token)` on the macro worker; tells the user if the queue is full"""
+        job = self.macro_worker.submit(func, name)
+        if job is None:
+            self.tray_icon.showMessage(
+                APP_NAME,
+                f"Busy: {len(self.macro_worker)} runs or tests are already waiting",
+                QSystemTrayIcon.MessageIcon.Warning,
+                2000
+            )
+        return job
+
+    def publish_snapshot(self, actions=None):
+        """Publish the run settings, and `actions` if given, as a new MacroSnapshot"""
+        previous = self.snapshot
+        self.snapshot = MacroSnapshot.from_config(
+            self.config_manager, previous.actions if actions is None else actions, previous)
+
+    def get_plan(self):
+        """Return the compiled plan of the current snapshot"""
+        return self.snapshot.plan
+
+    def on_actions_changed(self):
+        """Publish and persist the action list"""
+        self.publish_snapshot(self.actions)
+        self.config_manager.set_actions(self.actions)
+        self.schedule_idle_check()
+
+    def run_macro(self, cancel_token=None):
+        """Run the macro once; a MacroWorker job, but can also be called directly"""
+        with profile_run("run_macro"):
+            self._run_macro(cancel_token)
+
+    def _run_macro(self, cancel_token):
+        token = cancel_token or CancelToken()
+        # Everything the run needs, taken once; the GUI may publish newer versions meanwhile
+        snapshot = self.snapshot
+        try:
+            logger.info("Starting macro execution (version %d)", snapshot.version)
+
+            # Reset next run time
+            self.next_run_time = None
+
+            ctx = RunContext(get_input_backend(), token)
+
+            # Stop within milliseconds when the user comes back
+            if execute_watched(snapshot.plan, ctx, snapshot.delay_range, snapshot.step_pause):
+                logger.info("Macro execution completed")
+        except Exception as e:
+            logger.error("Error in macro execution: %s", e)
+        finally:
+            # Schedule next run if still idle and enabled
+            latest = self.snapshot
+            if latest.enabled and get_idle_time() >= 1.0:
+                self.next_run_time = latest.idle_time
+
+    def cancel_macro(self, reason):
+        """Stop the running macro or test at its next interruptible point and drop queued ones"""
+        self.macro_worker.cancel(reason)
+
+    def start_test(self, func, name):
+        """Queue a test on the macro worker, hiding the window while it runs"""
+        # Hide window during test to avoid interference
+        was_visible = self.window is not None and self.window.isVisible()
+        if self.submit_job(func, name) is not None and was_visible:
+            self.restore_after_test = True
+            self.window.hide()
+
+    def execute_test_action(self, action, cancel_token):
+        # Wait a moment before executing
+        if cancel_token.wait(0.5):
+            self.test_finished.emit("Action Test", f"Test of '{action.name}' cancelled", False)
+            return
+        if action.execute(cancel_token=cancel_token):
+            self.test_finished.emit("Action Test", f"Action '{action.name}' executed successfully",
+                                    True)
+        else:
+            self.test_finished.emit("Action Test", f"Failed to execute action '{action.name}'",
+                                    False)
+
+    def execute_test_all_actions(self, actions, cancel_token):
+        success_count = 0
+        fail_count = 0
+
+        # Wait a moment before executing, and add a small delay between actions
+        for action in actions:
+            if cancel_token.wait(0.5):
+                break
+            if action.execute(cancel_token=cancel_token):
+                success_count += 1
+            else:
+                fail_count += 1
+
+        message = f"Executed {success_count} actions successfully, {fail_count} failed"
+        if cancel_token.cancelled:
+            message += f" (cancelled: {cancel_token.reason})"
+        self.test_finished.emit("Actions Test", message, True)
+
+    def on_test_finished(self, title, message, succeeded):
+        # Show window again if it was visible
+        if self.restore_after_test:
+            self.restore_after_test = False
+            QTimer.singleShot(500, self.show_window)
+
+        # Show result
+        icon = QSystemTrayIcon.MessageIcon
+        self.tray_icon.showMessage(
+            title,
+            message,
+            icon.Information if succeeded else icon.Warning,
+            2000
+        )
+
+    def start_recording(self):
+        """Hide the window and record input until the stop key is pressed"""
+        self.cancel_macro("recording")
+        self.recorder = MacroRecorder(on_stop=self.recording_stop_requested.emit)
+        self.recorder.start()
+        if self.window is not None:
+            self.window.hide()
+        self.tray_icon.showMessage(
+            "Recording",
+            f"Recording mouse and keyboard input. Press {RECORDER_STOP_KEY.upper()} to stop.",
+            QSystemTrayIcon.MessageIcon.Information,
+            2000
+        )
+
+    def stop_recording(self):
+        """Stop the recorder and append what it captured to the macro"""
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return
+        actions = recorder.stop()
+        if actions:
+            self.actions.extend(actions)
+            self.on_actions_changed()
+        if self.window is not None:
+            self.window.on_recording_stopped(len(actions))
+        self.show_window()
+        self.tray_icon.showMessage(
+            "Recording",
+            f"Recorded {len(actions)} actions",
+            QSystemTrayIcon.MessageIcon.Information,
+            2000
+        )
+
+    def set_enabled(self, enabled):
+        """Turn macro automation on or off, from the settings tab or the tray menu"""
+        if enabled == self.config_manager.is_enabled():
+            return
+        self.config_manager.set_enabled(enabled)
+        self.publish_snapshot()
+        if not enabled:
+            self.cancel_macro("disabled")
+        self.update_tray_state()
+        if self.window is not None:
+            self.window.enabled_check.setChecked(enabled)
+        self.schedule_idle_check()
+
+    def toggle_enabled(self):
+        enabled = not self.config_manager.is_enabled()
+        self.set_enabled(enabled)
+
+        # Show notification
+        status = "enabled" if enabled else "disabled"
+        self.tray_icon.showMessage(
+            APP_NAME,
+            f"Macro automation {status}",
+            QSystemTrayIcon.MessageIcon.Information,
+            2000
+        )
+
+    def on_tray_activated(self, reason):
+        if reason == QSystemTrayIcon.ActivationReason.DoubleClick:
+            self.show_window()
+
+    def show_window(self):
+        """Show the main window, building it first if it is not loaded"""
+        if self.window is None:
+            with profile_span("build_window"):
+                self.window = MainWindow(self)
+            logger.debug("Main window built")
+        self.window.showNormal()
+        self.window.activateWindow()
+
+    def on_window_shown(self):
+        self.unload_timer.stop()
+
+    def on_window_hidden(self):
+        delay = self.config_manager.get_window_unload_delay()
+        if delay > 0:
+            self.unload_timer.start(int(delay * 1000))
+
+    def unload_window(self):
+        """Destroy the hidden main window; show_window() builds a new one"""
+        window = self.window
+        if window is None or window.isVisible():
+            return
+        self.window = None
+        # Runs once the widget tree is gone, not while it is being torn down
+        window.destroyed.connect(lambda: QTimer.singleShot(0, release_memory))
+        window.deleteLater()
+        logger.debug("Main window unloaded")
+
+    def show_metrics(self):
+        """Write the metrics files now and show a summary"""
+        exporter = self.metrics_exporter
+        if exporter.write():
+            location = (f"Written to {os.path.abspath(exporter.path)} "
+                        f"and {os.path.abspath(exporter.json_path)}")
+        else:
+            location = (f"Could not write {os.path.abspath(exporter.path)}; "
+                        f"see the log for details")
+        QMessageBox.information(self.window, f"{APP_NAME} Metrics",
+                                f"{metrics.summary()}\n\n{location}")
+
+    def start_profile(self, runs=None, seconds=None):
+        """Profile the next `runs` macro runs or `seconds` seconds; files go next to the config"""
+        directory = os.path.dirname(os.path.abspath(self.config_manager.config_file))
+        start_profiling(directory, runs, seconds, on_finished=self.profile_finished.emit)
+        self.stop_profile_action.setEnabled(True)
+
+    def on_profile_finished(self, session):
+        self.stop_profile_action.setEnabled(get_profile_session() is not None)
+        if session.files:
+            message = f"Profile written to {session.directory}"
+            icon = QSystemTrayIcon.MessageIcon.Information
+        else:
+            message = "Could not write the profile; see the log for details"
+            icon = QSystemTrayIcon.MessageIcon.Warning
+        self.tray_icon.showMessage(APP_NAME, message, icon, 3000)
+
+    def quit_application(self):
+        reply = QMessageBox.question(
+            self.window,
+            "Quit Confirmation",
+            f"Are you sure you want to quit {APP_NAME}?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+
+        if reply == QMessageBox.StandardButton.Yes:
+            # Cancel the running macro or test and wait for the worker to finish it
+            self.macro_worker.shutdown(reason="quitting")
+            stop_profiling()
+            if self.recorder is not None:
+                self.recorder.stop()
+            if self.metrics_exporter.interval > 0:
+                self.metrics_exporter.close()
+            # Make sure debounced config changes hit the disk before exiting
+            self.config_manager.close()
+            QApplication.quit()
+
+
+def release_memory():
+    """Collect garbage and, with glibc, hand freed heap pages back to the system"""
+    gc.collect()
+    if sys.platform.startswith('linux'):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+# Main application window
+class MainWindow(QMainWindow):
+    """Action editor and settings, shown over a TrayController.
+
+    Built by TrayController.show_window() and destroyed after it has been
+    hidden for a while, so it holds no state of its own: the actions, the
+    settings and the run state all live on the controller.
+    """
+
+    def __init__(self, controller):
+        super().__init__()
+        self.controller = controller
+        self.config_manager = controller.config_manager
+        self.setup_ui()
+        self.load_settings()
+
+        # Update UI state
+        self.update_action_list()
+        self.update_controls_state()
+
+        # Set window properties
+        self.setWindowTitle(f"{APP_NAME} v{APP_VERSION}")
+        self.setWindowIcon(controller.tray_icon.icon())
+        self.resize(600, 500)
+
+    @property
+    def actions(self):
+        return self.controller.actions
+
+    def setup_ui(self):
+        central_widget = QWidget()
+        main_layout = QVBoxLayout()
+
+        # Create tabs
+        tabs = QTabWidget()
+
+        # Actions tab
+        actions_tab = QWidget()
+        actions_layout = QVBoxLayout()
+
+        # Action list
+        self.action_model = ActionListModel(self.actions, self)
+        self.action_model.rowsMoved.connect(self.on_actions_reordered)
+        self.action_list = QListView()
+        self.action_list.setModel(self.action_model)
+        self.action_list.setUniformItemSizes(True)
+        self.action_list.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.action_list.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
+        self.action_list.setDefaultDropAction(Qt.DropAction.MoveAction)
+        self.action_list.selectionModel().currentChanged.connect(self.update_controls_state)
+        actions_layout.addWidget(QLabel("Macro Actions:"))
+        actions_layout.addWidget(self.action_list)
+
+        # Action buttons
+        action_buttons_layout = QHBoxLayout()
+        self.add_action_btn = QPushButton("Add Action")
+        self.add_action_btn.clicked.connect(self.on_add_action)
+        self.edit_action_btn = QPushButton("Edit Action")
+        self.edit_action_btn.clicked.connect(self.on_edit_action)
+        self.remove_action_btn = QPushButton("Remove Action")
+        self.remove_action_btn.clicked.connect(self.on_remove_action)
+        self.test_action_btn = QPushButton("Test Action")
+        self.test_action_btn.clicked.connect(self.on_test_action)
+
+        action_buttons_layout.addWidget(self.add_action_btn)
+        action_buttons_layout.addWidget(self.edit_action_btn)
+        action_buttons_layout.addWidget(self.remove_action_btn)
+        action_buttons_layout.addWidget(self.test_action_btn)
+        actions_layout.addLayout(action_buttons_layout)
+
+        # Test all, import and export buttons
+        macro_buttons_layout = QHBoxLayout()
+        self.test_all_btn = QPushButton("Test All Actions")
+        self.test_all_btn.clicked.connect(self.on_test_all_actions)
+        self.import_btn = QPushButton("Import...")
+        self.import_btn.clicked.connect(self.on_import_actions)
+        self.export_btn = QPushButton("Export...")
+        self.export_btn.clicked.connect(self.on_export_actions)
+
+        self.record_btn = QPushButton("Record")
+        self.record_btn.clicked.connect(self.on_record)
+
+        macro_buttons_layout.addWidget(self.test_all_btn)
+        macro_buttons_layout.addWidget(self.record_btn)
+        self.optimize_btn = QPushButton("Optimize")
+        self.optimize_btn.clicked.connect(self.on_optimize_actions)
+        macro_buttons_layout.addWidget(self.optimize_btn)
+        macro_buttons_layout.addWidget(self.import_btn)
+        macro_buttons_layout.addWidget(self.export_btn)
+        actions_layout.addLayout(macro_buttons_layout)
+
+        actions_tab.setLayout(actions_layout)
+
+        # Settings tab
+        settings_tab = QWidget()
+        settings_layout = QVBoxLayout()
+
+        # Idle time settings
+        idle_group = QGroupBox("Idle Detection")
+        idle_layout = QFormLayout()
+
+        self.idle_spin = QSpinBox()
+        self.idle_spin.setRange(10, 3600)
+        self.idle_spin.setSingleStep(10)
+        self.idle_spin.setSuffix(" seconds")
+        self.idle_spin.valueChanged.connect(self.on_idle_time_changed)
+        idle_layout.addRow("Run macro after idle time:", self.idle_spin)
+
+        self.enabled_check = QCheckBox("Enable macro automation")
+        self.enabled_check.stateChanged.connect(self.on_enabled_changed)
+        idle_layout.addRow("", self.enabled_check)
+
+        idle_group.setLayout(idle_layout)
+        settings_layout.addWidget(idle_group)
+
+        # Random delay settings
+        delay_group = QGroupBox("Random Delay")
+        delay_layout = QFormLayout()
+
+        self.random_delay_check = QCheckBox("Add random delay between actions")
+        self.random_delay_check.stateChanged.connect(self.on_random_delay_changed)
+        delay_layout.addRow("", self.random_delay_check)
+
+        delay_range_layout = QHBoxLayout()
+        self.min_delay_spin = QSpinBox()
+        self.min_delay_spin.setRange(0, 60)
+        self.min_delay_spin.setSuffix(" seconds")
+        self.min_delay_spin.valueChanged.connect(self.on_delay_range_changed)
+
+        self.max_delay_spin = QSpinBox()
+        self.max_delay_spin.setRange(1, 300)
+        self.max_delay_spin.setSuffix(" seconds")
+        self.max_delay_spin.valueChanged.connect(self.on_delay_range_changed)
+
+        delay_range_layout.addWidget(QLabel("Min:"))
+        delay_range_layout.addWidget(self.min_delay_spin)
+        delay_range_layout.addWidget(QLabel("Max:"))
+        delay_range_layout.addWidget(self.max_delay_spin)
+        delay_layout.addRow("Delay range:", delay_range_layout)
+
+        self.step_pause_spin = QDoubleSpinBox()
+        self.step_pause_spin.setRange(0.0, 10.0)
+        self.step_pause_spin.setSingleStep(0.05)
+        self.step_pause_spin.setSuffix(" seconds")
+        self.step_pause_spin.valueChanged.connect(self.on_step_pause_changed)
+        delay_layout.addRow("Pause after each action:", self.step_pause_spin)
+
+        delay_group.setLayout(delay_layout)
+        settings_layout.addWidget(delay_group)
+
+        # General settings
+        general_group = QGroupBox("General Settings")
+        general_layout = QFormLayout()
+
+        self.startup_check = QCheckBox("Run on Windows startup")
+        self.startup_check.stateChanged.connect(self.on_startup_changed)
+        general_layout.addRow("", self.startup_check)
+
+        self.start_in_tray_check = QCheckBox("Start in the system tray")
+        self.start_in_tray_check.stateChanged.connect(self.on_start_in_tray_changed)
+        general_layout.addRow("", self.start_in_tray_check)
+
+        self.log_level_combo = QComboBox()
+        self.log_level_combo.addItems(LOG_LEVELS)
+        self.log_level_combo.currentTextChanged.connect(self.on_log_level_changed)
+        general_layout.addRow("Log level:", self.log_level_combo)
+
+        # Add minimize to tray button
+        minimize_btn = QPushButton("Minimize to Tray")
+        minimize_btn.clicked.connect(self.hide)
+        minimize_btn.setIcon(QIcon(resource_path("icon.ico")))
+        general_layout.addRow("", minimize_btn)
+
+        general_group.setLayout(general_layout)
+        settings_layout.addWidget(general_group)
+
+        # Status display
+        status_group = QGroupBox("Status")
+        status_layout = QFormLayout()
+
+        self.status_label = QLabel("Idle time: 0 seconds")
+        status_layout.addRow("", self.status_label)
+
+        self.next_run_label = QLabel("Next run: Not scheduled")
+        status_layout.addRow("", self.next_run_label)
+
+        status_group.setLayout(status_layout)
+        settings_layout.addWidget(status_group)
+
+        # Add spacer
+        settings_layout.addStretch()
+
+        settings_tab.setLayout(settings_layout)
+
+        # Add tabs
+        tabs.addTab(actions_tab, "Actions")
+        tabs.addTab(settings_tab, "Settings")
+
+        main_layout.addWidget(tabs)
+
+        central_widget.setLayout(main_layout)
+        self.setCentralWidget(central_widget)
+
+        # Status labels only need refreshing while the window is visible
+        self.status_timer = QTimer(self)
+        self.status_timer.setInterval(1000)
+        self.status_timer.timeout.connect(self.update_status)
+
+    def load_settings(self):
+        """Show the saved settings; the change handlers stay quiet, nothing was changed"""
+        widgets = (self.idle_spin, self.enabled_check, self.startup_check, self.start_in_tray_check,
+                   self.random_delay_check, self.min_delay_spin, self.max_delay_spin,
+                   self.step_pause_spin, self.log_level_combo)
+        for widget in widgets:
+            widget.blockSignals(True)
+
+        self.idle_spin.setValue(self.config_manager.get_idle_time())
+        self.enabled_check.setChecked(self.config_manager.is_enabled())
+        self.startup_check.setChecked(self.config_manager.get_run_on_startup())
+        self.start_in_tray_check.setChecked(self.config_manager.get_start_in_tray())
+        self.random_delay_check.setChecked(self.config_manager.get_random_delay())
+        min_delay, max_delay = self.config_manager.get_random_delay_range()
+        self.min_delay_spin.setValue(min_delay)
+        self.max_delay_spin.setValue(max_delay)
+        self.step_pause_spin.setValue(self.config_manager.get_step_pause())
+        index = self.log_level_combo.findText(self.config_manager.get_log_level())
+        if index >= 0:
+            self.log_level_combo.setCurrentIndex(index)
+
+        for widget in widgets:
+            widget.blockSignals(False)
+
+    def update_action_list(self):
+        """Show the controller's actions from scratch; single edits go through self.action_model"""
+        self.action_model.reset(self.actions)
+
+        # Select the first item if available
+        if self.actions:
+            self.set_current_row(0)
+
+    def current_row(self):
+        index = self.action_list.currentIndex()
+        return index.row() if index.isValid() else -1
+
+    def set_current_row(self, row):
+        self.action_list.setCurrentIndex(self.action_model.index(row))
+
+    def update_controls_state(self, *args):
+        # Update button states based on selection
+        has_selection = self.current_row() >= 0
+        self.edit_action_btn.setEnabled(has_selection)
+        self.remove_action_btn.setEnabled(has_selection)
+        self.test_action_btn.setEnabled(has_selection)
+
+        # Update test all button
+        self.test_all_btn.setEnabled(len(self.actions) > 0)
+        self.optimize_btn.setEnabled(len(self.actions) > 0)
+        recording = self.controller.recorder is not None
+        self.record_btn.setText("Stop Recording" if recording else "Record")
+
+        # Update delay controls
+        delay_enabled = self.random_delay_check.isChecked()
+        self.min_delay_spin.setEnabled(delay_enabled)
+        self.max_delay_spin.setEnabled(delay_enabled)
+
+    def update_status(self):
+        with profile_span("update_status"):
+            controller = self.controller
+            idle_time = get_idle_time()
+            controller.last_idle_time = idle_time
+            self.status_label.setText(f"Idle time: {idle_time:.1f} seconds")
+
+            if controller.next_run_time is not None:
+                time_left = max(0, controller.next_run_time - idle_time)
+                self.next_run_label.setText(f"Next run: in {time_left:.1f} seconds")
+            else:
+                self.next_run_label.setText("Next run: Not scheduled")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.controller.on_window_shown()
+        self.update_status()
+        self.status_timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.status_timer.stop()
+        self.controller.on_window_hidden()
+
+    def on_add_action(self):
+        try:
+            dialog = ActionDialog(self)
+            if dialog.exec():
+                try:
+                    action = dialog.action
+                    if action:
+                        # Verify the action can be executed without errors
+                        logger.debug("Verifying new action: %s", action.name)
+
+                        row = len(self.actions)
+                        self.action_model.insert_action(row, action)
+                        self.set_current_row(row)
+                        self.controller.on_actions_changed()
+                        self.update_controls_state()
+                    else:
+                        logger.error("Action dialog returned but action is None")
+                        QMessageBox.warning(self, "Error", "Failed to create action. Please try again.")
+                except Exception as e:
+                    logger.error("Error adding action: %s", e, exc_info=True)
+                    QMessageBox.critical(self, "Error", f"Failed to add action: {str(e)}")
+        except Exception as e:
+            logger.error("Unexpected error in on_add_action: %s", e, exc_info=True)
+            QMessageBox.critical(self, "Error", f"An unexpected error occurred: {str(e)}")
+
+    def on_edit_action(self):
+        try:
+            current_row = self.current_row()
+            if current_row >= 0:
+                dialog = ActionDialog(self, self.actions[current_row])
+                if dialog.exec():
+                    try:
+                        # Verify the action is valid
+                        action = dialog.action
+                        if action:
+                            logger.debug("Updated action: %s", action.name)
+                            self.action_model.replace_action(current_row, action)
+                            self.controller.on_actions_changed()
+                        else:
+                            logger.error("Action dialog returned but action is None")
+                            QMessageBox.warning(self, "Error", "Failed to update action. Please try again.")
+                    except Exception as e:
+                        logger.error("Error updating action: %s", e, exc_info=True)
+                        QMessageBox.critical(self, "Error", f"Failed to update action: {str(e)}")
+        except Exception as e:
+            logger.error("Unexpected error in on_edit_action: %s", e, exc_info=True)
+            QMessageBox.critical(self, "Error", f"An unexpected error occurred: {str(e)}")
+
+    def on_remove_action(self):
+        current_row = self.current_row()
+        if current_row >= 0:
+            self.action_model.remove_action(current_row)
+            if self.actions:
+                self.set_current_row(min(current_row, len(self.actions) - 1))
+            self.controller.on_actions_changed()
+            self.update_controls_state()
+
+    def on_test_action(self):
+        current_row = self.current_row()
+        if current_row >= 0:
+            action = self.actions[current_row]
+            controller = self.controller
+            controller.start_test(lambda token: controller.execute_test_action(action, token),
+                                  f"test of {action.name}")
+
+    def on_test_all_actions(self):
+        if not self.actions:
+            return
+        controller = self.controller
+        actions = controller.snapshot.actions
+        controller.start_test(lambda token: controller.execute_test_all_actions(actions, token),
+                              "test of all actions")
+
+    def on_record(self):
+        if self.controller.recorder is not None:
+            self.controller.stop_recording()
+            return
+        if default_input_source() is None:
+            QMessageBox.information(self, "Record", "Recording is only supported on Windows.")
+            return
+
+        self.controller.start_recording()
+        self.update_controls_state()
+
+    def on_recording_stopped(self, count):
+        """Show the `count` actions the recorder just appended"""
+        if count:
+            self.update_action_list()
+            self.set_current_row(len(self.actions) - 1)
+        self.update_controls_state()
+
+    def on_optimize_actions(self):
+        delay_range = None
+        if self.config_manager.get_random_delay():
+            delay_range = self.config_manager.get_random_delay_range()
+        actions, report = optimize_actions(self.actions,
+                                           step_pause=self.config_manager.get_step_pause(),
+                                           delay_range=delay_range)
+        if not report.steps_removed:
+            QMessageBox.information(self, "Optimize", "Nothing to optimize.")
+            return
+
+        reply = QMessageBox.question(
+            self,
+            "Optimize",
+            f"{report.summary()}.\n\nApply these changes?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.Yes
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            self.controller.actions = actions
+            self.update_action_list()
+            self.controller.on_actions_changed()
+            self.update_controls_state()
+
+    def on_import_actions(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Macro", "", MACRO_FILE_FILTER)
+        if not path:
+            return
+        try:
+            actions = import_actions(path)
+        except Exception as e:
+            logger.error("Error importing macro from %s: %s", path, e, exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to import macro: {str(e)}")
+            return
+
+        self.controller.actions = actions
+        self.update_action_list()
+        self.controller.on_actions_changed()
+        self.update_controls_state()
+        logger.info("Imported %d actions from %s", len(actions), path)
+
+    def on_export_actions(self):
+        path, selected_filter = QFileDialog.getSaveFileName(self, "Export Macro", "",
+                                                            MACRO_FILE_FILTER)
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            path += ".json" if selected_filter.startswith("JSON") else MACRO_FILE_EXTENSION
+        try:
+            export_actions(path, self.actions)
+            logger.info("Exported %d actions to %s", len(self.actions), path)
+        except Exception as e:
+            logger.error("Error exporting macro to %s: %s", path, e, exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to export macro: {str(e)}")
+
+    def on_actions_reordered(self):
+        # The model has already moved the action within the controller's actions
+        self.controller.on_actions_changed()
+
+    def on_idle_time_changed(self, value):
+        self.config_manager.set_idle_time(value)
+        self.controller.publish_snapshot()
+        self.controller.schedule_idle_check()
+
+    def on_enabled_changed(self, state):
+        self.controller.set_enabled(state == Qt.CheckState.Checked.value)
+
+    def on_startup_changed(self, state):
+        enabled = state == Qt.CheckState.Checked.value
+        self.config_manager.set_run_on_startup(enabled)
+
+    def on_start_in_tray_changed(self, state):
+        self.config_manager.set_start_in_tray(state == Qt.CheckState.Checked.value)
+
+    def on_random_delay_changed(self, state):
+        enabled = state == Qt.CheckState.Checked.value
+        self.config_manager.set_random_delay(enabled)
+        self.controller.publish_snapshot()
+        self.update_controls_state()
+
+    def on_delay_range_changed(self):
+        min_delay = self.min_delay_spin.value()
+        max_delay = self.max_delay_spin.value()
+
+        # Ensure max is always >= min
+        if max_delay < min_delay:
+            self.max_delay_spin.setValue(min_delay)
+            max_delay = min_delay
+
+        self.config_manager.set_random_delay_range(min_delay, max_delay)
+        self.controller.publish_snapshot()
+
+    def on_log_level_changed(self, level):
+        self.config_manager.set_log_level(level)
+        set_log_level(level)
+
+    def on_step_pause_changed(self, value):
+        self.config_manager.set_step_pause(value)
+        self.controller.publish_snapshot()
+
+    def closeEvent(self, event):
+        """Handle window close event"""
+        # Minimize to tray instead of closing
+        event.ignore()
+        self.hide()
+
+        # Show notification first time
+        controller = self.controller
+        if not controller.shown_minimize_notice:
+            controller.tray_icon.showMessage(
+                APP_NAME,
+                f"{APP_NAME} is still running in the system tray.",
+                QSystemTrayIcon.MessageIcon.Information,
+                2000
+            )
+            controller.shown_minimize_notice = True
+
+
+def create_app(argv=None):
+    """Create the QApplication and the TrayController; the main window is built on demand"""
+    app = QApplication.instance() or QApplication(sys.argv if argv is None else argv)
+    app.setQuitOnLastWindowClosed(False)  # Don't quit when window is closed
+
+    # Set application style
+    app.setStyle("Fusion")
+
+    controller = TrayController()
+    return app, controller
+
+
+def run_gui():
+    """Run the GUI and return its exit code.
+
+    Shows the main window unless starting in the tray, then runs the Qt event loop.
+    """
+    app, controller = create_app()
+    if controller.config_manager.get_start_in_tray():
+        # Drop what loading the config left behind; nothing else will for a while
+        release_memory()
+    else:
+        controller.show_window()
+
+    # Start application event loop
+    exit_code = app.exec()
+    controller.config_manager.close()
+    return exit_code
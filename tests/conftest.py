@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Headless: never touch the real mouse, keyboard or idle timer
+os.environ.setdefault("MAGICSCRIPT_INPUT_BACKEND", "null")
+os.environ.setdefault("MAGICSCRIPT_IDLE_SOURCE", "scripted")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
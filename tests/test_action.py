@@ -0,0 +1,27 @@
+import pytest
+
+from magic_script import Action, ActionType
+
+
+def test_display_text_is_computed_once():
+    action = Action(ActionType.MOUSE_CLICK, {'button': 'right', 'clicks': 2})
+
+    assert action.display_name() == "Mouse right click (2 clicks)"
+    assert action.display_name() is action.display_name()
+    assert action.tooltip() == "Type: Mouse Click\nParameters: button: right, clicks: 2"
+    assert action.tooltip() is action.tooltip()
+
+
+def test_custom_name_does_not_replace_display_name():
+    action = Action(ActionType.WAIT, {'seconds': 3}, name="Let the page load")
+
+    assert action.name == "Let the page load"
+    assert action.display_name() == "Wait 3 seconds"
+
+
+@pytest.mark.parametrize("field", ["action_type", "params"])
+def test_published_actions_are_read_only(field):
+    action = Action(ActionType.KEY_PRESS, {'key': 'enter'})
+
+    with pytest.raises(AttributeError):
+        setattr(action, field, getattr(action, field))
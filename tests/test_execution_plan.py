@@ -0,0 +1,78 @@
+import magic_script as ms
+from magic_script import Action, ActionType, ExecutionPlan, RecordingBackend, RunContext
+
+
+def click(button='left', clicks=1):
+    return Action(ActionType.MOUSE_CLICK, {'button': button, 'clicks': clicks})
+
+
+def press(key):
+    return Action(ActionType.KEY_PRESS, {'key': key})
+
+
+def wait(seconds=0):
+    return Action(ActionType.WAIT, {'seconds': seconds})
+
+
+def move(x, y):
+    return Action(ActionType.MOUSE_MOVE, {'move_type': 0, 'x': x, 'y': y, 'duration': 0})
+
+
+def move_by(x_offset, y_offset):
+    return Action(ActionType.MOUSE_MOVE, {'move_type': 3, 'x_offset': x_offset,
+                                          'y_offset': y_offset, 'duration': 0})
+
+
+def run(actions, batch_inputs=True):
+    """The batches a run of `actions` submits, one tuple of events per backend.send call"""
+    backend = RecordingBackend(position=(0, 0))
+    assert ms.execute_plan(ExecutionPlan(actions, batch_inputs), RunContext(backend, seed=1))
+    assert all(kind == 'send' for _, kind, _ in backend.events)
+    return [events for _, _, events in backend.events]
+
+
+def flatten(batches):
+    return [event for batch in batches for event in batch]
+
+
+def test_adjacent_inputs_share_one_send_in_order():
+    actions = [click('left', 2), press('a'),
+               Action(ActionType.KEY_COMBINATION, {'keys': ['ctrl', 'c']}),
+               Action(ActionType.MOUSE_SCROLL, {'scroll_type': 0, 'amount': 3}),
+               move(10, 20)]
+    assert run(actions) == [(('click', 'left', 2), ('press', 'a'), ('hotkey', 'ctrl', 'c'),
+                             ('scroll', 3), ('move_to', 10, 20))]
+
+
+def test_wait_flushes_the_batch():
+    plan = ExecutionPlan([click(), press('a'), wait(), press('b')])
+    assert [type(action) for action, _ in plan] == [ms.ActionBatch, Action, Action]
+    assert run([click(), press('a'), wait(), press('b')]) == [
+        (('click', 'left', 1), ('press', 'a')),
+        (('press', 'b'),),
+    ]
+
+
+def test_batch_is_flushed_at_max_batch_actions():
+    keys = [f"k{index}" for index in range(2 * ms.MAX_BATCH_ACTIONS + 1)]
+    batches = run([press(key) for key in keys])
+    assert [len(batch) for batch in batches] == [ms.MAX_BATCH_ACTIONS, ms.MAX_BATCH_ACTIONS, 1]
+    assert [key for batch in batches for _, key in batch] == keys
+
+
+def test_relative_move_uses_the_cursor_the_batch_leaves():
+    assert run([move(100, 100), move_by(5, -10)]) == [(('move_to', 100, 100), ('move_to', 105, 90))]
+
+
+def test_unbatched_plan_sends_each_action_alone_in_the_same_order():
+    actions = [click(), press('a'), move(10, 20), press('b')]
+    batched = run(actions)
+    unbatched = run(actions, batch_inputs=False)
+    assert len(unbatched) == len(actions)
+    assert flatten(unbatched) == flatten(batched)
+
+
+def test_snapshot_only_batches_without_pauses_or_delays():
+    assert ms.MacroSnapshot([click()]).batch_inputs
+    assert not ms.MacroSnapshot([click()], step_pause=0.1).batch_inputs
+    assert not ms.MacroSnapshot([click()], delay_range=(0, 1)).batch_inputs
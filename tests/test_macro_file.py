@@ -0,0 +1,125 @@
+import json
+import struct
+
+import pytest
+
+import magic_script as ms
+from magic_script import (MACRO_FILE_HEADER, Action, ActionType, MacroFile, RecordingBackend,
+                          RunContext, export_actions, import_actions, write_macro_file)
+
+ACTIONS = [
+    {'action_type': 'MOUSE_MOVE',
+     'params': {'move_type': 0, 'x': 640, 'y': 480, 'duration': 0.25, 'curve': 'ease'},
+     'name': None},
+    {'action_type': 'MOUSE_MOVE',
+     'params': {'move_type': 1, 'x_min': -20, 'x_max': 3840, 'y_min': 0, 'y_max': 2160,
+                'duration': 0},
+     'name': "Somewhere on screen"},
+    {'action_type': 'MOUSE_MOVE',
+     'params': {'move_type': 3, 'x_offset': -15, 'y_offset': 7, 'duration': 1.5, 'curve': 'human'},
+     'name': None},
+    {'action_type': 'MOUSE_CLICK', 'params': {'button': 'right', 'clicks': 2}, 'name': None},
+    {'action_type': 'MOUSE_SCROLL',
+     'params': {'scroll_type': 1, 'min_amount': -20, 'max_amount': 20},
+     'name': "Scroll a bit"},
+    {'action_type': 'KEY_PRESS', 'params': {'key': 'enter'}, 'name': None},
+    {'action_type': 'KEY_COMBINATION', 'params': {'keys': ['ctrl', 'shift', 'esc']},
+     'name': "Task manager ✓"},
+    {'action_type': 'WAIT', 'params': {'seconds': 0.001}, 'name': None},
+    {'action_type': 'WAIT', 'params': {'seconds': 2 ** 40}, 'name': None},
+]
+
+
+@pytest.fixture
+def json_file(tmp_path):
+    path = tmp_path / "macro.json"
+    path.write_text(json.dumps({'actions': ACTIONS}))
+    return str(path)
+
+
+def test_json_to_msmacro_round_trip(json_file, tmp_path):
+    actions = import_actions(json_file)
+    expected = [action.to_dict() for action in actions]
+    path = str(tmp_path / "macro.msmacro")
+    export_actions(path, actions)
+
+    with MacroFile(path) as macro:
+        assert len(macro) == len(ACTIONS)
+        assert macro.to_dicts() == expected
+        # Generated names are filled in on load; types and params come back exactly as written
+        assert [(item['action_type'], item['params']) for item in macro.to_dicts()] == [
+            (item['action_type'], item['params']) for item in ACTIONS]
+        assert [macro.name(row) for row in range(len(macro))] == [item['name'] for item in ACTIONS]
+        assert macro.get(0, 'x') == 640 and macro.get(0, 'curve') == 'ease'
+        assert macro[-1].params['seconds'] == 2 ** 40
+    assert [action.to_dict() for action in import_actions(path)] == expected
+
+
+def test_column_store_writes_the_same_file(json_file, tmp_path):
+    actions = import_actions(json_file)
+    from_actions, from_store = tmp_path / "actions.msmacro", tmp_path / "store.msmacro"
+    write_macro_file(str(from_actions), actions)
+    write_macro_file(str(from_store), ms.ActionColumnStore(actions))
+    assert from_actions.read_bytes() == from_store.read_bytes()
+
+
+def test_empty_macro_round_trips(tmp_path):
+    path = str(tmp_path / "empty.msmacro")
+    write_macro_file(path, [])
+    with MacroFile(path) as macro:
+        assert len(macro) == 0
+        assert macro.to_dicts() == []
+
+
+@pytest.fixture
+def macro_bytes(json_file, tmp_path):
+    path = tmp_path / "macro.msmacro"
+    write_macro_file(str(path), import_actions(json_file))
+    return path.read_bytes()
+
+
+def open_bytes(tmp_path, data):
+    path = tmp_path / "broken.msmacro"
+    path.write_bytes(data)
+    with MacroFile(str(path)):
+        pass
+
+
+@pytest.mark.parametrize("keep", [0, 10, MACRO_FILE_HEADER.size - 1,
+                                  MACRO_FILE_HEADER.size + 8, -1])
+def test_truncated_files_are_rejected(macro_bytes, tmp_path, keep):
+    with pytest.raises(ValueError, match="not a macro file|truncated or corrupt"):
+        open_bytes(tmp_path, macro_bytes[:keep])
+
+
+def test_wrong_magic_is_rejected(macro_bytes, tmp_path):
+    with pytest.raises(ValueError, match="not a macro file"):
+        open_bytes(tmp_path, b"NOTMACRO" + macro_bytes[8:])
+
+
+def test_unsupported_version_is_rejected(macro_bytes, tmp_path):
+    data = macro_bytes[:8] + struct.pack('<H', ms.MACRO_FILE_VERSION + 1) + macro_bytes[10:]
+    with pytest.raises(ValueError, match="Unsupported macro file version"):
+        open_bytes(tmp_path, data)
+
+
+def test_failing_row_is_counted_and_still_paused(tmp_path, monkeypatch):
+    path = str(tmp_path / "failing.msmacro")
+    click = Action(ActionType.MOUSE_CLICK, {'button': 'left'})
+    press = Action(ActionType.KEY_PRESS, {'key': 'a'})
+    write_macro_file(path, [press, click, press])
+
+    def broken(macro, row, batch):
+        raise RuntimeError("broken row")
+
+    monkeypatch.setitem(ms.RECORD_QUEUERS, ActionType.MOUSE_CLICK.value, broken)
+    failures = ms.RECORD_METRICS[ActionType.MOUSE_CLICK.value][2]
+    before = failures.value
+    backend = RecordingBackend(position=(0, 0))
+    ctx = RunContext(backend, seed=1)
+    with MacroFile(path) as macro:
+        assert ms.execute_macro_file(macro, ctx, step_pause=0.01)
+
+    assert failures.value == before + 1
+    assert [events for _, _, events in backend.events] == [(('press', 'a'),), (('press', 'a'),)]
+    assert ctx.timing.nominal == pytest.approx(0.03)
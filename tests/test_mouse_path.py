@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from magic_script import MOUSE_CURVES, MOUSE_PATH_RATE, RandomStream, synthesize_path
+
+START = (100, 200)
+END = (900, 650)
+
+
+@pytest.mark.parametrize("curve", MOUSE_CURVES)
+def test_path_ends_exactly_on_the_target(curve):
+    points, _ = synthesize_path(START, END, 0.5, curve, rng=RandomStream(1).path_rng)
+    assert tuple(points[-1]) == END
+    # The first point is one sample into the move, not the start itself
+    assert np.hypot(*(points[0] - START)) < np.hypot(END[0] - START[0], END[1] - START[1]) / 4
+
+
+@pytest.mark.parametrize("curve", MOUSE_CURVES)
+@pytest.mark.parametrize("duration", [0.05, 0.3, 1.7])
+def test_path_takes_the_requested_duration_at_the_sample_rate(curve, duration):
+    points, times = synthesize_path(START, END, duration, curve, rng=RandomStream(1).path_rng)
+    assert len(points) == len(times) == round(duration * MOUSE_PATH_RATE)
+    assert times[-1] == duration
+    steps = np.diff(times)
+    assert np.all(steps > 0)
+    assert np.allclose(steps, 1.0 / MOUSE_PATH_RATE, rtol=0.05)
+
+
+def test_path_with_custom_rate_and_zero_duration():
+    _, times = synthesize_path(START, END, 1.0, 'linear', rate=25)
+    assert len(times) == 25
+    points, times = synthesize_path(START, END, 0.0, 'ease')
+    assert [tuple(point) for point in points] == [END]
+    assert list(times) == [0.0]
+
+
+def test_linear_path_is_a_straight_line():
+    points, _ = synthesize_path((0, 0), (1000, 0), 1.0, 'linear')
+    assert np.all(points[:, 1] == 0)
+    assert np.all(np.diff(points[:, 0]) > 0)
+
+
+@pytest.mark.parametrize("curve", ['bezier', 'human'])
+def test_random_curves_are_deterministic_for_a_seed(curve):
+    first = synthesize_path(START, END, 0.5, curve, rng=RandomStream(42).path_rng)
+    again = synthesize_path(START, END, 0.5, curve, rng=RandomStream(42).path_rng)
+    other = synthesize_path(START, END, 0.5, curve, rng=RandomStream(43).path_rng)
+    assert np.array_equal(first[0], again[0]) and np.array_equal(first[1], again[1])
+    assert not np.array_equal(first[0], other[0])
+
+
+def test_unknown_curve_is_rejected():
+    with pytest.raises(ValueError):
+        synthesize_path(START, END, 0.5, 'zigzag')
+
+
+def test_animated_move_plays_the_path_on_schedule():
+    import magic_script as ms
+
+    backend = ms.RecordingBackend(position=START)
+    action = ms.Action(ms.ActionType.MOUSE_MOVE, {'move_type': 0, 'x': END[0], 'y': END[1],
+                                                  'duration': 0.1, 'curve': 'ease'})
+    assert ms.execute_plan(ms.ExecutionPlan([action]), ms.RunContext(backend, seed=1))
+    placed = [event for event in backend.events if event[1] == 'set_cursor']
+    assert len(placed) == round(0.1 * MOUSE_PATH_RATE)
+    assert placed[-1][2] == END
+    assert placed[-1][0] == pytest.approx(0.1, abs=0.02)
@@ -0,0 +1,148 @@
+import magic_script as ms
+from magic_script import (INPUT_EVENT_BUTTON_DOWN, INPUT_EVENT_BUTTON_UP, INPUT_EVENT_KEY_DOWN,
+                          INPUT_EVENT_KEY_UP, INPUT_EVENT_MOVE, INPUT_EVENT_WHEEL, ActionType,
+                          InputEventRing, RecordingEncoder)
+
+KEY_A = 0x41
+KEY_C = 0x43
+LEFT_CTRL = 0xA2
+LEFT_SHIFT = 0xA0
+
+
+def encoded(events):
+    """Actions a RecordingEncoder makes of `events` passed through a small ring"""
+    ring = InputEventRing(16)
+    encoder = RecordingEncoder()
+    for event in events:
+        ring.put(*event)
+    ring.drain(encoder)
+    return encoder.actions
+
+
+def test_ring_drains_oldest_first_after_overflow():
+    ring = InputEventRing(4)
+    for index in range(10):
+        ring.put(INPUT_EVENT_MOVE, float(index), index, 0)
+    assert len(ring) == 10
+    assert ring.spilled == 6
+
+    seen = []
+    assert ring.drain(lambda kind, timestamp, x, y, code: seen.append(x)) == 10
+    assert seen == list(range(10))
+    assert len(ring) == 0
+
+
+def test_ring_keeps_order_when_the_producer_overflows_between_drains():
+    ring = InputEventRing(4)
+    seen = []
+
+    def handle(kind, timestamp, x, y, code):
+        seen.append(x)
+
+    for index in range(3):
+        ring.put(INPUT_EVENT_MOVE, float(index), index, 0)
+    ring.drain(handle)
+    for index in range(3, 12):
+        ring.put(INPUT_EVENT_MOVE, float(index), index, 0)
+    ring.drain(handle)
+    # Once drained, the ring is used again instead of the overflow
+    ring.put(INPUT_EVENT_MOVE, 12.0, 12, 0)
+    assert ring.spilled == 5
+    ring.drain(handle)
+    assert seen == list(range(13))
+
+
+def test_quick_clicks_at_one_spot_merge_into_a_multi_click():
+    actions = encoded([
+        (INPUT_EVENT_BUTTON_DOWN, 0.0, 10, 20, 0),
+        (INPUT_EVENT_BUTTON_UP, 0.05, 10, 20, 0),
+        (INPUT_EVENT_BUTTON_DOWN, 0.2, 10, 20, 0),
+        (INPUT_EVENT_BUTTON_UP, 0.25, 10, 20, 0),
+        (INPUT_EVENT_BUTTON_DOWN, 0.4, 10, 20, 0),
+    ])
+    assert [action.action_type for action in actions] == [ActionType.MOUSE_MOVE,
+                                                          ActionType.MOUSE_CLICK]
+    assert actions[1].params['button'] == 'left'
+    assert actions[1].params['clicks'] == 3
+
+
+def test_slow_or_moved_clicks_stay_separate():
+    actions = encoded([
+        (INPUT_EVENT_BUTTON_DOWN, 0.0, 10, 20, 0),
+        (INPUT_EVENT_BUTTON_DOWN, 1.0, 10, 20, 0),  # Too late for a double click
+        (INPUT_EVENT_BUTTON_DOWN, 1.1, 30, 20, 0),  # Somewhere else
+        (INPUT_EVENT_BUTTON_DOWN, 1.2, 30, 20, 1),  # Another button
+    ])
+    clicks = [action for action in actions if action.action_type == ActionType.MOUSE_CLICK]
+    assert [(action.params['button'], action.params['clicks']) for action in clicks] == [
+        ('left', 1), ('left', 1), ('left', 1), ('right', 1)]
+
+
+def test_modifier_and_key_become_a_hotkey():
+    actions = encoded([
+        (INPUT_EVENT_KEY_DOWN, 0.0, 0, 0, LEFT_CTRL),
+        (INPUT_EVENT_KEY_DOWN, 0.001, 0, 0, LEFT_SHIFT),
+        (INPUT_EVENT_KEY_DOWN, 0.002, 0, 0, KEY_C),
+        (INPUT_EVENT_KEY_UP, 0.003, 0, 0, KEY_C),
+        (INPUT_EVENT_KEY_UP, 0.004, 0, 0, LEFT_SHIFT),
+        (INPUT_EVENT_KEY_UP, 0.005, 0, 0, LEFT_CTRL),
+        (INPUT_EVENT_KEY_DOWN, 0.006, 0, 0, KEY_A),
+    ])
+    assert [action.action_type for action in actions] == [ActionType.KEY_COMBINATION,
+                                                          ActionType.KEY_PRESS]
+    assert list(actions[0].params['keys']) == ['ctrl', 'shift', 'c']
+    assert actions[1].params['key'] == 'a'
+
+
+def test_modifier_pressed_alone_is_a_key_press():
+    actions = encoded([
+        (INPUT_EVENT_KEY_DOWN, 0.0, 0, 0, LEFT_SHIFT),
+        (INPUT_EVENT_KEY_DOWN, 0.001, 0, 0, LEFT_SHIFT),  # Auto-repeat
+        (INPUT_EVENT_KEY_UP, 0.002, 0, 0, LEFT_SHIFT),
+    ])
+    assert [(action.action_type, action.params['key']) for action in actions] == [
+        (ActionType.KEY_PRESS, 'shift')]
+
+
+def test_waits_are_inserted_between_events():
+    actions = encoded([
+        (INPUT_EVENT_KEY_DOWN, 10.0, 0, 0, KEY_A),
+        (INPUT_EVENT_KEY_DOWN, 10.005, 0, 0, KEY_A),  # Under RECORDER_MIN_WAIT: no wait of its own
+        (INPUT_EVENT_MOVE, 10.5, 100, 200),
+        (INPUT_EVENT_WHEEL, 12.0, 100, 200, 2 * ms.WHEEL_DELTA),
+    ])
+    assert [action.action_type for action in actions] == [
+        ActionType.KEY_PRESS, ActionType.KEY_PRESS, ActionType.WAIT, ActionType.MOUSE_MOVE,
+        ActionType.WAIT, ActionType.MOUSE_SCROLL]
+    assert actions[2].params['seconds'] == 0.5
+    assert actions[4].params['seconds'] == 1.5
+    assert actions[5].params['amount'] == 2
+
+
+def test_wait_rounding_does_not_add_up():
+    events = [(INPUT_EVENT_KEY_DOWN, index * 0.0334, 0, 0, KEY_A) for index in range(301)]
+    actions = encoded(events)
+    waited = sum(action.params['seconds'] for action in actions
+                 if action.action_type == ActionType.WAIT)
+    assert abs(waited - 300 * 0.0334) < 0.001
+
+
+def test_stop_key_ends_the_recording_without_being_recorded():
+    stopped = []
+    recorder = ms.MacroRecorder(source=StubSource(), on_stop=lambda: stopped.append(True))
+    recorder.start()
+    recorder.feed(INPUT_EVENT_KEY_DOWN, 0.0, code=KEY_A)
+    recorder.feed(INPUT_EVENT_KEY_DOWN, 0.1, code=ms.VIRTUAL_KEY_CODES[ms.RECORDER_STOP_KEY])
+    actions = recorder.stop()
+    assert stopped == [True]
+    assert [action.action_type for action in actions] == [ActionType.KEY_PRESS]
+
+
+class StubSource:
+    """Capture source that captures nothing; events come from feed()"""
+
+    def start(self, ring):
+        pass
+
+    def stop(self):
+        pass